@@ -0,0 +1,95 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import session
+
+# Number of most recent location fixes drawn in each frame
+TRAIL = 100
+
+# Index one past the last fix shown in each frame, and the elapsed time of each frame,
+# for a video of the given frame rate and duration covering the whole session.
+# A duration of None has one frame per fix, so the number of frames never grows past the number of fixes.
+def frame_indices(time, fps=30, duration=None):
+	elapsed = time[-1] - time[0]
+	n_frames = len(time) if duration is None else max(int(round(fps * duration)), 1)
+	frame_times = np.linspace(0, elapsed, n_frames)
+	return np.searchsorted(time - time[0], frame_times, side='right'), frame_times
+
+# Render the last TRAIL fixes of the session at each frame to an mp4 file.
+# Data is a session.Session or a location matrix, and positions are its meters east and north of the median position.
+# Frames are drawn by blitting the scatter plot and elapsed time onto a static background, and the raw pixels
+# are piped straight to ffmpeg so no frame is kept in memory.
+# With more than one worker, contiguous frame ranges are rendered to segments in parallel and concatenated.
+def render(file_name, data, fps=30, duration=None, trail=TRAIL, workers=1, dpi=200):
+	data = session.as_session(data)
+	positions = data.positions
+	indices, frame_times = frame_indices(data.time, fps, duration)
+	print(f"Rendering {len(indices)} frames of {len(data)} positions")
+	if workers <= 1 or len(indices) < 2 * workers:
+		render_frames(file_name, positions, indices, frame_times, fps, trail, dpi)
+		return
+
+	segment_directory = Path(tempfile.mkdtemp(prefix='video-', dir=Path(file_name).parent))
+	try:
+		bounds = np.linspace(0, len(indices), workers + 1).astype(int)
+		segments = [segment_directory.joinpath(f'{i}.mp4') for i in range(workers)]
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			futures = [executor.submit(render_frames, segment, positions, indices[start:end], frame_times[start:end], fps, trail, dpi)
+				for segment, start, end in zip(segments, bounds[:-1], bounds[1:])]
+			for future in futures:
+				future.result()
+		concatenate(file_name, segments)
+	finally:
+		shutil.rmtree(segment_directory)
+
+def render_frames(file_name, positions, indices, frame_times, fps=30, trail=TRAIL, dpi=200):
+	figure = Figure(figsize=(8, 6), dpi=dpi)
+	canvas = FigureCanvasAgg(figure)
+	ax = figure.subplots()
+	ax.set_aspect('equal')
+	ax.set_xlim(np.min(positions[:,0]), np.max(positions[:,0]))
+	ax.set_ylim(np.min(positions[:,1]), np.max(positions[:,1]))
+	# Do not use offsets on axes for readability
+	ax.ticklabel_format(useOffset=False)
+	plot = ax.scatter([], [], marker='.', s=1, animated=True)
+	# TODO: text vs. figtext?
+	text = figure.text(.8, .8, '', fontsize=24, animated=True)
+
+	canvas.draw()
+	background = canvas.copy_from_bbox(figure.bbox)
+	width, height = canvas.get_width_height()
+	with ffmpeg(file_name, width, height, fps) as process:
+		for frame, (index, elapsed) in enumerate(zip(indices, frame_times)):
+			if frame % 100 == 0:
+				print(f"Frame {frame}/{len(indices)}")
+			canvas.restore_region(background)
+			plot.set_offsets(positions[max(0, index - trail):index])
+			text.set_text(f'{elapsed:.0f}')
+			ax.draw_artist(plot)
+			figure.draw_artist(text)
+			process.stdin.write(canvas.buffer_rgba())
+		process.stdin.close()
+		if process.wait() != 0:
+			raise RuntimeError(f"ffmpeg failed to write {file_name}")
+
+# ffmpeg process encoding raw RGBA frames written to its stdin
+def ffmpeg(file_name, width, height, fps):
+	command = [matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+		'-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(fps), '-i', 'pipe:',
+		'-vcodec', matplotlib.rcParams['animation.codec'], '-pix_fmt', 'yuv420p', str(file_name)]
+	return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+# Join segments with the same encoding without re-encoding them
+def concatenate(file_name, segments):
+	segment_list = Path(segments[0]).with_name('segments.txt')
+	segment_list.write_text(''.join(f"file '{os.path.abspath(segment)}'\n" for segment in segments))
+	command = [matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+		'-f', 'concat', '-safe', '0', '-i', str(segment_list), '-c', 'copy', str(file_name)]
+	subprocess.run(command, check=True)
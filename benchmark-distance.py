@@ -0,0 +1,39 @@
+import argparse
+import timeit
+import numpy as np
+import geodesy
+
+# The per-pair loop cli.plot_distance used before geodesy.cumulative_distance
+def loop_distance(sequential_data):
+	distance = np.zeros([len(sequential_data[:,1])-1, 1])
+	for i in range(len(sequential_data[:,1])-1):
+		delta = geodesy.haversine_distance(np.radians(sequential_data[i+1,1:3]), np.radians(sequential_data[i,1:3]))
+		if i == 0:
+			distance[i] = delta
+		else:
+			distance[i] = distance[i-1] + delta
+	return distance
+
+# Random walk of roughly 3 m steps starting in Ottawa
+def random_track(n, seed=0):
+	rng = np.random.default_rng(seed)
+	data = np.zeros((n, 3))
+	data[:,0] = np.arange(n)
+	data[:,1] = -75.7 + np.cumsum(rng.normal(0, 3e-5, n))
+	data[:,2] = 45.4 + np.cumsum(rng.normal(0, 3e-5, n))
+	return data
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-n", type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help="number of points")
+parser.add_argument("--repeat", type=int, default=3, help="number of timings to take the best of")
+args = parser.parse_args()
+
+for n in args.n:
+	data = random_track(n)
+	loop = min(timeit.repeat(lambda: loop_distance(data), number=1, repeat=1))
+	np.testing.assert_allclose(loop_distance(data)[:,0], geodesy.cumulative_distance(data[:,1], data[:,2])[1:], rtol=1e-9)
+	print(f"n={n}")
+	print(f"\tloop: {loop:.4f}s")
+	for metric in geodesy.DISTANCE_METRICS:
+		vectorized = min(timeit.repeat(lambda: geodesy.cumulative_distance(data[:,1], data[:,2], metric=metric), number=1, repeat=args.repeat))
+		print(f"\t{metric}: {vectorized:.4f}s ({loop / vectorized:.0f}x)")
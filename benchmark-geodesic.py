@@ -0,0 +1,38 @@
+import argparse
+import timeit
+import numpy as np
+import geodesy
+from session import Session
+
+# Random walk of roughly 3 m steps starting in Ottawa
+def random_track(n, seed=0):
+	rng = np.random.default_rng(seed)
+	longitude = -75.7 + np.cumsum(rng.normal(0, 3e-5, n))
+	latitude = 45.4 + np.cumsum(rng.normal(0, 3e-5, n))
+	return longitude, latitude
+
+parser = argparse.ArgumentParser(description="Accuracy and throughput of distance metrics against the WGS84 geodesic")
+parser.add_argument("input", nargs='*', help="recordings to measure, a random walk by default")
+parser.add_argument("-n", type=int, default=1_000_000, help="number of points of the random walk")
+parser.add_argument("--repeat", type=int, default=3, help="number of timings to take the best of")
+args = parser.parse_args()
+
+tracks = []
+for path in args.input:
+	data = Session.load(path)
+	tracks.append((path, data.longitude, data.latitude))
+if not tracks:
+	tracks.append((f'random walk of {args.n} points', *random_track(args.n)))
+
+for name, longitude, latitude in tracks:
+	# Every segment solved by the iterative method is the reference
+	reference, _, _, converged = geodesy.vincenty_inverse(longitude[:-1], latitude[:-1], longitude[1:], latitude[1:])
+	seconds = min(timeit.repeat(lambda: geodesy.vincenty_inverse(longitude[:-1], latitude[:-1], longitude[1:], latitude[1:]), number=1, repeat=args.repeat))
+	print(f"{name}: {len(longitude)} points, {np.sum(reference) / 1000:.3f} km")
+	print(f"\tvincenty_inverse: {seconds:.4f}s, {np.count_nonzero(~converged)} segments did not converge")
+	for metric in geodesy.DISTANCE_METRICS:
+		segments = geodesy.segment_distances(longitude, latitude, metric)
+		seconds = min(timeit.repeat(lambda: geodesy.segment_distances(longitude, latitude, metric), number=1, repeat=args.repeat))
+		error = np.abs(segments - reference)
+		total = (np.sum(segments) - np.sum(reference)) / np.sum(reference)
+		print(f"\t{metric}: {seconds:.4f}s ({len(longitude) / seconds / 1e6:.1f}M points/s), max segment error {np.max(error, initial=0):.2e} m, total error {total:+.2e}")
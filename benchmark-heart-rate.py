@@ -0,0 +1,72 @@
+import argparse
+import base64
+import struct
+import timeit
+import numpy as np
+import heart_rate_measurement
+
+# The per-packet decoder and np.append loop cli.parse_bluetooth used before heart_rate_measurement
+def decode_heart_rate_measurement(bs):
+	c1 = (bs[0] & 0x1) == 0
+	c2 = (bs[0] & 0x1) > 0
+	c3 = (bs[0] & 0x8) > 0
+	c4 = (bs[0] & 0x10) > 0
+	if c1:
+		value = struct.unpack('<B', bs[1:2])[0]
+		if c3:
+			energy = struct.unpack('<H', bs[2:4])[0]
+			if c4:
+				rr_intervals = [struct.unpack('<H', bs[i:i+2])[0] for i in range(4,len(bs),2)]
+				return value, energy, rr_intervals
+		elif c4:
+			rr_intervals = [struct.unpack('<H', bs[i:i+2])[0] for i in range(2,len(bs),2)]
+			return value, None, rr_intervals
+		return value, None, None
+	if c2:
+		value = struct.unpack('<H', bs[1:3])[0]
+		if c3:
+			energy = struct.unpack('<H', bs[3:5])[0]
+			if c4:
+				rr_intervals = [struct.unpack('<H', bs[i:i+2])[0] for i in range(5,len(bs),2)]
+				return value, energy, rr_intervals
+		elif c4:
+			rr_intervals = [struct.unpack('<H', bs[i:i+2])[0] for i in range(3,len(bs),2)]
+			return value, None, rr_intervals
+		return value, None, None
+
+def loop_decode(encoded_values):
+	heart_rate = np.zeros(len(encoded_values), dtype=int)
+	rr_intervals = np.zeros([0,1])
+	energy_values = np.zeros([0,1])
+	for i, encoded_value in enumerate(encoded_values):
+		value, energy_value, rr_interval = decode_heart_rate_measurement(base64.b64decode(encoded_value))
+		heart_rate[i] = value
+		if energy_value:
+			energy_values = np.append(energy_values, energy_value)
+		if rr_interval:
+			rr_intervals = np.append(rr_intervals, rr_interval)
+	return heart_rate, energy_values, rr_intervals
+
+# Packets with a uint8 heart rate and one or two RR intervals, like a chest strap sends
+def random_packets(n, seed=0):
+	rng = np.random.default_rng(seed)
+	packets = []
+	for i in range(n):
+		rr_intervals = rng.integers(400, 1200, size=rng.integers(1, 3))
+		bs = struct.pack('<BB', 0x16, rng.integers(60, 190)) + struct.pack(f'<{len(rr_intervals)}H', *rr_intervals)
+		packets.append(base64.b64encode(bs))
+	return np.array(packets, dtype=bytes)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-n", type=int, nargs='+', default=[10_000, 100_000], help="number of packets")
+parser.add_argument("--repeat", type=int, default=3, help="number of timings to take the best of")
+args = parser.parse_args()
+
+for n in args.n:
+	encoded = random_packets(n)
+	loop = min(timeit.repeat(lambda: loop_decode(encoded), number=1, repeat=1))
+	batch = min(timeit.repeat(lambda: heart_rate_measurement.decode_measurements(encoded), number=1, repeat=args.repeat))
+	np.testing.assert_array_equal(loop_decode(encoded)[2], heart_rate_measurement.decode_measurements(encoded)[2])
+	print(f"n={n}")
+	print(f"\tloop: {n / loop:,.0f} packets/s")
+	print(f"\tbatch: {n / batch:,.0f} packets/s ({loop / batch:.0f}x)")
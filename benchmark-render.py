@@ -0,0 +1,43 @@
+import argparse
+import os
+import tempfile
+import timeit
+import numpy as np
+import decimate
+import loader
+import render
+from session import Session
+
+# Session of one fix per second of a random walk of roughly 3 m steps starting in Ottawa, with heart rate
+def random_session(n, seed=0):
+	rng = np.random.default_rng(seed)
+	data = np.zeros((n, len(loader.LOCATION_PROPERTIES)))
+	data[:,0] = np.arange(n, dtype=float)
+	data[:,1] = -75.7 + np.cumsum(rng.normal(0, 3e-5, n))
+	data[:,2] = 45.4 + np.cumsum(rng.normal(0, 3e-5, n))
+	data[:,3] = 70 + np.cumsum(rng.normal(0, 0.1, n))
+	data[:,4:6] = rng.choice([3.0, 5.0, 10.0], (n, 2))
+	data[:,6] = np.abs(rng.normal(3, 1, n))
+	data[:,7] = 0.5
+	data[:,8] = rng.uniform(0, 360, n)
+	data[:,9] = 10.0
+	heart_rate = np.column_stack([data[:,0], 140 + np.cumsum(rng.normal(0, 0.5, n)).clip(-40, 40)])
+	return Session(data, heart_rate)
+
+parser = argparse.ArgumentParser(description="Time and file size of figures of a long session with and without decimation")
+parser.add_argument("-n", type=int, default=1_000_000, help="number of fixes in the session")
+parser.add_argument("--points", type=int, default=decimate.POINT_BUDGET, help="most points drawn by each scatter plot")
+parser.add_argument("--repeat", type=int, default=1, help="number of timings to take the best of")
+args = parser.parse_args()
+
+session = random_session(args.n)
+# Projected before timing so both budgets draw the same positions
+session.positions
+with tempfile.TemporaryDirectory() as directory:
+	for budget in [args.points, None]:
+		summary = os.path.join(directory, f'summary-{budget}.png')
+		velocity = os.path.join(directory, f'velocity-{budget}.png')
+		seconds = min(timeit.repeat(lambda: render.summary(summary, session, budget=budget), number=1, repeat=args.repeat))
+		velocity_seconds = min(timeit.repeat(lambda: render.velocity_summary(velocity, session, budget=budget), number=1, repeat=args.repeat))
+		label = 'every point' if budget is None else f'{budget} points'
+		print(f"{label}: summary {seconds:.2f}s {os.path.getsize(summary) / 1e3:.0f} kB, velocity {velocity_seconds:.2f}s {os.path.getsize(velocity) / 1e3:.0f} kB")
@@ -0,0 +1,46 @@
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CLI = Path(__file__).resolve().with_name('cli.py')
+
+# A recording and an accelerometer file small enough that the time measured is startup
+def write_inputs(directory):
+	locations = [{'timeInterval': float(i), 'longitude': -75.7 + i * 1e-5, 'latitude': 45.4, 'altitude': 70.0,
+		'horizontalAccuracy': 5.0, 'verticalAccuracy': 3.0, 'speed': 1.0, 'speedAccuracy': 0.5, 'course': 90.0, 'courseAccuracy': 10.0} for i in range(10)]
+	bluetooth_values = [{'timeInterval': float(i), 'value': 'FlAAAg=='} for i in range(10)]
+	directory.joinpath('recording.json').write_text(json.dumps([{'locations': locations, 'bluetoothValues': bluetooth_values}]))
+	samples = [{'timestamp': i * 0.01, 'x': 0.0, 'y': 0.0, 'z': 1.0} for i in range(2000)]
+	directory.joinpath('motion.json').write_text(json.dumps(samples))
+	directory.joinpath('output').mkdir()
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--repeat", type=int, default=5, help="number of timings to take the best of")
+args = parser.parse_args()
+
+commands = {
+	'import': [sys.executable, '-c', f'import sys; sys.path.insert(0, {str(CLI.parent)!r}); import cli'],
+	'stats': [sys.executable, str(CLI), 'stats', 'recording.json'],
+	'render': [sys.executable, str(CLI), 'render', 'recording.json'],
+	'motion': [sys.executable, str(CLI), 'motion', 'motion.json'],
+}
+if shutil.which('ffmpeg'):
+	commands['video'] = [sys.executable, str(CLI), 'video', 'recording.json', '--duration', '1', '--fps', '1']
+
+with tempfile.TemporaryDirectory() as directory:
+	directory = Path(directory)
+	write_inputs(directory)
+	# Fill the parsed recording cache so every timing is a warm start
+	subprocess.run(commands['stats'], cwd=directory, check=True, capture_output=True)
+	for name, command in commands.items():
+		timings = []
+		for _ in range(args.repeat):
+			start = time.perf_counter()
+			subprocess.run(command, cwd=directory, check=True, capture_output=True)
+			timings.append(time.perf_counter() - start)
+		print(f"{name}: {min(timings):.3f}s")
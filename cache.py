@@ -0,0 +1,50 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+
+CACHE_DIRECTORY = Path('cache')
+# Increase whenever the arrays produced by parsing change so stale entries are not reused
+PARSER_VERSION = 2
+SPLIT_ARRAYS = ['locations', 'heart_rate', 'rr_intervals']
+
+def file_hash(path, chunk_size=1 << 20):
+	digest = hashlib.sha256()
+	with open(path, 'rb') as f:
+		while chunk := f.read(chunk_size):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+# Entry of the cache for a file, named by the hash of its contents. Hashing reads the whole file, so it is done
+# once and the entry is passed to load and store.
+def cache_path(path, directory=CACHE_DIRECTORY):
+	return Path(directory).joinpath(f'{file_hash(path)}-v{PARSER_VERSION}')
+
+# Returns a list of (locations, heart_rate, rr_intervals) tuples per split of the entry of cache_path,
+# memory-mapped read-only, or None when the file has not been cached.
+def load(entry):
+	if not entry.is_dir():
+		return None
+	splits = []
+	for i in range(len(list(entry.iterdir()))):
+		split = entry.joinpath(str(i))
+		splits.append(tuple(np.load(split.joinpath(name).with_suffix('.npy'), mmap_mode='r') for name in SPLIT_ARRAYS))
+	return splits
+
+# Write the arrays of every split to the entry of cache_path
+def store(entry, splits):
+	# Write everything beside the entry and rename it into place so readers never see a partial entry
+	staging = entry.with_name(f'{entry.name}.tmp-{os.getpid()}')
+	for i, arrays in enumerate(splits):
+		split = staging.joinpath(str(i))
+		split.mkdir(parents=True)
+		for name, array in zip(SPLIT_ARRAYS, arrays):
+			np.save(split.joinpath(name).with_suffix('.npy'), np.asarray(array))
+	staging.mkdir(parents=True, exist_ok=True)
+	try:
+		staging.rename(entry)
+	except OSError:
+		# Another process cached the same file first
+		shutil.rmtree(staging)
+	return entry
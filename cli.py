@@ -1,269 +1,213 @@
 import argparse
+import glob
 import json
-import base64
-from pathlib import PurePath
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+import decimate
 import geodesy
+import metrics
+import recording
+import session
+import streaming
 
-WGS84_a = 6378137.0
-WGS84_b = 6356752.314245
+# matplotlib and scipy are imported by the subcommands that need them so statistics start quickly
 
 # Print total distance using distance between points on Mercator projection
 # This is probably a very bad way of doing this, but it's an interesting reference point
 def mercator_distance(latitude, longitude):
-	y = geodesy.project_latitude(latitude)
-	x = geodesy.project_longitude(longitude)
-	# Scale latitude to twice the WGS84 semi-minor axis 
-	y = 2 * WGS84_b * y / np.pi
-	# Normalize latitude to the smallest value so distances are relatable
-	y = y - np.min(y)
-	# Scale longitude to the WGS84 equatorial circumference
-	x = 2 * np.pi * WGS84_a * x / 2 / np.pi
-	# Normalize longitude to the smallest value so distances are relatable
-	x = x - np.min(x)
-	mercator = np.array([x, y])
-	#mercator_distance = np.sum(np.sqrt(np.sum(np.power(data[1:,1:] - data[:-1,1:], 2), 1)))
-	mercator_distance = np.sum(np.sqrt(np.sum(np.power(mercator[:,:-1] - mercator[:,1:], 2), 0)))
-	return mercator_distance
+	return np.sum(geodesy.segment_distances(longitude, latitude, metric='mercator'))
 
 # Straight line distance between two points. Not arc length.
 def cartesian_distance(latitude, longitude):
-	phi = np.pi / 2 - latitude * np.pi / 180
-	theta = longitude * np.pi / 180
-	# Let r be the average radius according to WGS84
-	r = (2 * WGS84_a + WGS84_b) / 3
-	x = r * np.sin(theta) * np.cos(phi)
-	y = r * np.sin(theta) * np.sin(phi)
-	z = r * np.cos(theta)
-	cartesian = np.array([x, y, z])
-	cartesian_distance = np.sum(np.sqrt(np.sum(np.power(cartesian[:,:-1] - cartesian[:,1:], 2), 0)))
-	return cartesian_distance
-
-def parse_locations(data_in):
-	# Added course and speed
-	properties = ['timeInterval', 'longitude', 'latitude', 'altitude', 'horizontalAccuracy', 'verticalAccuracy', 'speed', 'speedAccuracy', 'course', 'courseAccuracy']
-	i = len(data_in['locations'])
-	j = len(properties)
-	data_out = np.zeros((i, j), dtype=float)
-	for i, location in enumerate(data_in['locations']):
-		for j, prop in enumerate(properties):
-			data_out[i, j] = location.get(prop)
-	return data_out
-
-def parse_bluetooth(data_in):
-	properties = ['timeInterval', 'value']
-	i = len(data_in['bluetoothValues'])
-	j = len(properties)
-	data_out = np.zeros((i, j), dtype=int)
-	rr_intervals = np.zeros([0,1])
-	energy_values = np.zeros([0,1])
-	for i, bluetooth_value in enumerate(data_in['bluetoothValues']):
-		for j, prop in enumerate(properties):
-			if prop is 'value':
-				value, energy_value, rr_interval = geodesy.decode_heart_rate_measurement(base64.b64decode(bluetooth_value[prop]))
-				data_out[i, j] = value
-				if energy_value:
-					energy_values = np.append(energy_values, energy_value)
-				if rr_interval:
-					rr_intervals = np.append(rr_intervals, rr_interval)
-			else:
-				data_out[i, j] = bluetooth_value[prop]
-	return data_out, energy_values, rr_intervals
-
-parser = argparse.ArgumentParser()
-parser.add_argument("input", help="file path to the input data")
-parser.add_argument("-split", type=int, required=False, help="index of split in data to process")
-parser.add_argument("--track", action='store_true', help="overlay a 400m track on position data")
-parser.add_argument("--video", action='store_true', help="render a video of position data")
-args = parser.parse_args()
-
-with open(args.input) as f:
-	raw_data = json.loads(f.read())
-
-def summary(file_name, data, heart_rate, overlay=False):
-	sequential_data = data[data[:,0].argsort()]
-	figure, ((position_ax, accuracy_ax), (altitude_ax, distance_ax)) = plt.subplots(2,2)
-	position_ax.set_aspect('equal')
-	figure.set_size_inches(8, 6)
-	figure.dpi = 200
-
-	plot_position(position_ax, data, overlay)
-	#plot_heart_rate(heart_rate_ax, heart_rate)
-	plot_distance(distance_ax, data)
-
-	altitude_ax.set_xlabel('Time (minute)')
-	altitude_ax.set_ylabel('Altitude (m)')
-	altitude_ax.scatter(sequential_data[:,0] / 60, sequential_data[:,3], marker='.', s=1)
-
-	accuracy_ax.set_xlabel('Time (minute)')
-	accuracy_ax.set_ylabel('Accuracy (m)')
-	accuracy_ax.scatter(sequential_data[:,0], sequential_data[:,4], marker='.', s=1, label='Horizontal')
-	accuracy_ax.scatter(sequential_data[:,0], sequential_data[:,5], marker='.', s=1, label='Vertical')
-	accuracy_ax.legend()
-
-	figure.savefig(file_name)
-
-def plot_distance(ax, data):
-	ax.yaxis.grid(True, which='major')
-	ax.set_xlabel('Time (minute)')
-	ax.set_ylabel('Distance (km)')
-	sequential_data = data[data[:,0].argsort()]
-	distance = np.zeros([len(data[:,1])-1, 1])
-	for i in range(len(data[:,1])-1):
-		delta = geodesy.haversine_distance(np.radians(sequential_data[i+1,1:3]), np.radians(sequential_data[i,1:3]))
-		if i == 0:
-			distance[i] = delta
+	return np.sum(geodesy.segment_distances(longitude, latitude, metric='cartesian'))
+
+# Recording files named by a directory, a glob pattern or a single path
+def input_paths(pattern):
+	path = Path(pattern)
+	if path.is_dir():
+		return sorted(path.glob('*.json'))
+	if glob.has_magic(pattern):
+		return sorted(Path(match) for match in glob.glob(pattern))
+	return [path]
+
+# Parse a file ahead of processing its splits in parallel. Returns the number of splits.
+def prepare(path, stream=False, use_cache=True):
+	if use_cache:
+		return len(recording.load_splits(path, stream=stream))
+	return streaming.count_splits(path)
+
+def timed(task, path, split, **options):
+	start = time.perf_counter()
+	result = task(path, split, **options)
+	return path, split, time.perf_counter() - start, result
+
+# Run task(path, split, **options) for many files across a pool of processes. Each file is processed as a whole
+# and per split, or only at split when it is given. A file that cannot be read or a task that fails is reported
+# and counted as one failure without stopping the others. Returns the (path, split, result) of each successful
+# task and the number of failures.
+def batch(task, paths, jobs=None, split=None, **options):
+	start = time.perf_counter()
+	results = []
+	failures = 0
+	with ProcessPoolExecutor(max_workers=jobs) as executor:
+		if split is None:
+			tasks = []
+			prepared = {executor.submit(prepare, path, options.get('stream', False), options.get('use_cache', True)): path for path in paths}
+			for future in as_completed(prepared):
+				path = prepared[future]
+				try:
+					count = future.result()
+				except Exception as e:
+					print(f"Failed: {path}: {e!r}", file=sys.stderr)
+					failures += 1
+					continue
+				tasks.extend((path, task_split) for task_split in [None] + list(range(count)))
 		else:
-			distance[i] = distance[i-1] + delta
-
-	ax.scatter(sequential_data[:-1,0] / 60, distance / 1000, marker='.', s=1)
-
-def video(file_name, data):
-	sequential_data = data[data[:,0].argsort()]
-	figure, ((anim)) = plt.subplots(1,1)
-	figure.set_size_inches(8, 6)
-	figure.dpi = 200
-	#color='#404040')
-	plot = anim.scatter([], [], marker='.', s=1)
-	# Do not use offsets on axes for readability
-	anim.ticklabel_format(useOffset=False)
-
-	# TODO: text vs. figtext?
-	text = figure.text(.8, .8, str(-1), fontsize=24)
-
-	def init():
-		anim.set_aspect('equal')
-		anim.set_xlim(np.min(sequential_data[:,1]), np.max(sequential_data[:,1]))
-		anim.set_ylim(np.min(sequential_data[:,2]), np.max(sequential_data[:,2]))
-		text.set_text(str(0))
-		return [plot, text]
-
-	def update(frame):
-		if frame % 100 == 0:
-			print(f"Frame {frame}/{len(sequential_data)}")
-		plot.set_offsets(sequential_data[max(0,frame-100):frame,1:3])
-		text.set_text(str(sequential_data[frame, 0] - sequential_data[0, 0]))
-		return [plot, text]
-
-	ani = FuncAnimation(figure, update, frames=range(len(sequential_data)), init_func=init, blit=False)
-
-	ani.save(file_name)
+			tasks = [(path, split) for path in paths]
+		futures = {executor.submit(timed, task, path, task_split, **options): (path, task_split) for path, task_split in tasks}
+		for future in as_completed(futures):
+			path, task_split = futures[future]
+			label = 'all splits' if task_split is None else f'split {task_split}'
+			try:
+				_, _, seconds, result = future.result()
+			except Exception as e:
+				print(f"Failed: {path} {label}: {e!r}", file=sys.stderr)
+				failures += 1
+				continue
+			print(f"{path} {label}: {seconds:.2f}s", file=sys.stderr)
+			results.append((path, task_split, result))
+	print(f"Processed {len(results)}/{len(results) + failures} tasks from {len(paths)} files in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+	return results, failures
+
+# Run task on the input of a subcommand, in a process pool when it names many files
+def run(task, args, **options):
+	paths = input_paths(args.input)
+	if paths == [Path(args.input)] and args.jobs is None:
+		return [(args.input, args.split, task(args.input, args.split, **options))], 0
+	return batch(task, paths, args.jobs, args.split, **options)
+
+# With a chunk_size, metrics are computed while reading the file in bounded memory, without laps or smoothing
+def load_metrics(path, split=None, stream=False, use_cache=True, track=False, metric='haversine', smooth=False, chunk_size=None):
+	if chunk_size is not None:
+		return streaming.stream_metrics(path, split, chunk_size, metric)
+	data = session.Session.load(path, split, stream, use_cache)
+	if smooth:
+		data = data.smoothed()
+	values = metrics.split_metrics(data.data, data.heart_rate, data.rr_intervals, metric=metric)
+	if track:
+		values.update(metrics.lap_metrics(data.data, data.heart_rate, metric))
+	return values
+
+# Write one JSON line of metrics per file and per split
+def stats_command(args):
+	options = {'stream': args.stream, 'use_cache': not args.no_cache, 'track': args.track, 'metric': args.metric, 'smooth': args.smooth}
+	if args.chunk_size is not None:
+		if args.track or args.smooth:
+			stats_parser.error("--track and --smooth need every fix at once and cannot be used with --chunk-size")
+		# Caching parses whole files, so chunked metrics always read the input
+		options.update(use_cache=False, chunk_size=args.chunk_size)
+	results, failures = run(load_metrics, args, **options)
+	output = sys.stdout if args.output is None else open(args.output, 'a')
+	try:
+		for path, split, values in sorted(results, key=lambda result: (str(result[0]), -1 if result[1] is None else result[1])):
+			line = {'file': str(path), 'split': split}
+			line.update(metrics.to_json(values))
+			output.write(json.dumps(line) + '\n')
+	finally:
+		if output is not sys.stdout:
+			output.close()
+	return 1 if failures else 0
+
+def render_command(args):
+	import render
+	video_options = None
+	if args.video:
+		video_options = {'fps': args.fps, 'duration': args.duration, 'workers': args.workers}
+		if input_paths(args.input) != [Path(args.input)] or args.jobs is not None:
+			# Files are already rendered in parallel
+			video_options['workers'] = 1
+	budget = args.points if args.points > 0 else None
+	_, failures = run(render.render, args, track=args.track, video_options=video_options, stream=args.stream, use_cache=not args.no_cache, metric=args.metric, smooth=args.smooth, budget=budget)
+	return 1 if failures else 0
+
+def video_command(args):
+	import render
+	data = session.Session.load(args.input, args.split, args.stream, not args.no_cache)
+	render.video(render.output_path(args.input, '-video', args.split, '.mp4'), data, fps=args.fps, duration=args.duration, workers=args.workers)
+	return 0
+
+# Heatmap of every fix of the input as an image, the grid as .npy and its bounds as JSON, named by output
+def heatmap_command(args):
+	import heatmap
+	import render
+	paths = input_paths(args.input)
+	grid, bounds, failures = heatmap.heatmap(paths, args.bounds, args.width, args.jobs, use_cache=not args.no_cache)
+	output = Path(args.output)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	np.save(output.with_suffix('.npy'), grid)
+	output.with_suffix('.json').write_text(json.dumps({'bounds': [float(b) for b in bounds], 'shape': list(grid.shape), 'files': len(paths) - failures}) + '\n')
+	render.heatmap_summary(output.with_suffix('.png'), grid, bounds)
+	return 1 if failures else 0
+
+def motion_command(args):
+	import render
+	render.render_motion(args.input)
+	return 0
+
+recording_parser = argparse.ArgumentParser(add_help=False)
+recording_parser.add_argument("input", help="file path to the input data, or a directory or glob pattern of files")
+recording_parser.add_argument("-split", type=int, required=False, help="index of split in data to process")
+recording_parser.add_argument("--stream", action='store_true', help="decode one split of the input at a time to reduce memory use")
+recording_parser.add_argument("--no-cache", action='store_true', help="parse the input instead of reusing or writing parsed arrays in cache/")
+
+distance_parser = argparse.ArgumentParser(add_help=False)
+distance_parser.add_argument("--metric", choices=list(geodesy.DISTANCE_METRICS), default='haversine', help="distance used for speed, pace, laps and figures")
+distance_parser.add_argument("--smooth", action='store_true', help="replace positions with a Kalman smoothed path weighted by the accuracy of each fix")
+
+batch_parser = argparse.ArgumentParser(add_help=False)
+batch_parser.add_argument("--jobs", type=int, required=False, help="number of processes handling files in parallel when the input is a directory or glob pattern")
+
+video_parser = argparse.ArgumentParser(add_help=False)
+video_parser.add_argument("--fps", type=int, default=30, help="frame rate of the video")
+video_parser.add_argument("--duration", type=float, required=False, help="length of the video in seconds, one frame per fix by default")
+video_parser.add_argument("--workers", type=int, default=1, help="number of processes rendering video segments")
 
-def plot_heart_rate(ax, heart_rate):
-	ax.yaxis.grid(True, which='major')
-	ax.set_ylabel('Heart Rate (BPM)')
-	ax.set_yticks([95, 114, 133, 152, 171, 190])
-	ax.set_xlabel('Time (minute)')
-	ax.scatter(heart_rate[:,0] / 60, heart_rate[:,1], marker='.', s=1)
-
-def heart_summary(file_name, heart_rate, rr_intervals):
-	figure, ((beats, rr_rate), (intervals, variability)) = plt.subplots(2,2)
-	figure.set_size_inches(8, 6)
-	figure.dpi = 200
-	plot_heart_rate(beats, heart_rate)
-	rr_rate.scatter(range(len(rr_intervals)), rr_intervals / 1024), marker='.', s=1)
-	intervals.scatter(range(len(rr_intervals)), rr_intervals, marker='.', s=1)
-	variability.hist(rr_intervals, bins=40)
-	figure.savefig(file_name)
-
-def plot_velocity(ax, data):
-	ax.set_ylabel('Velocity m/s')
-	ax.set_xlabel('Time (minute)')
-	ax.scatter(data[:,0], data[:,6], marker='.', s=1)
-
-def velocity_summary(file_name, data):
-	sequential_data = data[data[:,0].argsort()]
-	figure, ((speed, course), (speed_accuracy, course_accuracy)) = plt.subplots(2,2)
-	figure.set_size_inches(8, 6)
-	figure.dpi = 200
-	plot_velocity(speed, sequential_data)
-	
-	speed_accuracy.scatter(data[:,0], data[:,7], marker='.', s=1)
-	speed_accuracy.set_ylabel('Speed accuracy')
-	speed_accuracy.set_xlabel('Time (minute)')
-
-	# Quiver plot of course at projection of latitude and longitude
-	vector_x = np.sin(sequential_data[:,8] * np.pi / 180)
-	vector_y = np.cos(sequential_data[:,8] * np.pi / 180)
-	position = np.zeros(sequential_data.shape)
-	position[:,1] = geodesy.project_longitude(sequential_data[:,1])
-	position[:,2] = geodesy.project_latitude(sequential_data[:,2])
-	course.set_aspect('equal')
-	course.quiver(position[20:70,1], position[20:70,2], vector_x[20:70], vector_y[20:70])
-
-	course_accuracy.scatter(data[:,0], data[:,9], marker='.', s=1)
-	course_accuracy.set_ylabel('Course accuracy')
-	course_accuracy.set_xlabel('Time (minute)')
-
-	figure.savefig(file_name)
-
-def plot_position(ax, data, overlay=False):
-	ax.set_xlabel('Longitude (degrees)')
-	ax.set_ylabel('Latitude (degrees)')
-	ax.set_aspect('equal')
-
-	# Optionally add an overlay of a 400m track
-	if overlay:
-		center_x = (np.max(data[:,1]) + np.min(data[:,1])) / 2
-		center_y = (np.max(data[:,2]) + np.min(data[:,2])) / 2
-		track_overlay = geodesy.track([center_x, center_y], np.pi/4)
-		track_overlay[:,0] = geodesy.project_longitude(track_overlay[:,0])
-		track_overlay[:,1] = geodesy.project_latitude(track_overlay[:,1])
-		ax.scatter(track_overlay[:,0], track_overlay[:,1], marker='.', s=4)
-
-	# Project position data onto plot
-	projection = np.zeros(data.shape)
-	projection[:,1] = geodesy.project_longitude(data[:,1])
-	projection[:,2] = geodesy.project_latitude(data[:,2])
-	ax.scatter(projection[:,1], projection[:,2], marker='.', s=1)
-
-	# Do not use offsets on axes for readability
-	ax.ticklabel_format(useOffset=False)
-
-split_suffix = ''
-if args.split is not None:
-	split_suffix = '-' + str(args.split)
-	data = parse_locations(raw_data[args.split])
-	heart_rate, _, rr_intervals = parse_bluetooth(raw_data[args.split])
-else:
-	data = np.concatenate([parse_locations(data) for data in raw_data], axis=0)
-	heart_rate = []
-	rr_intervals = []
-	for b_data in raw_data:
-		hr, _, rr = parse_bluetooth(b_data)
-		heart_rate.append(hr)
-		rr_intervals.append(rr)
-	heart_rate = np.concatenate(heart_rate, 0)
-	rr_intervals = np.concatenate(rr_intervals, 0)
-
-if args.video:
-	name = PurePath(args.input).with_suffix('').name + '-video' + split_suffix
-	video_path = PurePath('output').joinpath(name).with_suffix('.mp4')
-	video(video_path, data)
-
-name = PurePath(args.input).with_suffix('').name + split_suffix
-summary_path = PurePath('output').joinpath(name).with_suffix('.png')
-
-# Render a scatter plot of the position data
-position_figure, ((position_ax)) = plt.subplots(1,1)
-position_figure.set_size_inches(8, 6)
-position_figure.dpi = 200
-if args.track:
-	plot_position(position_ax, data, overlay=True)
-	summary(summary_path, data, heart_rate, overlay=True)
-else:
-	plot_position(position_ax, data)
-	summary(summary_path, data, heart_rate)
-name = PurePath(args.input).with_suffix('').name + '-position' + split_suffix
-position_path = PurePath('output').joinpath(name).with_suffix('.png')
-position_figure.savefig(position_path)
-
-name = PurePath(args.input).with_suffix('').name + '-heart-rate' + split_suffix
-heart_summary_path = PurePath('output').joinpath(name).with_suffix('.png')
-heart_summary(heart_summary_path, heart_rate, rr_intervals)
-
-name = PurePath(args.input).with_suffix('').name + '-velocity' + split_suffix
-velocity_summary_path = PurePath('output').joinpath(name).with_suffix('.png')
-velocity_summary(velocity_summary_path, data)
+parser = argparse.ArgumentParser()
+subparsers = parser.add_subparsers(dest='command', required=True)
+stats_parser = subparsers.add_parser('stats', parents=[recording_parser, batch_parser, distance_parser], help="write metrics of recordings as JSON lines without rendering")
+stats_parser.add_argument("--output", required=False, help="file to append JSON lines to instead of standard output")
+stats_parser.add_argument("--track", action='store_true', help="fit a 400m track to position data and add lap splits")
+stats_parser.add_argument("--chunk-size", type=int, required=False, help="read the input incrementally and compute metrics this many records at a time in bounded memory")
+stats_parser.set_defaults(handler=stats_command)
+render_parser = subparsers.add_parser('render', parents=[recording_parser, batch_parser, distance_parser, video_parser], help="render figures of recordings")
+render_parser.add_argument("--track", action='store_true', help="fit a 400m track to position data and overlay it")
+render_parser.add_argument("--video", action='store_true', help="render a video of position data")
+render_parser.add_argument("--points", type=int, default=decimate.POINT_BUDGET, help="most points drawn by each scatter plot, 0 to draw every point")
+render_parser.set_defaults(handler=render_command)
+video_subparser = subparsers.add_parser('video', parents=[recording_parser, video_parser], help="render a video of position data")
+video_subparser.set_defaults(handler=video_command)
+heatmap_parser = subparsers.add_parser('heatmap', parents=[batch_parser], help="render the density of fixes of many recordings")
+heatmap_parser.add_argument("input", help="file path to the input data, or a directory or glob pattern of files")
+heatmap_parser.add_argument("--no-cache", action='store_true', help="read the input incrementally instead of reusing or writing parsed arrays in cache/")
+heatmap_parser.add_argument("--width", type=int, default=1024, help="number of cells along the longer side of the grid")
+heatmap_parser.add_argument("--bounds", type=float, nargs=4, metavar=('WEST', 'SOUTH', 'EAST', 'NORTH'), required=False, help="longitude and latitude bounds of the grid, those of every fix by default")
+heatmap_parser.add_argument("--output", default='output/heatmap', help="path of the image, grid and bounds without suffix")
+heatmap_parser.set_defaults(handler=heatmap_command)
+motion_parser = subparsers.add_parser('motion', help="render figures and count repetitions of accelerometer data")
+motion_parser.add_argument("input", help="file path to the input data")
+motion_parser.set_defaults(handler=motion_command)
+
+def main(argv=None):
+	if argv is None:
+		argv = sys.argv[1:]
+	if argv and argv[0] not in subparsers.choices and argv[0] not in ['-h', '--help']:
+		# Rendering was the only mode before subcommands
+		argv = ['render'] + list(argv)
+	args = parser.parse_args(argv)
+	return args.handler(args)
+
+if __name__ == '__main__':
+	sys.exit(main())
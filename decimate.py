@@ -0,0 +1,92 @@
+import numpy as np
+
+# Number of points drawn by each scatter plot of a figure at most
+POINT_BUDGET = 50000
+
+# Indices of budget points of a time series chosen by largest triangle three buckets, which keeps the first and
+# last points and from every bucket of points in between the one forming the largest triangle with the points
+# kept around it. x is sorted and every value is finite. Buckets hold equal numbers of points. LTTB anchors each
+# bucket on the point kept in the previous one, which is sequential, so the previous bucket is first stood in for
+# by its mean and then, for each further pass over whole arrays, by the point the pass before kept. Three passes
+# agree with sequential LTTB on about 90% of points of a random walk.
+def lttb(x, y, budget=POINT_BUDGET, passes=3):
+	n = len(x)
+	if budget is None or n <= budget or budget < 3:
+		return np.arange(n)
+	starts = np.linspace(1, n - 1, budget - 1).astype(int)[:-1]
+	widths = np.diff(np.append(starts, n - 1))
+	starts, widths = starts[widths > 0], widths[widths > 0]
+	bucket = np.repeat(np.arange(len(starts)), widths)
+	mean_x = np.add.reduceat(x[1:-1], starts - 1) / widths
+	mean_y = np.add.reduceat(y[1:-1], starts - 1) / widths
+	# Each bucket looks ahead to the mean of the next one, and the last bucket to the last point
+	next_x = np.append(mean_x[1:], x[-1])
+	next_y = np.append(mean_y[1:], y[-1])
+
+	previous_x = np.insert(mean_x[:-1], 0, x[0])
+	previous_y = np.insert(mean_y[:-1], 0, y[0])
+	for _ in range(passes):
+		chosen = _largest_triangles(x[1:-1], y[1:-1], bucket, starts - 1, previous_x, previous_y, next_x, next_y) + 1
+		previous_x = np.insert(x[chosen[:-1]], 0, x[0])
+		previous_y = np.insert(y[chosen[:-1]], 0, y[0])
+	return np.concatenate([[0], chosen, [n - 1]])
+
+# Index of the first point of the largest triangle in each bucket
+def _largest_triangles(x, y, bucket, starts, previous_x, previous_y, next_x, next_y):
+	ax = previous_x[bucket]
+	ay = previous_y[bucket]
+	area = np.abs((ax - next_x[bucket]) * (y - ay) - (ax - x) * (next_y[bucket] - ay))
+	largest = np.maximum.reduceat(area, starts)
+	candidates = np.flatnonzero(area == largest[bucket])
+	first = np.concatenate([[True], bucket[candidates[1:]] != bucket[candidates[:-1]]])
+	return candidates[first]
+
+# Indices of the first point in time order in each occupied cell of a grid of shape (columns, rows) over the
+# extent of the points, so points closer together than a cell are drawn once
+def grid(x, y, shape):
+	if len(x) == 0:
+		return np.zeros(0, dtype=int)
+	columns, rows = shape
+	column = _cells(x, columns)
+	row = _cells(y, rows)
+	_, first = np.unique(column * rows + row, return_index=True)
+	return np.sort(first)
+
+def _cells(values, count):
+	low = np.min(values)
+	span = np.max(values) - low
+	if span == 0:
+		return np.zeros(len(values), dtype=np.int64)
+	return np.minimum(((values - low) / span * count).astype(np.int64), count - 1)
+
+# Indices of the points of a path to draw in an area of cells (columns, rows): one point per cell they cover,
+# with cells doubled in size until at most budget points are left. Both axes share one scale, as in a plot with
+# an equal aspect ratio, so cells are square in data units. Without a budget every finite point is drawn.
+def positions(x, y, cells, budget=POINT_BUDGET):
+	finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+	if budget is None:
+		return finite
+	x = x[finite]
+	y = y[finite]
+	if len(x) == 0:
+		return finite
+	span = max(np.ptp(x), np.ptp(y))
+	if span == 0:
+		return finite[:1]
+	# Data units per cell along the axis limiting the scale
+	cell = max(np.ptp(x) / cells[0], np.ptp(y) / cells[1])
+	while True:
+		shape = (max(int(np.ptp(x) / cell), 1), max(int(np.ptp(y) / cell), 1))
+		indices = grid(x, y, shape)
+		if len(indices) <= budget:
+			return finite[indices]
+		cell *= 2
+
+# Indices of the points of a time series to draw in an area of cells (columns, rows), such as the pixels or
+# markers across an axes. Points sharing a cell are drawn once, and when more than budget are left, lttb picks
+# budget of them. Without a budget every finite point is drawn.
+def series(x, y, cells=None, budget=POINT_BUDGET):
+	finite = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+	if cells is not None and budget is not None:
+		finite = finite[grid(x[finite], y[finite], (max(int(cells[0]), 1), max(int(cells[1]), 1)))]
+	return finite[lttb(x[finite], y[finite], budget)]
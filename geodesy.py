@@ -1,26 +1,56 @@
 from math import pi
 import numpy as np
-import struct
 
 WGS84_a = 6378137.0
 WGS84_b = 6356752.314245
+WGS84_f = (WGS84_a - WGS84_b) / WGS84_a
+# Square of the first eccentricity
+WGS84_e2 = 1 - (WGS84_b / WGS84_a) ** 2
+MEAN_RADIUS = (2 * WGS84_a + WGS84_b) / 3
+# Segments shorter than this are measured by their chord in the vincenty metric, which differs from the
+# geodesic by about d^3 / (24 R^2), under a micrometer at 1 km
+CHORD_THRESHOLD = 1000.0
 
-def project_latitude(latitude):
-	# https://mathworld.wolfram.com/MercatorProjection.html
-	if type(latitude) not in [int, float, np.ndarray, np.float64]:
-		print(type(latitude))
-		raise TypeError("Latitude must be a real number.")
-	if type(latitude) is np.ndarray:
-		if np.any(latitude, where=(latitude < -90.0)) or np.any(latitude, where=(latitude > 90.0)):
-			raise ValueError("Latitude must be between 90 degrees and -90 degrees")
-	elif latitude > 90.0 or latitude < -90:
-		raise ValueError("Latitude must be between 90 degrees and -90 degrees")
+# Ways of validating positions before projecting them:
+# strict raises ValueError when any value is out of range, mask projects values out of range to NaN, and off
+# trusts the input. NaN passes every mode as a missing fix.
+VALIDATION_MODES = ['strict', 'mask', 'off']
 
+# Values must be a real number or an array of them. Returns where values are out of range for mask, otherwise None.
+# Arrays of any float dtype are checked in place, without converting them to float64.
+def _validate(values, limit, name, validation):
+	if validation not in VALIDATION_MODES:
+		raise ValueError(f"Unknown validation mode {validation}. Expected one of {VALIDATION_MODES}")
+	if isinstance(values, np.ndarray):
+		if values.dtype.kind not in 'iuf':
+			raise TypeError(f"{name} must be real numbers, got an array of {values.dtype}.")
+	elif isinstance(values, bool) or not isinstance(values, (int, float, np.integer, np.floating)):
+		raise TypeError(f"{name} must be a real number.")
+	if validation == 'off' or np.ndim(values) == 0 and not abs(values) > limit:
+		return None
+	if validation == 'strict':
+		# fmin and fmax skip NaN and make one pass each without a temporary array
+		if np.ndim(values) == 0 or values.size and (np.fmin.reduce(values, axis=None) < -limit or np.fmax.reduce(values, axis=None) > limit):
+			raise ValueError(f"{name} must be between {limit:g} degrees and -{limit:g} degrees")
+		return None
+	return np.abs(values) > limit
+
+# Scale latitude in degrees to the Mercator projection
+# https://mathworld.wolfram.com/MercatorProjection.html
+def project_latitude(latitude, validation='strict'):
+	invalid = _validate(latitude, 90.0, 'Latitude', validation)
 	latitude = pi / 180 * latitude
-	return np.log(np.tan(1/4 * pi + 1/2 * latitude))
+	if invalid is None:
+		return np.log(np.tan(1/4 * pi + 1/2 * latitude))
+	with np.errstate(invalid='ignore', divide='ignore'):
+		return np.where(invalid, np.nan, np.log(np.tan(1/4 * pi + 1/2 * latitude)))
 
-def project_longitude(longitude):
-	return pi / 180 * longitude
+def project_longitude(longitude, validation='strict'):
+	invalid = _validate(longitude, 180.0, 'Longitude', validation)
+	longitude = pi / 180 * longitude
+	if invalid is None:
+		return longitude
+	return np.where(invalid, np.nan, longitude)
 
 def distance(p1, p2):
 	return np.sqrt(np.exp(p2[0]-p1[0], 2) + np.exp(p2[1] - p1[1], 2))
@@ -32,10 +62,158 @@ def haversine_distance(p1, p2):
 	λ2 = p2[0]
 	φ1 = p1[1]
 	φ2 = p2[1]
-	radius = (2 * WGS84_a + WGS84_b) / 3
+	radius = MEAN_RADIUS
 	#print(f"Using r={radius}")
 	return 2 * radius * np.arcsin(np.sqrt(np.sin((φ2 - φ1) / 2) ** 2 + np.cos(φ1) * np.cos(φ2) * np.sin((λ2 - λ1) / 2) ** 2))
-	
+
+# Distance along each consecutive pair of points in one pass over whole arrays.
+# Longitude and latitude are in degrees. Returns n-1 distances in meters.
+def segment_distances(longitude, latitude, metric='haversine'):
+	if metric not in DISTANCE_METRICS:
+		raise ValueError(f"Unknown distance metric {metric}. Expected one of {list(DISTANCE_METRICS)}")
+	longitude = np.asarray(longitude, dtype=float)
+	latitude = np.asarray(latitude, dtype=float)
+	if len(longitude) < 2:
+		return np.zeros(0)
+	return DISTANCE_METRICS[metric](longitude, latitude)
+
+# Running total of segment_distances, starting at 0 for the first point.
+def cumulative_distance(longitude, latitude, metric='haversine'):
+	segments = segment_distances(longitude, latitude, metric)
+	distance = np.zeros(len(segments) + 1)
+	np.cumsum(segments, out=distance[1:])
+	return distance
+
+def _haversine_segments(longitude, latitude):
+	λ = np.radians(longitude)
+	φ = np.radians(latitude)
+	# Each cosine is shared by the two segments that touch a point
+	cos_φ = np.cos(φ)
+	h = np.sin(np.diff(φ) / 2) ** 2 + cos_φ[:-1] * cos_φ[1:] * np.sin(np.diff(λ) / 2) ** 2
+	return 2 * MEAN_RADIUS * np.arcsin(np.sqrt(h))
+
+# Straight line distance between points on a sphere of the mean radius. Not arc length.
+def _chord_segments(longitude, latitude):
+	λ = np.radians(longitude)
+	φ = np.radians(latitude)
+	cos_φ = np.cos(φ)
+	x = MEAN_RADIUS * cos_φ * np.cos(λ)
+	y = MEAN_RADIUS * cos_φ * np.sin(λ)
+	z = MEAN_RADIUS * np.sin(φ)
+	return np.sqrt(np.diff(x) ** 2 + np.diff(y) ** 2 + np.diff(z) ** 2)
+
+# Distance between points on the Mercator projection
+# This is probably a very bad way of doing this, but it's an interesting reference point
+def _mercator_segments(longitude, latitude):
+	# Scale latitude to twice the WGS84 semi-minor axis
+	y = 2 * WGS84_b * project_latitude(latitude) / np.pi
+	# Scale longitude to the WGS84 equatorial circumference
+	x = WGS84_a * project_longitude(longitude)
+	return np.sqrt(np.diff(x) ** 2 + np.diff(y) ** 2)
+
+# Earth-centered, earth-fixed coordinates in meters of positions on the WGS84 ellipsoid.
+# Longitude and latitude are in degrees and altitude in meters above the ellipsoid. Returns shape (..., 3).
+def ecef(longitude, latitude, altitude=0.0):
+	λ = np.radians(longitude)
+	φ = np.radians(latitude)
+	sin_φ = np.sin(φ)
+	cos_φ = np.cos(φ)
+	# Radius of curvature in the prime vertical
+	n = WGS84_a / np.sqrt(1 - WGS84_e2 * sin_φ ** 2)
+	return np.stack([(n + altitude) * cos_φ * np.cos(λ), (n + altitude) * cos_φ * np.sin(λ), (n * (1 - WGS84_e2) + altitude) * sin_φ], axis=-1)
+
+# Geodesic distance and azimuths between pairs of positions on the WGS84 ellipsoid by Vincenty's inverse method.
+# Longitude and latitude are in degrees and broadcast against each other. Returns the distance in meters, the
+# azimuths at the first and second position in radians clockwise from north, and whether each pair converged.
+# Every pair is iterated together, and pairs drop out of the iteration as they converge. Nearly antipodal pairs
+# may not converge, and their distance is the haversine distance instead.
+def vincenty_inverse(longitude1, latitude1, longitude2, latitude2, tolerance=1e-12, max_iterations=200):
+	λ1, φ1, λ2, φ2 = np.broadcast_arrays(*(np.radians(np.asarray(value, dtype=float)) for value in [longitude1, latitude1, longitude2, latitude2]))
+	f = WGS84_f
+	# Difference in longitude, wrapped to between -pi and pi
+	L = np.mod(λ2 - λ1 + np.pi, 2 * np.pi) - np.pi
+	# Reduced latitudes
+	U1 = np.arctan((1 - f) * np.tan(φ1))
+	U2 = np.arctan((1 - f) * np.tan(φ2))
+	sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+	sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+	# An array even for scalar positions so the iteration can update it in place
+	λ = np.array(L)
+	active = np.ones(λ.shape, dtype=bool)
+	for _ in range(max_iterations):
+		i = np.flatnonzero(active)
+		if len(i) == 0:
+			break
+		sin_λ = np.sin(λ.flat[i])
+		cos_λ = np.cos(λ.flat[i])
+		sin_σ, cos_σ, σ, sin_α, cos2_α, cos_2σm = _vincenty_terms(sin_U1.flat[i], cos_U1.flat[i], sin_U2.flat[i], cos_U2.flat[i], sin_λ, cos_λ)
+		C = f / 16 * cos2_α * (4 + f * (4 - 3 * cos2_α))
+		previous = λ.flat[i]
+		updated = L.flat[i] + (1 - C) * f * sin_α * (σ + C * sin_σ * (cos_2σm + C * cos_σ * (-1 + 2 * cos_2σm ** 2)))
+		λ.flat[i] = updated
+		active.flat[i] = np.abs(updated - previous) > tolerance
+	converged = ~active & (np.abs(λ) <= np.pi)
+
+	sin_λ = np.sin(λ)
+	cos_λ = np.cos(λ)
+	sin_σ, cos_σ, σ, sin_α, cos2_α, cos_2σm = _vincenty_terms(sin_U1, cos_U1, sin_U2, cos_U2, sin_λ, cos_λ)
+	u2 = cos2_α * (WGS84_a ** 2 - WGS84_b ** 2) / WGS84_b ** 2
+	A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+	B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+	Δσ = B * sin_σ * (cos_2σm + B / 4 * (cos_σ * (-1 + 2 * cos_2σm ** 2) - B / 6 * cos_2σm * (-3 + 4 * sin_σ ** 2) * (-3 + 4 * cos_2σm ** 2)))
+	distance = WGS84_b * A * (σ - Δσ)
+	azimuth1 = np.arctan2(cos_U2 * sin_λ, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_λ)
+	azimuth2 = np.arctan2(cos_U1 * sin_λ, -sin_U1 * cos_U2 + cos_U1 * sin_U2 * cos_λ)
+	if not np.all(converged):
+		fallback = 2 * MEAN_RADIUS * np.arcsin(np.sqrt(np.sin((φ2 - φ1) / 2) ** 2 + np.cos(φ1) * np.cos(φ2) * np.sin(L / 2) ** 2))
+		distance = np.where(converged, distance, fallback)
+	return distance, np.mod(azimuth1, 2 * np.pi), np.mod(azimuth2, 2 * np.pi), converged
+
+# Terms of Vincenty's inverse method shared by each iteration and the final distance
+def _vincenty_terms(sin_U1, cos_U1, sin_U2, cos_U2, sin_λ, cos_λ):
+	sin_σ = np.sqrt((cos_U2 * sin_λ) ** 2 + (cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_λ) ** 2)
+	cos_σ = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_λ
+	σ = np.arctan2(sin_σ, cos_σ)
+	# Coincident positions have no direction between them
+	sin_α = np.divide(cos_U1 * cos_U2 * sin_λ, sin_σ, out=np.zeros_like(sin_σ), where=sin_σ > 0)
+	cos2_α = 1 - sin_α ** 2
+	# Geodesics along the equator have cos2_α of 0
+	cos_2σm = np.divide(2 * sin_U1 * sin_U2, cos2_α, out=np.zeros_like(cos2_α), where=cos2_α > 0)
+	cos_2σm = np.where(cos2_α > 0, cos_σ - cos_2σm, 0.0)
+	return sin_σ, cos_σ, σ, sin_α, cos2_α, cos_2σm
+
+# Straight line distance between points on the WGS84 ellipsoid. Not arc length.
+def _ecef_segments(longitude, latitude):
+	return np.linalg.norm(np.diff(ecef(longitude, latitude), axis=0), axis=-1)
+
+# Geodesic distance on the WGS84 ellipsoid. Short segments, which are nearly all of a recording, use their chord
+# and only the rest are solved by vincenty_inverse.
+def _vincenty_segments(longitude, latitude):
+	distance = _ecef_segments(longitude, latitude)
+	long = np.flatnonzero(distance >= CHORD_THRESHOLD)
+	if len(long):
+		distance[long] = vincenty_inverse(longitude[long], latitude[long], longitude[long + 1], latitude[long + 1])[0]
+	return distance
+
+DISTANCE_METRICS = {
+	'haversine': _haversine_segments,
+	'cartesian': _chord_segments,
+	'mercator': _mercator_segments,
+	'ecef': _ecef_segments,
+	'vincenty': _vincenty_segments,
+}
+
+
+# Track dimensions in meters
+TRACK_STRAIGHT = 84.39
+TRACK_RADIUS = 36.5
+TRACK_LANE_WIDTH = 1.220
+TRACK_LANES = 8
+
+# Rotation of the solved legs into each quadrant of direction
+_QUADRANT_COS = np.array([1, 0, -1, 0])
+_QUADRANT_SIN = np.array([0, 1, 0, -1])
 
 def solve_right_unit_triangle(c, B):
 	# A, B, C are angles
@@ -43,123 +221,97 @@ def solve_right_unit_triangle(c, B):
 	# C is 90 deg
 	# a is along x axis
 	# b is along y axis
-
-	if c == 0:
-		return 0,0
-
-	if B == 0:
-		return c, 0
-
-	A = np.arctan(np.cos(B) / (np.sin(B) * np.cos(c)))
-	b = np.arccos(np.cos(B) / (np.sin(A) * np.sin(np.pi/2)))
-	a = np.arccos(np.cos(A) / (np.sin(B) * np.sin(np.pi/2)))
+	# Accepts arrays of c and B and solves every triangle at once
+	c, B = np.broadcast_arrays(np.asarray(c, dtype=float), np.asarray(B, dtype=float))
+	with np.errstate(divide='ignore', invalid='ignore'):
+		A = np.arctan(np.cos(B) / (np.sin(B) * np.cos(c)))
+		# Clip rounding errors that would otherwise produce NaN at the limits of arccos
+		b = np.arccos(np.clip(np.cos(B) / (np.sin(A) * np.sin(np.pi/2)), -1, 1))
+		a = np.arccos(np.clip(np.cos(A) / (np.sin(B) * np.sin(np.pi/2)), -1, 1))
+	a = np.where(B == 0, c, a)
+	b = np.where(B == 0, 0, b)
+	a = np.where(c == 0, 0, a)
+	b = np.where(c == 0, 0, b)
 	return a, b
 
+# Longitude and latitude in degrees of the point magnitude meters from origin in direction radians
+# counterclockwise from east. Magnitude and direction may be arrays, and origin an array of points,
+# which broadcast together. Returns an array of shape (..., 2).
 def point(origin, magnitude, direction):
-	mean_radius = (2 * WGS84_a + WGS84_b) / 3
-	unit_magnitude = magnitude / mean_radius
-
-	rotations = direction / (2 * np.pi)
-	if rotations >= 1:
-		direction = direction - int(rotations) * 2 * np.pi
-
-	if (direction < 0):
-		raise ValueError(f"Direction must be >= 0. direction=={direction}")
-
-	if direction < np.pi / 2:
-		x, y = solve_right_unit_triangle(unit_magnitude, direction)
-		offsets = np.array([x, y])
-	elif direction < np.pi:
-		direction = direction - np.pi / 2
-		x, y = solve_right_unit_triangle(unit_magnitude, direction)
-		offsets = np.array([-1 * y, x])
-	elif direction < 3 * np.pi / 2:
-		direction = direction - np.pi
-		x, y = solve_right_unit_triangle(unit_magnitude, direction)
-		offsets = np.array([-1 * x, -1 * y])
-	else:
-		direction = direction - 3 * np.pi / 2
-		x, y = solve_right_unit_triangle(unit_magnitude, direction)
-		offsets = np.array([y, -1 * x])
+	origin = np.asarray(origin, dtype=float)
+	unit_magnitude = np.asarray(magnitude, dtype=float) / MEAN_RADIUS
+	direction = np.asarray(direction, dtype=float)
+
+	if np.any(direction < 0):
+		raise ValueError(f"Direction must be >= 0. direction=={np.min(direction)}")
+	direction = np.mod(direction, 2 * np.pi)
+
+	# Solve in the first quadrant and rotate the result back
+	quadrant = np.minimum((direction // (np.pi / 2)).astype(int), 3)
+	x, y = solve_right_unit_triangle(unit_magnitude, direction - quadrant * np.pi / 2)
+	cos = _QUADRANT_COS[quadrant]
+	sin = _QUADRANT_SIN[quadrant]
+	offsets = np.stack([x * cos - y * sin, x * sin + y * cos], axis=-1)
 
 	offsets = offsets * 180 / np.pi
 
 	return origin + offsets
 
-def circle(center, radius):
-	n = 40
+def circle(center, radius, n=40):
 	steps = np.linspace(0, 2 * np.pi, num=n, endpoint=False)
-	return np.array([point(center, radius, step) for step in steps])
+	return point(center, radius, steps)
 
+# Center may be an array of points with start an array of directions to generate many arcs at once.
+# Returns an array of shape (..., n, 2).
 def arc(center, radius, start, angle, n=10):
-	steps = np.linspace(start, start + angle, num=n)
-	return np.array([point(center, radius, step) for step in steps])
+	center = np.asarray(center, dtype=float)
+	steps = np.asarray(start, dtype=float)[..., None] + np.linspace(0, angle, num=n)
+	return point(center[..., None, :], radius, steps)
 
+# Start may be an array of points with direction an array of directions to generate many lines at once.
+# Returns an array of shape (..., n, 2).
 def line(start, magnitude, direction, n=10):
+	start = np.asarray(start, dtype=float)
 	steps = np.linspace(0, magnitude, num=n)
-	return np.array([point(start, step, direction) for step in steps])
+	return point(start[..., None, :], steps, np.asarray(direction, dtype=float)[..., None])
+
+# Inner and outer edges of a 400m track around center, with the straights along direction.
+# Each straight and corner edge has n points. Center may be an array of points and direction an array of
+# directions, which broadcast together, to generate many candidate tracks at once.
+# Returns an array of shape (..., 8 * n, 2).
+def track(center, direction, n=10):
+	center = np.asarray(center, dtype=float)
+	direction = np.asarray(direction, dtype=float)
+	shape = np.broadcast_shapes(center.shape[:-1], direction.shape)
+	center = np.broadcast_to(center, shape + (2,))
+	direction = np.broadcast_to(direction, shape)
+	track_width = TRACK_LANES * TRACK_LANE_WIDTH
+	track_points = np.empty(shape + (8 * n, 2))
 
-def track(center, direction):
-	track_width = 8 * 1.220
 	# Calculate front straight
-	center_to_front_magnitude = np.sqrt((84.39/2)**2 + 36.5**2)
-	center_to_front_direction = np.arctan(36.5/(84.39/2)) + np.pi + direction
+	center_to_front_magnitude = np.sqrt((TRACK_STRAIGHT/2)**2 + TRACK_RADIUS**2)
+	center_to_front_direction = np.arctan(TRACK_RADIUS/(TRACK_STRAIGHT/2)) + np.pi + direction
 	front_start_point = point(center, center_to_front_magnitude, center_to_front_direction)
 	front_start_point_outer = point(front_start_point, track_width, 3 * np.pi / 2 + direction)
-	front_straight = line(front_start_point, 84.39, direction)
-	front_straight_outer = line(front_start_point_outer, 84.39, direction)
-	track_points = np.append(front_straight, front_straight_outer, 0)
+	track_points[..., 0:n, :] = line(front_start_point, TRACK_STRAIGHT, direction, n)
+	track_points[..., n:2*n, :] = line(front_start_point_outer, TRACK_STRAIGHT, direction, n)
 
 	# Calculate first corner
-	first_corner_center = point(center, 84.39/2, direction)
-	first_corner = arc(first_corner_center, 36.5, 3*np.pi/2 + direction, np.pi)
-	first_corner_outer = arc(first_corner_center, 36.5 + track_width, 3*np.pi/2 + direction, np.pi)
-	track_points = np.append(track_points, first_corner, 0)
-	track_points = np.append(track_points, first_corner_outer, 0)
+	first_corner_center = point(center, TRACK_STRAIGHT/2, direction)
+	track_points[..., 2*n:3*n, :] = arc(first_corner_center, TRACK_RADIUS, 3*np.pi/2 + direction, np.pi, n)
+	track_points[..., 3*n:4*n, :] = arc(first_corner_center, TRACK_RADIUS + track_width, 3*np.pi/2 + direction, np.pi, n)
 
 	# Calculate back straight
-	center_to_back_magnitude = np.sqrt((84.39/2)**2 + 36.5**2)
-	center_to_back_direction = np.arctan(36.5/(84.39/2)) + direction
+	center_to_back_magnitude = np.sqrt((TRACK_STRAIGHT/2)**2 + TRACK_RADIUS**2)
+	center_to_back_direction = np.arctan(TRACK_RADIUS/(TRACK_STRAIGHT/2)) + direction
 	back_start_point = point(center, center_to_back_magnitude, center_to_back_direction)
 	back_start_point_outer = point(back_start_point, track_width, np.pi / 2 + direction)
-	back_straight = line(back_start_point, 84.39, np.pi + direction)
-	back_straight_outer = line(back_start_point_outer, 84.39, np.pi + direction)
-	track_points = np.append(track_points, back_straight, 0)
-	track_points = np.append(track_points, back_straight_outer, 0)
+	track_points[..., 4*n:5*n, :] = line(back_start_point, TRACK_STRAIGHT, np.pi + direction, n)
+	track_points[..., 5*n:6*n, :] = line(back_start_point_outer, TRACK_STRAIGHT, np.pi + direction, n)
 
 	# Calculate second corner
-	second_corner_center = point(center, 84.39/2, np.pi + direction)
-	second_corner = arc(second_corner_center, 36.5, np.pi/2 + direction, np.pi)
-	second_corner_outer = arc(second_corner_center, 36.5 + track_width, np.pi/2 + direction, np.pi)
-	track_points = np.append(track_points, second_corner, 0)
-	track_points = np.append(track_points, second_corner_outer, 0)
+	second_corner_center = point(center, TRACK_STRAIGHT/2, np.pi + direction)
+	track_points[..., 6*n:7*n, :] = arc(second_corner_center, TRACK_RADIUS, np.pi/2 + direction, np.pi, n)
+	track_points[..., 7*n:8*n, :] = arc(second_corner_center, TRACK_RADIUS + track_width, np.pi/2 + direction, np.pi, n)
 
 	return track_points
-
-def decode_heart_rate_measurement(bs):
-	c1 = (bs[0] & 0x1) == 0
-	c2 = (bs[0] & 0x1) > 0
-	c3 = (bs[0] & 0x8) > 0
-	c4 = (bs[0] & 0x10) > 0
-	if c1:
-		value = struct.unpack('<B', bs[1:2])[0]
-		if c3:
-			energy = struct.unpack('<H', bs[2:4])[0]
-			if c4:
-				rr_intervals = [struct.unpack('<H', bs[i:i+2])[0] for i in range(4,len(bs),2)]
-				return value, energy, rr_intervals
-		elif c4:
-			rr_intervals = [struct.unpack('<H', bs[i:i+2])[0] for i in range(2,len(bs),2)]
-			return value, None, rr_intervals
-		return value, None, None
-	if c2:
-		value = struct.unpack('<H', bs[1:3])[0]
-		if c3:
-			energy = struct.unpack('<H', bs[3:5])[0]
-			if c4:
-				rr_intervals = [struct.unpack('<H', bs[i:i+2])[0] for i in range(5,len(bs),2)]
-				return value, energy, rr_intervals
-		elif c4:
-			rr_intervals = [struct.unpack('<H', bs[i:i+2])[0] for i in range(3,len(bs),2)]
-			return value, None, rr_intervals
-		return value, None, None
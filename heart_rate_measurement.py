@@ -0,0 +1,77 @@
+import base64
+import numpy as np
+
+# Heart Rate Measurement characteristic flags
+# https://www.bluetooth.com/specifications/specs/heart-rate-service-1-0/
+HEART_RATE_FORMAT = 0x01
+ENERGY_EXPENDED_STATUS = 0x08
+RR_INTERVAL_FLAG = 0x10
+
+# Byte layout of a measurement for every possible flags byte.
+# The heart rate is a uint8 or uint16 after the flags, followed by the optional energy expended uint16,
+# followed by the optional list of uint16 RR intervals.
+_flags = np.arange(256)
+HEART_RATE_WIDTH = np.where(_flags & HEART_RATE_FORMAT, 2, 1)
+ENERGY_OFFSET = 1 + HEART_RATE_WIDTH
+RR_OFFSET = ENERGY_OFFSET + np.where(_flags & ENERGY_EXPENDED_STATUS, 2, 0)
+
+# Value of each base64 character. Padding and the null bytes filling numpy's fixed width strings are 0.
+_BASE64_VALUES = np.zeros(256, dtype=np.uint8)
+_BASE64_VALUES[np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/', dtype=np.uint8)] = np.arange(64)
+
+# Decode an array of base64 strings into a zero padded byte matrix with one row per packet.
+# Returns the matrix and the length of each packet.
+def base64_decode(encoded):
+	encoded = np.asarray(encoded, dtype=bytes)
+	n = len(encoded)
+	width = -(-encoded.itemsize // 4) * 4
+	characters = np.zeros((n, width), dtype=np.uint8)
+	if n:
+		characters[:,:encoded.itemsize] = encoded.view(np.uint8).reshape(n, encoded.itemsize)
+	is_data = (characters != 0) & (characters != ord('='))
+	lengths = np.count_nonzero(is_data, axis=1) * 6 // 8
+	sextets = _BASE64_VALUES[characters].reshape(n, width // 4, 4)
+	# Every group of 4 six bit characters holds 3 bytes
+	packets = np.empty((n, width // 4, 3), dtype=np.uint8)
+	packets[:,:,0] = (sextets[:,:,0] << 2) | (sextets[:,:,1] >> 4)
+	packets[:,:,1] = (sextets[:,:,1] << 4) | (sextets[:,:,2] >> 2)
+	packets[:,:,2] = (sextets[:,:,2] << 6) | sextets[:,:,3]
+	return packets.reshape(n, width // 4 * 3), lengths
+
+# Decode every base64 encoded measurement of a split at once.
+# Returns the heart rate of each packet, the energy expended of each packet (NaN when absent),
+# all RR intervals in 1/1024 seconds, and offsets such that the RR intervals of packet i are
+# rr_intervals[rr_offsets[i]:rr_offsets[i+1]].
+def decode_measurements(encoded):
+	packets, lengths = base64_decode(encoded)
+	n = len(packets)
+	# Pad so that reading a field a truncated packet claims to have stays in bounds
+	packets = np.pad(packets, ((0, 0), (0, 4))).astype(np.int64)
+	rows = np.arange(n)
+	flags = packets[:,0]
+
+	heart_rate = packets[:,1] | np.where(HEART_RATE_WIDTH[flags] == 2, packets[:,2] << 8, 0)
+
+	energy_offset = ENERGY_OFFSET[flags]
+	energy = (packets[rows, energy_offset] | (packets[rows, energy_offset + 1] << 8)).astype(float)
+	energy[(flags & ENERGY_EXPENDED_STATUS) == 0] = np.nan
+
+	rr_offset = RR_OFFSET[flags]
+	rr_counts = np.where(flags & RR_INTERVAL_FLAG, np.maximum(lengths - rr_offset, 0) // 2, 0)
+	rr_offsets = np.zeros(n + 1, dtype=np.int64)
+	np.cumsum(rr_counts, out=rr_offsets[1:])
+	# Gather a (packets, most RR intervals in a packet) grid and keep the entries each packet has
+	steps = np.arange(np.max(rr_counts, initial=0))
+	columns = rr_offset[:,None] + 2 * steps
+	present = steps < rr_counts[:,None]
+	columns = np.where(present, columns, 0)
+	rr_intervals = packets[rows[:,None], columns] | (packets[rows[:,None], columns + 1] << 8)
+	rr_intervals = rr_intervals[present]
+
+	return heart_rate, energy, rr_intervals, rr_offsets
+
+# Decode a single measurement from raw bytes
+def decode_measurement(bs):
+	heart_rate, energy, rr_intervals, _ = decode_measurements([base64.b64encode(bs)])
+	energy = None if np.isnan(energy[0]) else int(energy[0])
+	return int(heart_rate[0]), energy, [int(rr) for rr in rr_intervals]
@@ -0,0 +1,112 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import geodesy
+import loader
+import recording
+import streaming
+
+# Default number of cells along the longer side of a heatmap grid
+WIDTH = 1024
+# Fixes projected and counted at a time
+CHUNK_SIZE = 1 << 18
+
+# Matrices of at most chunk_size fixes of every split of a recording. Cached splits are memory-mapped and sliced,
+# and otherwise the file is read incrementally, so only one chunk is in memory at a time.
+def location_chunks(path, chunk_size=CHUNK_SIZE, use_cache=True):
+	if not use_cache:
+		yield from streaming.location_chunks(path, chunk_size=chunk_size)
+		return
+	for data, _, _ in recording.load_splits(path):
+		for start in range(0, len(data), chunk_size):
+			yield data[start:start + chunk_size]
+
+# Mercator x and y of geodesy.project_longitude and project_latitude, with NaN for fixes out of range
+def project(longitude, latitude):
+	return geodesy.project_longitude(longitude, 'mask'), geodesy.project_latitude(latitude, 'mask')
+
+# Longitude and latitude bounds (west, south, east, north) of the fixes of a recording, or None without any
+def extent(path, chunk_size=CHUNK_SIZE, use_cache=True):
+	bounds = np.array([np.inf, np.inf, -np.inf, -np.inf])
+	for chunk in location_chunks(path, chunk_size, use_cache):
+		longitude = chunk[:,loader.LOCATION_COLUMNS['longitude']]
+		latitude = chunk[:,loader.LOCATION_COLUMNS['latitude']]
+		valid = (np.abs(longitude) <= 180) & (np.abs(latitude) < 90)
+		if np.any(valid):
+			bounds = np.concatenate([np.fmin(bounds[:2], [np.min(longitude[valid]), np.min(latitude[valid])]),
+				np.fmax(bounds[2:], [np.max(longitude[valid]), np.max(latitude[valid])])])
+	return tuple(bounds) if np.all(np.isfinite(bounds)) else None
+
+# Bounds covering every bounds in a sequence, ignoring None
+def union(bounds):
+	bounds = np.array([b for b in bounds if b is not None])
+	if len(bounds) == 0:
+		return None
+	return (np.min(bounds[:,0]), np.min(bounds[:,1]), np.max(bounds[:,2]), np.max(bounds[:,3]))
+
+# Mercator bounds (west, south, east, north) of longitude and latitude bounds
+def projected_bounds(bounds):
+	west, south = project(np.array(bounds[0]), np.array(bounds[1]))
+	east, north = project(np.array(bounds[2]), np.array(bounds[3]))
+	return float(west), float(south), float(east), float(north)
+
+# Shape (rows, columns) of a grid with width cells along the longer side of bounds and square cells in the
+# Mercator projection, so its size is at most width by width whatever the aspect of the bounds
+def grid_shape(bounds, width=WIDTH):
+	west, south, east, north = projected_bounds(bounds)
+	span = max(east - west, north - south)
+	if span <= 0:
+		return 1, 1
+	return max(int(round(width * (north - south) / span)), 1), max(int(round(width * (east - west) / span)), 1)
+
+# Add the number of fixes in each cell of the grid over bounds to grid, in place. Rows go from south to north.
+def accumulate(grid, bounds, longitude, latitude):
+	rows, columns = grid.shape
+	west, south, east, north = projected_bounds(bounds)
+	x, y = project(longitude, latitude)
+	# Fixes on the east and north bounds belong to the last cells
+	column = np.floor((x - west) / max(east - west, 1e-12) * columns)
+	row = np.floor((y - south) / max(north - south, 1e-12) * rows)
+	column[x == east] = columns - 1
+	row[y == north] = rows - 1
+	inside = (column >= 0) & (column < columns) & (row >= 0) & (row < rows)
+	cells = row[inside].astype(np.int64) * columns + column[inside].astype(np.int64)
+	grid += np.bincount(cells, minlength=rows * columns).reshape(rows, columns).astype(grid.dtype, copy=False)
+	return grid
+
+# Grid of the number of fixes of a recording in each cell over bounds, counted chunk_size fixes at a time
+def file_grid(path, bounds, shape, chunk_size=CHUNK_SIZE, use_cache=True):
+	grid = np.zeros(shape, dtype=np.int64)
+	for chunk in location_chunks(path, chunk_size, use_cache):
+		accumulate(grid, bounds, chunk[:,loader.LOCATION_COLUMNS['longitude']], chunk[:,loader.LOCATION_COLUMNS['latitude']])
+	return grid
+
+# Density of the fixes of many recordings on one grid of width cells along the longer side of bounds, by default the bounds of
+# every fix. Files are counted in a pool of jobs processes and each grid is added to the total as it completes, so
+# memory is bounded by the grid size and the number of jobs rather than the number of fixes. Files that fail are
+# reported and left out. Returns the grid, its bounds and the number of files that failed.
+def heatmap(paths, bounds=None, width=WIDTH, jobs=None, chunk_size=CHUNK_SIZE, use_cache=True):
+	total = len(paths)
+	counted = 0
+	with ProcessPoolExecutor(max_workers=jobs) as executor:
+		if bounds is None:
+			extents = list(_completed(executor, extent, paths, chunk_size, use_cache))
+			paths = [path for path, _ in extents]
+			bounds = union(bounds for _, bounds in extents)
+			if bounds is None:
+				raise ValueError("No valid fixes to bound a heatmap")
+		shape = grid_shape(bounds, width)
+		grid = np.zeros(shape, dtype=np.int64)
+		for _, partial in _completed(executor, file_grid, paths, bounds, shape, chunk_size, use_cache):
+			grid += partial
+			counted += 1
+	return grid, bounds, total - counted
+
+# Yields (path, result) of function(path, *args) for each path in a pool as they complete, reporting failures
+def _completed(executor, function, paths, *args):
+	futures = {executor.submit(function, path, *args): path for path in paths}
+	for future in as_completed(futures):
+		try:
+			yield futures[future], future.result()
+		except Exception as e:
+			print(f"Failed: {futures[future]} {e!r}", file=sys.stderr)
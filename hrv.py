@@ -0,0 +1,151 @@
+import numpy as np
+
+# Milliseconds per unit of the RR intervals decoded from the heart rate measurement
+RR_UNIT = 1000 / 1024
+# Frequency bands of low and high frequency power in Hz
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.4)
+# Keys of the sliding time domain metrics
+WINDOW_METRICS = ['time', 'beats', 'mean_nn', 'sdnn', 'rmssd', 'pnn50']
+SPECTRUM_METHODS = ['welch', 'lomb']
+
+# RR intervals in milliseconds from the 1/1024 second units of heart_rate_measurement.decode_measurements
+def milliseconds(rr_intervals):
+	return np.asarray(rr_intervals, dtype=float).reshape(-1) * RR_UNIT
+
+# Time in seconds at the end of each beat from the start of the first, including artifacts so that
+# removing beats does not shift the ones after them
+def beat_times(rr):
+	return np.cumsum(rr) / 1000
+
+# Mask of normal beats among RR intervals in milliseconds. Intervals outside low to high are artifacts, and so
+# are ectopic beats, which differ from the median of the window beats around them by more than threshold of it.
+# Intervals outside the range are replaced by the median of the rest before taking window medians so that a
+# run of dropped beats does not hide the beats around it.
+def normal_beats(rr, low=300.0, high=2000.0, threshold=0.2, window=11):
+	rr = np.asarray(rr, dtype=float)
+	in_range = (rr >= low) & (rr <= high)
+	if len(rr) == 0 or not np.any(in_range):
+		return in_range
+	filled = np.where(in_range, rr, np.median(rr[in_range]))
+	half = min(window, len(rr)) // 2
+	padded = np.pad(filled, half, mode='reflect')
+	local = np.median(np.lib.stride_tricks.sliding_window_view(padded, 2 * half + 1), axis=-1)
+	return in_range & (np.abs(rr - local) <= threshold * local)
+
+# Time domain metrics of the normal beats of RR intervals in milliseconds in windows of window seconds every step
+# seconds, as a dict of WINDOW_METRICS. Beats belong to a window when they end in it and successive differences
+# when both of their beats are normal and in it. Every metric is a difference of cumulative sums at the window
+# bounds, so this is linear in the number of beats whatever the window. Time is the end of each window, SDNN is
+# the sample standard deviation and pNN50 the percentage of successive differences over 50 ms.
+def sliding_metrics(rr, normal=None, window=300.0, step=30.0):
+	rr = np.asarray(rr, dtype=float)
+	time = beat_times(rr)
+	end = time[-1] if len(time) else 0.0
+	starts = np.arange(0.0, max(end - window, 0.0) + step / 2, step)
+	return _window_metrics(rr, normal, time, starts, starts + window)
+
+# Time domain metrics over every normal beat, as a dict of WINDOW_METRICS without time
+def time_domain(rr, normal=None):
+	rr = np.asarray(rr, dtype=float)
+	metrics = _window_metrics(rr, normal, beat_times(rr), np.array([-np.inf]), np.array([np.inf]))
+	return {name: metrics[name][0].item() for name in WINDOW_METRICS[1:]}
+
+def _window_metrics(rr, normal, time, starts, ends):
+	if normal is None:
+		normal = normal_beats(rr)
+	first = np.searchsorted(time, starts, side='right')
+	last = np.searchsorted(time, ends, side='right')
+
+	# Centered before summing squares so the differences of sums do not lose precision on long sessions
+	center = np.mean(rr[normal]) if np.any(normal) else 0.0
+	nn = np.where(normal, rr - center, 0.0)
+	beats = _window_sums(normal, first, last)
+	total = _window_sums(nn, first, last)
+	squares = _window_sums(nn ** 2, first, last)
+
+	successive = normal[1:] & normal[:-1]
+	difference = np.where(successive, np.diff(rr), 0.0)
+	# Difference i is between beats i and i + 1, so it is in a window when beat i + 1 is
+	pairs = _window_sums(successive, first, np.maximum(last - 1, first))
+	difference_squares = _window_sums(difference ** 2, first, np.maximum(last - 1, first))
+	over_50 = _window_sums(np.abs(difference) > 50, first, np.maximum(last - 1, first))
+
+	with np.errstate(invalid='ignore', divide='ignore'):
+		mean = total / beats
+		return {
+			'time': ends,
+			'beats': beats.astype(int),
+			'mean_nn': np.where(beats > 0, center + mean, np.nan),
+			'sdnn': np.where(beats > 1, np.sqrt(np.maximum(squares - beats * mean ** 2, 0) / (beats - 1)), np.nan),
+			'rmssd': np.where(pairs > 0, np.sqrt(difference_squares / pairs), np.nan),
+			'pnn50': np.where(pairs > 0, 100 * over_50 / pairs, np.nan),
+		}
+
+# Sum of values[first:last] for every pair of bounds
+def _window_sums(values, first, last):
+	sums = np.zeros(len(values) + 1)
+	np.cumsum(values, out=sums[1:])
+	return sums[last] - sums[first]
+
+# Power spectral density in ms²/Hz of the normal beats of RR intervals in milliseconds, as frequencies and power.
+# Welch resamples the beats on a regular grid of sample_rate Hz and averages the periodograms of Hann windowed
+# halves of overlapping segments of segment seconds. Linear resampling damps frequencies approaching half the
+# heart rate, so high frequency power is somewhat low. Lomb-Scargle uses the beats as they are, but its cost is
+# the number of beats times the session length in seconds, so it suits short windows.
+def spectrum(rr, normal=None, method='welch', sample_rate=4.0, segment=256.0, frequencies=None):
+	rr = np.asarray(rr, dtype=float)
+	if normal is None:
+		normal = normal_beats(rr)
+	time = beat_times(rr)[normal]
+	nn = rr[normal]
+	if method not in SPECTRUM_METHODS:
+		raise ValueError(f"Unknown spectrum method {method}, expected one of {SPECTRUM_METHODS}")
+	if len(nn) < 4 or time[-1] <= time[0]:
+		return np.zeros(0), np.zeros(0)
+
+	if method == 'lomb':
+		# scipy is only needed for Lomb-Scargle so the default spectrum does not pay for importing it
+		from scipy import signal
+		if frequencies is None:
+			# Spaced by the resolution of the session so band powers sum every peak once
+			resolution = 1 / (time[-1] - time[0])
+			frequencies = np.arange(resolution, HF_BAND[1] + resolution, resolution)
+		power = signal.lombscargle(time, nn - np.mean(nn), 2 * np.pi * frequencies)
+		# Scaled so that a sine of amplitude A has a total power of A² / 2 as in a one-sided density
+		return frequencies, power * 2 * (time[-1] - time[0]) / len(nn)
+
+	grid = np.arange(time[0], time[-1], 1 / sample_rate)
+	resampled = np.interp(grid, time, nn)
+	length = min(len(resampled), int(segment * sample_rate))
+	segments = np.lib.stride_tricks.sliding_window_view(resampled, length)[::max(length // 2, 1)]
+	segments = segments - np.mean(segments, axis=-1, keepdims=True)
+	hann = np.hanning(length)
+	power = np.abs(np.fft.rfft(segments * hann, axis=-1)) ** 2 / (sample_rate * np.sum(hann ** 2))
+	# One-sided, so every frequency but zero and Nyquist has the power of its negative twin
+	power[:, 1:(length + 1) // 2] *= 2
+	return np.fft.rfftfreq(length, 1 / sample_rate), np.mean(power, axis=0)
+
+# Power in ms² of a spectrum between the bounds of band
+def band_power(frequencies, power, band):
+	if len(frequencies) < 2:
+		return np.nan
+	inside = (frequencies >= band[0]) & (frequencies < band[1])
+	return np.sum(power[inside]) * (frequencies[1] - frequencies[0])
+
+# Low and high frequency power and their ratio
+def frequency_domain(rr, normal=None, method='welch'):
+	frequencies, power = spectrum(rr, normal, method)
+	lf = band_power(frequencies, power, LF_BAND)
+	hf = band_power(frequencies, power, HF_BAND)
+	return {'lf': lf, 'hf': hf, 'lf_hf': lf / hf if hf > 0 else np.nan}
+
+# Heart rate variability of a session from its decoded RR intervals: the number of artifacts, and the time and
+# frequency domain metrics of the normal beats
+def summary(rr_intervals, method='welch'):
+	rr = milliseconds(rr_intervals)
+	normal = normal_beats(rr)
+	metrics = {'artifacts': int(np.count_nonzero(~normal))}
+	metrics.update(time_domain(rr, normal))
+	metrics.update(frequency_domain(rr, normal, method))
+	return metrics
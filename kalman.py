@@ -0,0 +1,201 @@
+import numpy as np
+import loader
+import timeline
+from projections import LocalProjection
+
+# Columns of filtered and smoothed states: position in meters and velocity in m/s along east and north
+STATE_COLUMNS = ['east', 'velocity_east', 'north', 'velocity_north']
+
+# Kalman filter of positions and velocities with a constant velocity model driven by white noise acceleration.
+# Each fix measures position with the variance of its horizontal accuracy and velocity with the variance of its
+# speed and course accuracy. Both are isotropic, so east and north share one covariance, which is kept as the
+# three distinct terms of the symmetric 2x2 matrix of position and velocity along one axis.
+# Fixes arrive in chunks of any size through update(), and only the last state is kept between chunks,
+# so a stream can be filtered in bounded memory. Pass every filtered chunk to smooth() for the RTS smoother.
+class ConstantVelocityFilter:
+	def __init__(self, acceleration=1.0, initial_velocity_variance=100.0):
+		# Standard deviation of acceleration in m/s^2
+		self.acceleration = acceleration
+		self.initial_velocity_variance = initial_velocity_variance
+		self.time = None
+		self.state = None
+		self.covariance = None
+
+	# Filter a chunk of fixes in time order. Positions and velocities are (n, 2) east and north, and variances
+	# are (n,) with infinity or NaN where a measurement is missing. Returns the filtered (n, 4) states with the
+	# columns of STATE_COLUMNS and (n, 3) covariances of position, position and velocity, and velocity.
+	def update(self, time, positions, position_variance, velocities, velocity_variance):
+		n = len(time)
+		states = np.empty((n, 4))
+		covariances = np.empty((n, 3))
+		if n == 0:
+			return states, covariances
+		# Missing measurements have no weight
+		position_variance = np.where(np.isfinite(position_variance) & np.all(np.isfinite(positions), axis=1), position_variance, np.inf)
+		velocity_variance = np.where(np.isfinite(velocity_variance) & np.all(np.isfinite(velocities), axis=1), velocity_variance, np.inf)
+		positions = np.where(np.isfinite(position_variance)[:,None], positions, 0.0)
+		velocities = np.where(np.isfinite(velocity_variance)[:,None], velocities, 0.0)
+
+		# The recursion is sequential, so it runs over Python floats, which are much cheaper than numpy calls on a
+		# handful of values, and writes each step into the preallocated arrays
+		q = self.acceleration ** 2
+		time_list = time.tolist()
+		east, north = positions.T.tolist()
+		velocity_east, velocity_north = velocities.T.tolist()
+		r_position = position_variance.tolist()
+		r_velocity = velocity_variance.tolist()
+		start = 0
+		if self.state is None:
+			x0, x1, x2, x3, p00, p01, p11 = self._initial_state(r_position[0], east[0], north[0], r_velocity[0], velocity_east[0], velocity_north[0])
+			previous = time_list[0]
+			states[0] = x0, x1, x2, x3
+			covariances[0] = p00, p01, p11
+			start = 1
+		else:
+			x0, x1, x2, x3 = self.state
+			p00, p01, p11 = self.covariance
+			previous = self.time
+		for k in range(start, n):
+			dt = time_list[k] - previous
+			previous = time_list[k]
+			# Predict
+			x0 += dt * x1
+			x2 += dt * x3
+			dt2 = dt * dt
+			p00 += 2 * dt * p01 + dt2 * p11 + q * dt2 * dt2 / 4
+			p01 += dt * p11 + q * dt2 * dt / 2
+			p11 += q * dt2
+			# Update with the position
+			r = r_position[k]
+			if r != np.inf:
+				s = p00 + r
+				k0 = p00 / s
+				k1 = p01 / s
+				y0 = east[k] - x0
+				y2 = north[k] - x2
+				x0 += k0 * y0
+				x1 += k1 * y0
+				x2 += k0 * y2
+				x3 += k1 * y2
+				p00, p01, p11 = p00 - k0 * p00, p01 - k0 * p01, p11 - k1 * p01
+			# Update with the velocity
+			r = r_velocity[k]
+			if r != np.inf:
+				s = p11 + r
+				k0 = p01 / s
+				k1 = p11 / s
+				y1 = velocity_east[k] - x1
+				y3 = velocity_north[k] - x3
+				x0 += k0 * y1
+				x1 += k1 * y1
+				x2 += k0 * y3
+				x3 += k1 * y3
+				p00, p01, p11 = p00 - k0 * p01, p01 - k0 * p11, p11 - k1 * p11
+			states[k] = x0, x1, x2, x3
+			covariances[k] = p00, p01, p11
+		self.time = previous
+		self.state = (x0, x1, x2, x3)
+		self.covariance = (p00, p01, p11)
+		return states, covariances
+
+	# The first fix sets the state, with a wide variance for anything it does not measure
+	def _initial_state(self, r_position, east, north, r_velocity, velocity_east, velocity_north):
+		if r_position == np.inf:
+			east, north, r_position = 0.0, 0.0, 1e12
+		if r_velocity == np.inf:
+			velocity_east, velocity_north, r_velocity = 0.0, 0.0, self.initial_velocity_variance
+		return east, velocity_east, north, velocity_north, r_position, 0.0, r_velocity
+
+# Rauch-Tung-Striebel smoothing of filtered states and covariances from ConstantVelocityFilter.update.
+# The smoother gains only depend on the filtered covariances, so they are computed over whole arrays, and only
+# the backward pass over the states is sequential. Returns the smoothed (n, 4) states.
+def smooth(time, states, covariances, acceleration=1.0):
+	n = len(time)
+	smoothed = np.empty((n, 4))
+	if n == 0:
+		return smoothed
+	q = acceleration ** 2
+	dt = np.diff(time)
+	p00, p01, p11 = covariances[:-1].T
+	# Prediction of each next step from the filtered step before it
+	predicted00 = p00 + 2 * dt * p01 + dt ** 2 * p11 + q * dt ** 4 / 4
+	predicted01 = p01 + dt * p11 + q * dt ** 3 / 2
+	predicted11 = p11 + q * dt ** 2
+	# Gain C = P F^T (F P F^T + Q)^-1 with F = [[1, dt], [0, 1]]
+	cross00 = p00 + dt * p01
+	cross01 = p01
+	cross10 = p01 + dt * p11
+	cross11 = p11
+	determinant = predicted00 * predicted11 - predicted01 ** 2
+	c00 = (cross00 * predicted11 - cross01 * predicted01) / determinant
+	c01 = (cross01 * predicted00 - cross00 * predicted01) / determinant
+	c10 = (cross10 * predicted11 - cross11 * predicted01) / determinant
+	c11 = (cross11 * predicted00 - cross10 * predicted01) / determinant
+
+	smoothed[-1] = states[-1]
+	gains = np.column_stack([c00, c01, c10, c11]).tolist()
+	filtered = states.tolist()
+	dt_list = dt.tolist()
+	s0, s1, s2, s3 = filtered[-1]
+	for k in range(n - 2, -1, -1):
+		f0, f1, f2, f3 = filtered[k]
+		g00, g01, g10, g11 = gains[k]
+		d = dt_list[k]
+		# Difference between the smoothed next state and its prediction from this filtered state
+		y0 = s0 - (f0 + d * f1)
+		y1 = s1 - f1
+		y2 = s2 - (f2 + d * f3)
+		y3 = s3 - f3
+		s0, s1, s2, s3 = f0 + g00 * y0 + g01 * y1, f1 + g10 * y0 + g11 * y1, f2 + g00 * y2 + g01 * y3, f3 + g10 * y2 + g11 * y3
+		smoothed[k] = s0, s1, s2, s3
+	return smoothed
+
+# Measurements of a location matrix with columns of loader.LOCATION_PROPERTIES, sorted by time, in projection.
+# Returns positions, their variance, velocities and their variance. Velocity variance is the larger of the
+# along track and across track variance so it holds in every direction. Negative values mark invalid values.
+def measurements(data, projection):
+	columns = loader.LOCATION_COLUMNS
+	positions = projection.positions(data)
+	horizontal_accuracy = data[:,columns['horizontalAccuracy']]
+	position_variance = np.where(horizontal_accuracy >= 0, horizontal_accuracy ** 2, np.inf)
+
+	speed = data[:,columns['speed']]
+	course = data[:,columns['course']]
+	speed_accuracy = data[:,columns['speedAccuracy']]
+	course_accuracy = data[:,columns['courseAccuracy']]
+	θ = np.radians(course)
+	velocities = np.column_stack([speed * np.sin(θ), speed * np.cos(θ)])
+	valid = (speed >= 0) & (course >= 0) & (speed_accuracy >= 0) & (course_accuracy >= 0)
+	velocity_variance = np.where(valid, np.maximum(speed_accuracy ** 2, (speed * np.radians(course_accuracy)) ** 2), np.inf)
+	return positions, position_variance, velocities, velocity_variance
+
+# Smoothed states of a location matrix in projection, around the median position by default.
+# With a chunk_size, fixes are filtered chunk_size at a time as they would be from a stream.
+def smooth_states(data, projection=None, acceleration=1.0, chunk_size=None):
+	data = timeline.sort_by_time(data)
+	if projection is None:
+		projection = LocalProjection.from_data(data)
+	time = data[:,0]
+	positions, position_variance, velocities, velocity_variance = measurements(data, projection)
+	kalman_filter = ConstantVelocityFilter(acceleration)
+	chunk_size = max(len(time), 1) if chunk_size is None else chunk_size
+	states = np.empty((len(time), 4))
+	covariances = np.empty((len(time), 3))
+	for start in range(0, len(time), chunk_size):
+		end = start + chunk_size
+		states[start:end], covariances[start:end] = kalman_filter.update(time[start:end], positions[start:end], position_variance[start:end], velocities[start:end], velocity_variance[start:end])
+	return smooth(time, states, covariances, acceleration)
+
+# Location matrix sorted by time with longitude and latitude replaced by the smoothed positions, so distance,
+# pace, laps and figures can use it in place of the recorded fixes
+def smooth_locations(data, projection=None, acceleration=1.0):
+	data = timeline.sort_by_time(data)
+	if len(data) == 0:
+		return data.copy()
+	if projection is None:
+		projection = LocalProjection.from_data(data)
+	states = smooth_states(data, projection, acceleration)
+	smoothed = np.array(data)
+	columns = loader.LOCATION_COLUMNS
+	smoothed[:,columns['longitude']], smoothed[:,columns['latitude']], _ = projection.inverse(states[:,0], states[:,2])
+	return smoothed
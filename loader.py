@@ -0,0 +1,141 @@
+import json
+import numpy as np
+
+LOCATION_PROPERTIES = ['timeInterval', 'longitude', 'latitude', 'altitude', 'horizontalAccuracy', 'verticalAccuracy', 'speed', 'speedAccuracy', 'course', 'courseAccuracy']
+BLUETOOTH_PROPERTIES = ['timeInterval', 'value']
+ACCELERATION_PROPERTIES = ['timestamp', 'x', 'y', 'z']
+
+# Column index of each location property in the matrix returned by locations()
+LOCATION_COLUMNS = {prop: i for i, prop in enumerate(LOCATION_PROPERTIES)}
+
+CHUNK_SIZE = 1 << 16
+
+# Matrix of numeric properties from a sequence of records, filled in one pass.
+# Missing properties and nulls become NaN. Records may be a list or any iterable, such as a stream.
+def columns(records, properties):
+	dtype = np.dtype([(prop, float) for prop in properties])
+	# Missing properties are None, which numpy converts to NaN
+	rows = (tuple(map(record.get, properties)) for record in records)
+	count = len(records) if hasattr(records, '__len__') else -1
+	table = np.fromiter(rows, dtype=dtype, count=count)
+	# Every field is a float so the structured array is also a plain matrix
+	return table.view(float).reshape(-1, len(properties))
+
+def locations(split):
+	return columns(split.get('locations', []), LOCATION_PROPERTIES)
+
+# Returns time as floats and the base64 encoded measurements as a bytes array
+def bluetooth_values(split):
+	values = split.get('bluetoothValues', [])
+	time = np.fromiter((value.get('timeInterval', np.nan) for value in values), dtype=float, count=len(values))
+	encoded = np.array([value['value'] for value in values], dtype=bytes).reshape(-1)
+	return time, encoded
+
+def acceleration(records):
+	return columns(records, ACCELERATION_PROPERTIES)
+
+# Yields each element of the top level JSON array in a file.
+# When streaming only one element is decoded and held in memory at a time.
+def read_array(path, stream=False):
+	with open(path) as f:
+		if stream:
+			yield from iter_json_array(f)
+		else:
+			yield from json.load(f)
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+	yield from JSONReader(f, chunk_size).array()
+
+# Yields (split, key, record) for every record in the arrays named by keys in each split of a recording, in file
+# order, and (split, None, None) at the start of each split. Only a chunk of the file and one record are held in
+# memory however large the file or its splits are. Other members of splits are decoded and dropped.
+def iter_records(f, keys=('locations', 'bluetoothValues'), chunk_size=CHUNK_SIZE):
+	reader = JSONReader(f, chunk_size)
+	for split, _ in enumerate(reader.array(decode=False)):
+		yield split, None, None
+		for key in reader.members():
+			if key in keys:
+				for record in reader.array():
+					yield split, key, record
+			else:
+				reader.value()
+
+# Incremental reader of JSON text from a file, holding a chunk of it at a time.
+# Values are decoded whole by value(), while array() and members() step through arrays and objects so that
+# their elements can be read one at a time.
+class JSONReader:
+	def __init__(self, f, chunk_size=CHUNK_SIZE):
+		self.f = f
+		self.chunk_size = chunk_size
+		self.decoder = json.JSONDecoder()
+		self.buffer = ''
+		self.position = 0
+		self.eof = False
+
+	# Returns False at the end of the file
+	def _read(self):
+		# Grow reads geometrically so a large value is not rescanned once per chunk
+		chunk = self.f.read(max(self.chunk_size, len(self.buffer) - self.position))
+		self.eof = not chunk
+		self.buffer = self.buffer[self.position:] + chunk
+		self.position = 0
+		return not self.eof
+
+	# Next character other than whitespace without consuming it, or '' at the end of the file
+	def peek(self):
+		while True:
+			while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\r\n':
+				self.position += 1
+			if self.position < len(self.buffer):
+				return self.buffer[self.position]
+			if not self._read():
+				return ''
+
+	# Consume the next character, which must be one of characters
+	def expect(self, characters):
+		character = self.peek()
+		if character == '':
+			raise ValueError(f"Unexpected end of JSON, expected one of {characters!r}")
+		if character not in characters:
+			raise ValueError(f"Expected one of {characters!r}, found {character!r}")
+		self.position += 1
+		return character
+
+	def value(self):
+		self.peek()
+		while True:
+			try:
+				value, end = self.decoder.raw_decode(self.buffer, self.position)
+			except json.JSONDecodeError:
+				if self.eof:
+					raise
+			else:
+				# A number at the end of the buffer may continue in the next chunk
+				if end < len(self.buffer) or self.eof:
+					self.position = end
+					return value
+			self._read()
+
+	# Yields each element of an array. Without decode, yields None and the caller reads each element.
+	def array(self, decode=True):
+		self.expect('[')
+		if self.peek() == ']':
+			self.position += 1
+			return
+		while True:
+			yield self.value() if decode else None
+			if self.expect(',]') == ']':
+				return
+
+	# Yields the key of each member of an object, and the caller reads each value
+	def members(self):
+		self.expect('{')
+		if self.peek() == '}':
+			self.position += 1
+			return
+		while True:
+			key = self.value()
+			self.expect(':')
+			yield key
+			if self.expect(',}') == '}':
+				return
@@ -0,0 +1,98 @@
+import numpy as np
+import geodesy
+import hrv
+import timeline
+
+# Lower bound of each heart rate zone in BPM, 50% to 100% of a maximum of 190 in steps of 10%
+HEART_RATE_ZONES = [95, 114, 133, 152, 171, 190]
+ACCURACY_PERCENTILES = [50, 90, 99]
+
+# Metrics of a split or of a whole file from its parsed arrays, as a dict ready for JSON.
+# Locations and heart rate are sorted by time once and every metric is computed over whole columns.
+# Distances are in meters, times in seconds, pace in seconds per kilometer and RR statistics in milliseconds.
+# Distance is reported by every metric of geodesy.DISTANCE_METRICS, and speed and pace use metric.
+def split_metrics(data, heart_rate, rr_intervals, zones=HEART_RATE_ZONES, metric='haversine'):
+	sequential_data = timeline.sort_by_time(data)
+	time = sequential_data[:,0]
+	longitude = sequential_data[:,1]
+	latitude = sequential_data[:,2]
+	metrics = {}
+
+	metrics['fixes'] = len(sequential_data)
+	metrics['start'] = time[0] if len(time) else None
+	metrics['elapsed'] = time[-1] - time[0] if len(time) else 0.0
+	metrics['distance'] = {metric: np.sum(geodesy.segment_distances(longitude, latitude, metric)) for metric in geodesy.DISTANCE_METRICS}
+	distance = metrics['distance'][metric]
+	metrics['speed'] = distance / metrics['elapsed'] if metrics['elapsed'] > 0 else None
+	metrics['pace'] = metrics['elapsed'] / (distance / 1000) if distance > 0 else None
+
+	climb = np.diff(sequential_data[:,3])
+	climb = climb[np.isfinite(climb)]
+	metrics['altitude_gain'] = np.sum(climb[climb > 0])
+	metrics['altitude_loss'] = np.sum(-climb[climb < 0])
+
+	metrics['horizontal_accuracy'] = percentiles(sequential_data[:,4])
+	metrics['vertical_accuracy'] = percentiles(sequential_data[:,5])
+
+	metrics['heart_rate'] = heart_rate_metrics(heart_rate, zones)
+	metrics['rr_intervals'] = rr_metrics(rr_intervals)
+	metrics['hrv'] = hrv.summary(rr_intervals)
+	return metrics
+
+def percentiles(values, q=ACCURACY_PERCENTILES):
+	values = values[np.isfinite(values)]
+	if len(values) == 0:
+		return {f'p{p}': None for p in q}
+	return {f'p{p}': value for p, value in zip(q, np.percentile(values, q))}
+
+# Mean, minimum and maximum heart rate, and the seconds spent in each zone.
+# Each measurement counts for the time until the next one, and time below the first zone is zone 0.
+def heart_rate_metrics(heart_rate, zones=HEART_RATE_ZONES):
+	heart_rate = np.asarray(heart_rate, dtype=float).reshape(-1, 2)
+	heart_rate = timeline.sort_by_time(heart_rate)
+	values = heart_rate[:,1]
+	if len(values) == 0:
+		return {'mean': None, 'min': None, 'max': None, 'zones': [0.0] * (len(zones) + 1)}
+	durations = np.diff(heart_rate[:,0])
+	zone = np.digitize(values[:-1], zones)
+	return {
+		'mean': np.mean(values),
+		'min': np.min(values),
+		'max': np.max(values),
+		'zones': np.bincount(zone, weights=durations, minlength=len(zones) + 1).tolist(),
+	}
+
+# RR intervals are in 1/1024 seconds as decoded from the heart rate measurement
+def rr_metrics(rr_intervals):
+	rr = np.asarray(rr_intervals, dtype=float).reshape(-1) * 1000 / 1024
+	if len(rr) == 0:
+		return {'count': 0, 'mean': None, 'std': None, 'rmssd': None}
+	return {
+		'count': len(rr),
+		'mean': np.mean(rr),
+		'std': np.std(rr),
+		'rmssd': np.sqrt(np.mean(np.diff(rr) ** 2)) if len(rr) > 1 else None,
+	}
+
+# Fitted track and a row of LAP_COLUMNS per lap run on it
+def lap_metrics(data, heart_rate, metric='haversine'):
+	# scipy is only needed for fitting so statistics without a track do not pay for importing it
+	import track_fit
+	fit = track_fit.fit(data[:,1], data[:,2])
+	table = track_fit.laps(data, fit, heart_rate, metric=metric)
+	return {
+		'track': {'center': list(fit.center_position), 'direction': fit.direction, 'lane': fit.lane, 'residual': fit.residual},
+		'laps': [dict(zip(track_fit.LAP_COLUMNS, row)) for row in table],
+	}
+
+# Replace numpy scalars with Python numbers and non-finite values with None so json.dumps writes valid JSON
+def to_json(value):
+	if isinstance(value, dict):
+		return {key: to_json(item) for key, item in value.items()}
+	if isinstance(value, (list, tuple, np.ndarray)):
+		return [to_json(item) for item in value]
+	if isinstance(value, (np.integer, int)) and not isinstance(value, bool):
+		return int(value)
+	if isinstance(value, (np.floating, float)):
+		return float(value) if np.isfinite(value) else None
+	return value
@@ -0,0 +1,211 @@
+import numpy as np
+from scipy import fft
+
+# Columns of the channels returned by periodicity
+PERIODICITY_CHANNELS = ['x', 'y', 'z', 'magnitude']
+
+# Normalized cross-correlation of a template at every offset of a signal where it fits entirely.
+# Reference implementation for RepetitionCounter, which computes the same values incrementally.
+def normalized_cross_correlation(signal, template):
+	signal = np.asarray(signal, dtype=float)
+	template = np.asarray(template, dtype=float)
+	m = len(template)
+	windows = np.lib.stride_tricks.sliding_window_view(signal, m)
+	windows = windows - np.mean(windows, axis=-1, keepdims=True)
+	template = template - np.mean(template)
+	numerator = windows @ template
+	denominator = np.sqrt(np.sum(windows ** 2, axis=-1) * np.sum(template ** 2))
+	return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+# Normalized autocorrelation along the last axis for lags 0 to max_lag, for any number of leading axes at once.
+# The real FFT is zero-padded to a fast length of at least twice the signal so that the circular
+# correlation equals the linear one.
+def autocorrelation(data, max_lag=None):
+	data = np.asarray(data, dtype=float)
+	n = data.shape[-1]
+	if max_lag is None:
+		max_lag = n - 1
+	centered = data - np.mean(data, axis=-1, keepdims=True)
+	size = fft.next_fast_len(2 * n - 1, real=True)
+	spectrum = fft.rfft(centered, size, axis=-1)
+	correlation = fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, size, axis=-1)[..., :max_lag + 1]
+	energy = correlation[..., :1]
+	return np.divide(correlation, energy, out=np.zeros_like(correlation), where=energy > 0)
+
+# Dominant period of the x, y and z axes and the magnitude of acceleration in sliding windows.
+# Data has columns of x, y and z sampled every sample_period seconds. Returns the start time of each window
+# relative to the first sample, and the period in seconds and confidence of each window and channel.
+# Confidence is the normalized autocorrelation at the period, 1.0 for a perfectly repeating signal. The period is
+# the first peak of the autocorrelation past its first minimum within peak_tolerance of the highest peak, or NaN
+# with a confidence of 0 without any peak up to the longest period.
+def periodicity(data, sample_period=0.01, window_period=10.0, step_period=None, min_period=0.2, max_period=None, peak_tolerance=0.1, batch_size=256):
+	data = np.asarray(data, dtype=float)
+	channels = np.column_stack([data, np.sqrt(np.sum(data ** 2, axis=1))])
+	window = min(int(round(window_period / sample_period)), len(channels))
+	step = window // 2 if step_period is None else int(round(step_period / sample_period))
+	# At least two repetitions have to fit in a window
+	max_lag = window // 2 if max_period is None else min(int(round(max_period / sample_period)), window - 1)
+	min_lag = max(int(round(min_period / sample_period)), 1)
+	if window < 2 or min_lag > max_lag:
+		raise ValueError(f"Window of {window} samples cannot contain periods from {min_lag} to {max_lag} samples")
+
+	windows = np.lib.stride_tricks.sliding_window_view(channels, window, axis=0)[::max(step, 1)]
+	periods = np.empty((len(windows), channels.shape[1]))
+	confidence = np.empty((len(windows), channels.shape[1]))
+	lags = np.arange(max_lag + 1)
+	# Transform batches of windows together to bound the memory of the spectra
+	for start in range(0, len(windows), batch_size):
+		correlation = autocorrelation(windows[start:start + batch_size], max_lag)
+		# The correlation of slow signals stays high just after lag 0, so the search starts past its first minimum
+		rising = np.diff(correlation, axis=-1) >= 0
+		first_minimum = np.where(np.any(rising, axis=-1), np.argmax(rising, axis=-1), max_lag + 1)
+		searched = lags >= np.maximum(first_minimum, min_lag)[..., None]
+		# Scaled by the overlap at each lag so the taper of the autocorrelation does not pull peaks to shorter lags
+		correlation = correlation * window / (window - lags)
+		peaks = np.zeros(correlation.shape, dtype=bool)
+		peaks[..., 1:-1] = (correlation[..., 1:-1] >= correlation[..., :-2]) & (correlation[..., 1:-1] > correlation[..., 2:])
+		heights = np.where(searched & peaks, correlation, -np.inf)
+		highest = np.max(heights, axis=-1, keepdims=True)
+		# Multiples of the period repeat as well as the period itself, so the first peak close to the highest wins
+		best = np.argmax(heights >= highest - peak_tolerance * np.abs(highest), axis=-1)
+		found = np.isfinite(highest[..., 0])
+		periods[start:start + batch_size] = np.where(found, best * sample_period, np.nan)
+		confidence[start:start + batch_size] = np.where(found, np.take_along_axis(correlation, best[..., None], axis=-1)[..., 0], 0.0)
+	times = np.arange(len(windows)) * max(step, 1) * sample_period
+	return times, periods, confidence
+
+# Counts repetitions of a motion in a stream of accelerometer samples.
+# Samples arrive in chunks of any size through update(). Only the last len(template) - 1 samples are kept
+# between chunks, so the cost per sample and the memory used are bounded regardless of stream length.
+# The correlation of each chunk is computed by overlap-save with a fixed size real FFT, and the mean and
+# variance of each window from running sums, giving the normalized cross-correlation against the template.
+# A repetition is reported at the start time of the best matching window of each run above the threshold.
+class RepetitionCounter:
+	def __init__(self, template=None, template_length=300, threshold=0.8, min_interval=None, fft_size=None):
+		self.template_length = template_length if template is None else len(template)
+		self.threshold = threshold
+		# Matches closer together than this are one repetition. Defaults to half of the template.
+		self.min_interval = min_interval
+		self.fft_size = fft_size
+		self.events = []
+		self._template = None
+		self._pending = []
+		self._history = None
+		self._history_time = None
+		self._peak = None
+		self._last_event = None
+		self._sample_period = None
+		if template is not None:
+			self._set_template(np.asarray(template, dtype=float))
+
+	@property
+	def count(self):
+		return len(self.events)
+
+	def _set_template(self, template):
+		m = len(template)
+		if m < 2:
+			raise ValueError("Template must have at least 2 samples")
+		if self.fft_size is None:
+			# Transforms are most efficient when each block is several times the template
+			self.fft_size = 1 << int(np.ceil(np.log2(4 * m)))
+		if self.fft_size < m:
+			raise ValueError(f"FFT size {self.fft_size} is smaller than the template {m}")
+		centered = template - np.mean(template)
+		self._template = template
+		self._template_norm = np.sqrt(np.sum(centered ** 2))
+		self._template_spectrum = np.conj(np.fft.rfft(centered, self.fft_size))
+
+	# Add samples and timestamps in seconds. Returns the times of repetitions completed by this chunk.
+	def update(self, timestamps, samples):
+		timestamps = np.asarray(timestamps, dtype=float)
+		samples = np.asarray(samples, dtype=float)
+		if self._template is None:
+			# Without a template, the first template_length samples of the stream are the motion to count
+			self._pending.append((timestamps, samples))
+			pending_time = np.concatenate([p[0] for p in self._pending])
+			if len(pending_time) < self.template_length:
+				return np.zeros(0)
+			pending = np.concatenate([p[1] for p in self._pending])
+			self._pending = []
+			self._set_template(pending[:self.template_length])
+			timestamps, samples = pending_time, pending
+
+		if self._sample_period is None and len(timestamps) > 1:
+			self._sample_period = timestamps[1] - timestamps[0]
+
+		events = []
+		m = len(self._template)
+		block = self.fft_size - m + 1
+		for start in range(0, len(samples), block):
+			events.extend(self._correlate(timestamps[start:start + block], samples[start:start + block]))
+		self.events.extend(events)
+		return np.array(events)
+
+	# End of the stream. Returns the time of a repetition still above the threshold at the last sample.
+	def finish(self):
+		events = []
+		if self._peak is not None:
+			events = self._find_peaks(np.zeros(1), np.full(1, -np.inf))
+		self.events.extend(events)
+		return np.array(events)
+
+	def _correlate(self, timestamps, samples):
+		m = len(self._template)
+		if self._history is None:
+			segment, segment_time = samples, timestamps
+		else:
+			segment = np.concatenate([self._history, samples])
+			segment_time = np.concatenate([self._history_time, timestamps])
+		self._history = segment[-(m - 1):]
+		self._history_time = segment_time[-(m - 1):]
+		if len(segment) < m:
+			return []
+
+		# Valid outputs of a circular correlation never wrap around because the segment fits in the transform
+		numerator = np.fft.irfft(np.fft.rfft(segment, self.fft_size) * self._template_spectrum, self.fft_size)
+		numerator = numerator[:len(segment) - m + 1]
+		sums = np.zeros(len(segment) + 1)
+		squares = np.zeros(len(segment) + 1)
+		np.cumsum(segment, out=sums[1:])
+		np.cumsum(segment ** 2, out=squares[1:])
+		window_sum = sums[m:] - sums[:-m]
+		window_squares = squares[m:] - squares[:-m]
+		variance = np.maximum(window_squares - window_sum ** 2 / m, 0)
+		denominator = np.sqrt(variance) * self._template_norm
+		# Flat windows have no shape to match
+		correlation = np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 1e-12 * m)
+		return self._find_peaks(segment_time[:len(correlation)], correlation)
+
+	def _find_peaks(self, time, correlation):
+		min_interval = self.min_interval
+		if min_interval is None:
+			min_interval = 0.5 * len(self._template) * (self._sample_period or 0)
+		events = []
+		above = correlation >= self.threshold
+		# Boundaries of runs above the threshold. The leading flag is a run continuing from the previous chunk.
+		flags = np.concatenate([[False, self._peak is not None], above, [False]])
+		edges = np.flatnonzero(np.diff(flags.astype(np.int8))) - 1
+		for start, end in zip(np.maximum(edges[::2], 0), edges[1::2]):
+			if end > start:
+				best = start + np.argmax(correlation[start:end])
+				if self._peak is None or correlation[best] > self._peak[0]:
+					self._peak = (correlation[best], time[best])
+			if end == len(correlation):
+				# Still above the threshold at the end of this chunk
+				break
+			if self._last_event is None or self._peak[1] - self._last_event >= min_interval:
+				events.append(self._peak[1])
+				self._last_event = self._peak[1]
+			self._peak = None
+		return events
+
+# Times of repetitions of the first template_period seconds of motion in a recorded series.
+# Samples are fed in chunk_period second chunks as they would be from a stream.
+def count_repetitions(time, data, sample_period=0.01, template_period=3.0, threshold=0.9, chunk_period=1.0):
+	counter = RepetitionCounter(template_length=int(template_period / sample_period), threshold=threshold)
+	chunk = int(chunk_period / sample_period)
+	for i in range(0, len(data), chunk):
+		counter.update(time[i:i+chunk], data[i:i+chunk])
+	counter.finish()
+	return np.array(counter.events)
@@ -1,15 +1,13 @@
-import json
-import matplotlib.pyplot as plt
 import numpy as np
+import geodesy
+import loader
+import timeline
 
-WGS84_a = 6378137.0
-WGS84_b = 6356752.314245
-
-# GNSS coordinates in degreses. Returns spherical coordinates in radians
+# GNSS coordinates in degreses. Returns spherical coordinates in radians of the position on the WGS84 ellipsoid
 def gnss_to_spherical(latitude, longitude, altitude):
-    # TODO: Calculate radius based on latitude and ellipsoid model
-    radius = (2 * WGS84_a + WGS84_b) / 3
-    return np.array([np.pi / 2 - np.radians(latitude), np.radians(longitude), radius + altitude])
+    x, y, z = np.moveaxis(geodesy.ecef(longitude, latitude, altitude), -1, 0)
+    radius = np.sqrt(x ** 2 + y ** 2 + z ** 2)
+    return np.array([np.arccos(z / radius), np.arctan2(y, x), radius])
 
 def spherical_to_euclidean(theta, phi, radius):
     x = radius * np.cos(phi) * np.sin(theta)
@@ -41,7 +39,7 @@ def haversine_distance(p2, p1):
     φ2, λ2 = p2
     φ2 = np.radians(φ2)
     λ2 = np.radians(λ2)
-    radius = (2 * WGS84_a + WGS84_b) / 3
+    radius = geodesy.MEAN_RADIUS
     return 2 * radius * np.arcsin(np.sqrt(np.sin((φ2 - φ1) / 2) ** 2 + np.cos(φ1) * np.cos(φ2) * np.sin((λ2 - λ1) / 2) ** 2))
 
 def gnss_course(point1, point2):
@@ -60,54 +58,182 @@ def bearing(point1, point2):
 def position_delta(theta, distance):
     return np.array([distance * np.cos(theta), distance * np.sin(theta)])
 
-path = '2022-06-05-16-09-27.json'
-with open(path, 'r') as f:
-    recording = json.load(f)
-
-# Sort locations in each split by timeInterval
-splits = [sorted(split['locations'], key=lambda location: location['timeInterval']) for split in recording]
-# Sort splits by their first timeInterval
-splits.sort(key=lambda split: split[0]['timeInterval'])
-
-origin = (splits[1][0]['latitude'], splits[1][0]['longitude'], splits[1][0]['altitude'])
-#for value in splits[1]:
-#    position = relative_gnss_position((value['latitude'], value['longitude'], value['altitude']), origin)
-#    distance = gnss_distance(origin, (value['latitude'], value['longitude'], value['altitude']))
-data_array = np.array([relative_gnss_position(np.array([value['latitude'], value['longitude'], value['altitude']]), origin) for value in splits[1]])
-print(data_array.shape)
-#print(np.linalg.eig(data_array))
-
-#positions = [np.array([0.0, 0.0])]
-#for pair in zip(splits[1][1:], splits[1]):
-#    point1 = pair[0]['latitude'], pair[0]['longitude']
-#    point2 = pair[1]['latitude'], pair[1]['longitude']
-#    distance = haversine_distance(point2, point1)
-#    theta = bearing(point2, point1)
-#    positions.append(position_delta(theta, distance))
-
-positions = [np.array([0.0, 0.0])]
-for pair in zip(splits[1][1:], splits[1]):
-    time_delta = pair[0]['timeInterval'] - pair[1]['timeInterval']
-    speed = pair[1]['speed']
-    course = pair[1]['course']
-    positions.append(position_delta(np.radians(course), speed * time_delta))
-
-#print(np.add.accumulate(np.array(positions)))
-#print(data_array[:, 0])
-#x = np.linspace(0, 2 * np.pi, 200)
-#y = np.sin(x)
-fig, ax = plt.subplots()
-#fig = plt.figure()
-cumulative_positions = np.add.accumulate(np.array(positions))
-ax.scatter(cumulative_positions[:, 0], cumulative_positions[:, 1])
-#ax = fig.add_subplot(projection='3d')
-#ax.stem(cumulative_positions[:, 0], cumulative_positions[:, 1], np.array([location['altitude'] for location in splits[1]]))
-#ax.plot(x, y)
-
-#fig = plt.figure()
-#ax = fig.add_subplot(projection='3d')
-#ax.scatter(data_array[:, 0], data_array[:, 1], data_array[:, 2], marker='o')
-#ax.set_xlabel('X Label')
-#ax.set_ylabel('Y Label')
-#ax.set_zlabel('Z Label')
-plt.show()
+# Local east, north, up coordinates in meters around an origin on the WGS84 ellipsoid.
+# Build one per session: the origin's earth-centered position and the rotation into the local frame are computed
+# once, and whole arrays of positions are converted in a single call in either direction.
+class LocalProjection:
+    def __init__(self, longitude, latitude, altitude=0.0):
+        self.origin = (float(longitude), float(latitude), float(altitude))
+        λ = np.radians(longitude)
+        φ = np.radians(latitude)
+        self.sin_λ, self.cos_λ = np.sin(λ), np.cos(λ)
+        self.sin_φ, self.cos_φ = np.sin(φ), np.cos(φ)
+        self.origin_ecef = geodesy.ecef(longitude, latitude, altitude)
+        # Rows are the east, north and up unit vectors in earth-centered coordinates
+        self.rotation = np.array([
+            [-self.sin_λ, self.cos_λ, 0.0],
+            [-self.sin_φ * self.cos_λ, -self.sin_φ * self.sin_λ, self.cos_φ],
+            [self.cos_φ * self.cos_λ, self.cos_φ * self.sin_λ, self.sin_φ],
+        ])
+
+    # Projection around the median position of a location matrix with columns of loader.LOCATION_PROPERTIES
+    @classmethod
+    def from_data(cls, data):
+        finite = np.isfinite(data[:,1]) & np.isfinite(data[:,2])
+        if not np.any(finite):
+            return cls(0.0, 0.0)
+        altitude = data[finite,3]
+        altitude = altitude[np.isfinite(altitude)]
+        return cls(np.median(data[finite,1]), np.median(data[finite,2]), np.median(altitude) if len(altitude) else 0.0)
+
+    # Longitude and latitude in degrees and altitude in meters to east, north and up in meters
+    def forward(self, longitude, latitude, altitude=None):
+        if altitude is None:
+            altitude = self.origin[2]
+        enu = (geodesy.ecef(longitude, latitude, altitude) - self.origin_ecef) @ self.rotation.T
+        return enu[...,0], enu[...,1], enu[...,2]
+
+    # East, north and up in meters to longitude and latitude in degrees and altitude in meters
+    def inverse(self, east, north, up=0.0):
+        east, north, up = np.broadcast_arrays(np.asarray(east, dtype=float), np.asarray(north, dtype=float), np.asarray(up, dtype=float))
+        x, y, z = np.moveaxis(np.stack([east, north, up], axis=-1) @ self.rotation + self.origin_ecef, -1, 0)
+        p = np.hypot(x, y)
+        φ = np.arctan2(z, p * (1 - geodesy.WGS84_e2))
+        # A few fixed point iterations reach full precision for any position near the surface
+        for _ in range(4):
+            sin_φ = np.sin(φ)
+            n = geodesy.WGS84_a / np.sqrt(1 - geodesy.WGS84_e2 * sin_φ ** 2)
+            altitude = p * np.cos(φ) + z * sin_φ - geodesy.WGS84_a ** 2 / n
+            φ = np.arctan2(z, p * (1 - geodesy.WGS84_e2 * n / (n + altitude)))
+        sin_φ = np.sin(φ)
+        n = geodesy.WGS84_a / np.sqrt(1 - geodesy.WGS84_e2 * sin_φ ** 2)
+        altitude = p * np.cos(φ) + z * sin_φ - geodesy.WGS84_a ** 2 / n
+        return np.degrees(np.arctan2(y, x)), np.degrees(φ), altitude
+
+    # East and north of the positions of a location matrix as an (n, 2) array
+    def positions(self, data):
+        east, north, _ = self.forward(data[:,1], data[:,2])
+        return np.column_stack([east, north])
+
+# Path integrated from speed in m/s and course in degrees clockwise from north, as (n, 2) east and north meters
+# from start. Each step moves at the velocity of the fix it starts from for the time until the next fix.
+# Negative speed or course marks an invalid value, and the path holds still over those steps.
+def dead_reckoning(time, speed, course, start=(0.0, 0.0)):
+    if len(time) == 0:
+        return np.zeros((0, 2))
+    steps = _velocity_steps(np.asarray(time, dtype=float), np.asarray(speed, dtype=float), np.asarray(course, dtype=float))
+    path = np.empty((len(steps) + 1, 2))
+    path[0] = start
+    np.cumsum(steps, axis=0, out=path[1:])
+    path[1:] += path[0]
+    return path
+
+# Displacement over each interval between fixes at the velocity of its first fix, zero where it is invalid
+def _velocity_steps(time, speed, course):
+    dt = np.diff(time)
+    valid = (speed[:-1] >= 0) & (course[:-1] >= 0)
+    distance = np.where(valid, speed[:-1] * dt, 0.0)
+    θ = np.radians(course[:-1])
+    return np.column_stack([distance * np.sin(θ), distance * np.cos(θ)])
+
+# Dead reckoning corrected by GNSS fixes with a complementary filter. Each step blends the predicted position
+# with the fix using the steady state gain of a Kalman filter for the accuracies at that fix:
+# the prediction drifts by the speed accuracy over the step, plus the course accuracy across it, and the
+# fix has the horizontal accuracy. Negative or missing accuracies mark an invalid value, so invalid
+# fixes are ignored and invalid steps reset the path to the fix.
+# The gains do not depend on the path, so the blend is a linear recurrence solved over whole arrays.
+# Positions are (n, 2) east and north meters, for example from LocalProjection.positions.
+def blend_fixes(time, speed, course, positions, horizontal_accuracy, speed_accuracy, course_accuracy=None):
+    time = np.asarray(time, dtype=float)
+    speed = np.asarray(speed, dtype=float)
+    course = np.asarray(course, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    if len(time) == 0:
+        return np.zeros((0, 2))
+    steps = _velocity_steps(time, speed, course)
+
+    # Variance of the predicted displacement over each step
+    dt = np.diff(time)
+    q = (np.asarray(speed_accuracy, dtype=float)[:-1] * dt) ** 2
+    if course_accuracy is not None:
+        q = q + (speed[:-1] * dt * np.radians(np.asarray(course_accuracy, dtype=float)[:-1])) ** 2
+    invalid_step = ~(q >= 0) | (speed[:-1] < 0) | (course[:-1] < 0) | np.isnan(q)
+    q = np.where(invalid_step, np.inf, q)
+    # Variance of each fix
+    r = np.asarray(horizontal_accuracy, dtype=float)[1:] ** 2
+    invalid_fix = ~(np.asarray(horizontal_accuracy, dtype=float)[1:] >= 0) | np.isnan(positions[1:]).any(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Steady state prior variance of a random walk with process variance q measured with variance r
+        prior = (q + np.sqrt(q ** 2 + 4 * q * r)) / 2
+        gain = np.where(np.isinf(q), 1.0, prior / (prior + r))
+    gain = np.where(invalid_fix, 0.0, np.nan_to_num(gain, nan=1.0))
+    # Bound the gain below 1 to keep the recurrence well conditioned
+    gain = np.minimum(gain, 1 - 1e-3)
+
+    start = positions[0] if np.all(np.isfinite(positions[0])) else np.zeros(2)
+    fixes = np.where(invalid_fix[:,None], 0.0, positions[1:])
+    # x[k] = (1 - gain) * (x[k - 1] + step) + gain * fix
+    a = 1 - gain
+    b = a[:,None] * steps + gain[:,None] * fixes
+    path = np.empty((len(steps) + 1, 2))
+    path[0] = start
+    path[1:] = linear_recurrence(a, b, start)
+    return path
+
+# Solution of x[k] = a[k] * x[k - 1] + b[k] with x[-1] = initial, for a in (0, 1] and b of shape (n, ...).
+# Written as x[k] = A[k] * (initial + sum over j <= k of b[j] / A[j]) with A the running product of a, which is
+# exact to rounding because the sum is dominated by its latest terms. Blocks of a bounded length keep 1 / A
+# from overflowing, and only the state between blocks is carried in Python.
+def linear_recurrence(a, b, initial, block=64):
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    x = np.empty(b.shape)
+    state = np.asarray(initial, dtype=float)
+    for start in range(0, len(a), block):
+        log_product = np.cumsum(np.log(a[start:start + block]))
+        product = np.exp(log_product).reshape((-1,) + (1,) * (b.ndim - 1))
+        inverse = np.exp(-log_product).reshape(product.shape)
+        x[start:start + block] = product * (state + np.cumsum(b[start:start + block] * inverse, axis=0))
+        state = x[start + len(log_product) - 1]
+    return x
+
+# Dead reckoning of a location matrix with columns of loader.LOCATION_PROPERTIES in east and north meters of
+# projection, blended with its fixes unless blend is False. Rows are sorted by time.
+def reckon(data, projection=None, blend=True):
+    data = timeline.sort_by_time(data)
+    columns = loader.LOCATION_COLUMNS
+    if projection is None:
+        projection = LocalProjection.from_data(data)
+    positions = projection.positions(data)
+    if not blend:
+        start = positions[0] if len(positions) and np.all(np.isfinite(positions[0])) else (0.0, 0.0)
+        return dead_reckoning(data[:,columns['timeInterval']], data[:,columns['speed']], data[:,columns['course']], start)
+    return blend_fixes(data[:,columns['timeInterval']], data[:,columns['speed']], data[:,columns['course']], positions,
+        data[:,columns['horizontalAccuracy']], data[:,columns['speedAccuracy']], data[:,columns['courseAccuracy']])
+
+if __name__ == '__main__':
+    import argparse
+    import matplotlib.pyplot as plt
+    import recording
+
+    parser = argparse.ArgumentParser(description="Plot GNSS fixes, dead reckoning and their blend for a split of a recording")
+    parser.add_argument("input", help="file path to the input data")
+    parser.add_argument("-split", type=int, default=1, help="index of split in data to process")
+    args = parser.parse_args()
+
+    data, _, _ = recording.load(args.input, args.split)
+    data = timeline.sort_by_time(data)
+    projection = LocalProjection.from_data(data)
+    positions = projection.positions(data)
+
+    fig, ax = plt.subplots()
+    ax.set_aspect('equal')
+    ax.set_xlabel('East (m)')
+    ax.set_ylabel('North (m)')
+    ax.scatter(positions[:, 0], positions[:, 1], marker='.', s=1, label='GNSS')
+    for blend, label in [(False, 'Dead reckoning'), (True, 'Blended')]:
+        path = reckon(data, projection, blend)
+        ax.plot(path[:, 0], path[:, 1], linewidth=0.5, label=label)
+    ax.legend()
+    plt.show()
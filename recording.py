@@ -0,0 +1,62 @@
+import itertools
+import numpy as np
+import cache
+import heart_rate_measurement
+import loader
+
+def parse_locations(data_in):
+	return loader.locations(data_in)
+
+# Returns a matrix of time and heart rate, the energy expended values and the RR intervals
+def parse_bluetooth(data_in):
+	time, encoded = loader.bluetooth_values(data_in)
+	value, energy, rr_intervals, _ = heart_rate_measurement.decode_measurements(encoded)
+	data_out = np.column_stack([time, value])
+	energy_values = energy[~np.isnan(energy)]
+	return data_out, energy_values, rr_intervals
+
+def parse_split(data_in):
+	data = parse_locations(data_in)
+	heart_rate, _, rr_intervals = parse_bluetooth(data_in)
+	return data, heart_rate, rr_intervals
+
+def parse_splits(path, stream=False):
+	return [parse_split(raw_split) for raw_split in loader.read_array(path, stream=stream)]
+
+# Parsed arrays of every split in a file, or only the split at index split
+def load_splits(path, split=None, stream=False, use_cache=True):
+	if not use_cache:
+		raw_data = loader.read_array(path, stream=stream)
+		if split is not None and split >= 0:
+			# Only parse the requested split
+			raw_data = itertools.islice(raw_data, split, split + 1)
+		elif split is not None:
+			raw_data = [list(raw_data)[split]]
+		return [parse_split(raw_split) for raw_split in raw_data]
+
+	# Parse every split once so later renders of any split reuse the memory-mapped arrays
+	entry = cache.cache_path(path)
+	splits = cache.load(entry)
+	if splits is None:
+		cache.store(entry, parse_splits(path, stream=stream))
+		splits = cache.load(entry)
+	if split is not None:
+		splits = [splits[split]]
+	return splits
+
+# Location, heart rate and RR interval arrays of one split, or of every split joined together
+def load(path, split=None, stream=False, use_cache=True):
+	splits = load_splits(path, split, stream, use_cache)
+	if split is not None:
+		return splits[0]
+	data = np.concatenate([arrays[0] for arrays in splits], axis=0)
+	heart_rate = np.concatenate([arrays[1] for arrays in splits], 0)
+	rr_intervals = np.concatenate([arrays[2] for arrays in splits], 0)
+	return data, heart_rate, rr_intervals
+
+# Accelerometer samples with time in seconds from the first sample
+def load_acceleration(file_name):
+	data = loader.acceleration(loader.read_array(file_name, stream=True))
+	start = np.min(data[:,0])
+	data[:,0] = data[:,0] - start
+	return data
@@ -0,0 +1,295 @@
+from pathlib import PurePath
+import numpy as np
+import matplotlib
+# Figures are only written to files so never load an interactive backend
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import animate
+import decimate
+import geodesy
+import hrv
+import recording
+import session
+
+# Cells of the axes half the size of a marker of the scatter options, as (columns, rows). Markers closer together
+# than a cell overlap almost entirely, so drawing one of them looks the same.
+def marker_cells(ax, options):
+	extent = ax.get_window_extent()
+	diameter = max(np.sqrt(options.get('s', matplotlib.rcParams['lines.markersize'] ** 2)) * ax.figure.dpi / 72, 1)
+	return 2 * extent.width / diameter, 2 * extent.height / diameter
+
+# Scatter plot of a time series decimated by decimate.series to one point per marker sized cell of the axes and
+# at most budget points, or every point when budget is None. Options are passed to scatter.
+def scatter_series(ax, x, y, budget=decimate.POINT_BUDGET, **options):
+	x = np.asarray(x)
+	y = np.asarray(y)
+	indices = decimate.series(x, y, marker_cells(ax, options), budget)
+	return ax.scatter(x[indices], y[indices], **options)
+
+# Scatter plot of positions decimated by decimate.positions to one point per marker sized cell of the axes
+def scatter_positions(ax, x, y, budget=decimate.POINT_BUDGET, **options):
+	indices = decimate.positions(x, y, marker_cells(ax, options), budget)
+	return ax.scatter(x[indices], y[indices], **options)
+
+# Data is a session.Session or a location matrix, which is made into one.
+# Every scatter plot of a figure draws at most budget points, or every point when budget is None.
+def summary(file_name, data, heart_rate=None, overlay=None, metric='haversine', budget=decimate.POINT_BUDGET):
+	data = session.as_session(data, heart_rate)
+	figure, ((position_ax, accuracy_ax), (altitude_ax, distance_ax)) = plt.subplots(2,2)
+	position_ax.set_aspect('equal')
+	figure.set_size_inches(8, 6)
+	figure.dpi = 200
+
+	plot_position(position_ax, data, overlay, budget)
+	distance = geodesy.cumulative_distance(data.longitude, data.latitude, metric)
+	plot_distance(distance_ax, data, distance, budget=budget)
+	distance_ax.set_title(f'{distance[-1] / 1000:.2f} km', fontsize='small')
+	# Heart rate at each fix beside the distance covered by then
+	frame = data.frame()
+	heart_rate_ax = distance_ax.twinx()
+	heart_rate_ax.set_ylabel('Heart Rate (BPM)')
+	scatter_series(heart_rate_ax, frame['timeInterval'] / 60, frame['heart_rate'], budget, marker='.', s=1, color='tab:red')
+
+	altitude_ax.set_xlabel('Time (minute)')
+	altitude_ax.set_ylabel('Altitude (m)')
+	scatter_series(altitude_ax, data.time / 60, data.altitude, budget, marker='.', s=1)
+
+	accuracy_ax.set_xlabel('Time (minute)')
+	accuracy_ax.set_ylabel('Accuracy (m)')
+	scatter_series(accuracy_ax, data.time, data.horizontal_accuracy, budget, marker='.', s=1, label='Horizontal')
+	scatter_series(accuracy_ax, data.time, data.vertical_accuracy, budget, marker='.', s=1, label='Vertical')
+	accuracy_ax.legend()
+
+	figure.savefig(file_name)
+	plt.close(figure)
+
+# Optionally pass distance from geodesy.cumulative_distance when it has already been calculated
+def plot_distance(ax, data, distance=None, metric='haversine', budget=decimate.POINT_BUDGET):
+	ax.yaxis.grid(True, which='major')
+	ax.set_xlabel('Time (minute)')
+	ax.set_ylabel('Distance (km)')
+	data = session.as_session(data)
+	if distance is None:
+		distance = geodesy.cumulative_distance(data.longitude, data.latitude, metric)
+
+	scatter_series(ax, data.time / 60, distance / 1000, budget, marker='.', s=1)
+
+# Time of each lap as bars labelled with the speed, and the mean heart rate of each lap
+def lap_summary(file_name, laps, lane):
+	figure, ((times, heart_rate)) = plt.subplots(2, 1, sharex=True)
+	figure.set_size_inches(8, 6)
+	figure.dpi = 200
+	number = np.arange(1, len(laps) + 1)
+
+	times.set_title(f'{len(laps)} laps in lane {lane}', fontsize='small')
+	times.set_ylabel('Time (s)')
+	bars = times.bar(number, laps[:,2])
+	times.bar_label(bars, labels=[f'{speed * 3.6:.1f} km/h' for speed in laps[:,4]], fontsize='x-small')
+
+	heart_rate.yaxis.grid(True, which='major')
+	heart_rate.set_xlabel('Lap')
+	heart_rate.set_ylabel('Heart Rate (BPM)')
+	heart_rate.plot(number, laps[:,5], marker='.')
+
+	figure.savefig(file_name)
+	plt.close(figure)
+
+def video(file_name, data, fps=30, duration=None, workers=1):
+	animate.render(file_name, data, fps=fps, duration=duration, workers=workers)
+
+def plot_heart_rate(ax, heart_rate, budget=decimate.POINT_BUDGET):
+	ax.yaxis.grid(True, which='major')
+	ax.set_ylabel('Heart Rate (BPM)')
+	ax.set_yticks([95, 114, 133, 152, 171, 190])
+	ax.set_xlabel('Time (minute)')
+	scatter_series(ax, heart_rate[:,0] / 60, heart_rate[:,1], budget, marker='.', s=1)
+
+# Heart rate, the RR tachogram with artifacts marked, sliding heart rate variability and the RR spectrum
+def heart_summary(file_name, heart_rate, rr_intervals, budget=decimate.POINT_BUDGET):
+	rr = hrv.milliseconds(rr_intervals)
+	normal = hrv.normal_beats(rr)
+	figure, ((beats, tachogram), (variability, spectrum)) = plt.subplots(2,2)
+	figure.set_size_inches(8, 6)
+	figure.dpi = 200
+	plot_heart_rate(beats, heart_rate, budget)
+
+	time = hrv.beat_times(rr) / 60
+	tachogram.set_xlabel('Time (minute)')
+	tachogram.set_ylabel('RR interval (ms)')
+	scatter_series(tachogram, time[normal], rr[normal], budget, marker='.', s=1)
+	tachogram.scatter(time[~normal], rr[~normal], marker='.', s=1, color='tab:red', label='Artifact')
+	tachogram.legend()
+
+	windows = hrv.sliding_metrics(rr, normal)
+	variability.set_xlabel('Time (minute)')
+	variability.set_ylabel('HRV (ms)')
+	variability.plot(windows['time'] / 60, windows['rmssd'], label='RMSSD')
+	variability.plot(windows['time'] / 60, windows['sdnn'], label='SDNN')
+	variability.legend()
+
+	frequencies, power = hrv.spectrum(rr, normal)
+	band = frequencies <= hrv.HF_BAND[1]
+	spectrum.set_xlabel('Frequency (Hz)')
+	spectrum.set_ylabel('Power (ms²/Hz)')
+	spectrum.plot(frequencies[band], power[band])
+	spectrum.axvspan(*hrv.LF_BAND, alpha=0.2, label='LF')
+	spectrum.axvspan(*hrv.HF_BAND, alpha=0.2, color='tab:green', label='HF')
+	values = hrv.frequency_domain(rr, normal)
+	spectrum.set_title(f"LF/HF {values['lf_hf']:.2f}", fontsize='small')
+	spectrum.legend()
+
+	figure.savefig(file_name)
+	plt.close(figure)
+
+def plot_velocity(ax, data, budget=decimate.POINT_BUDGET):
+	data = session.as_session(data)
+	ax.set_ylabel('Velocity m/s')
+	ax.set_xlabel('Time (minute)')
+	scatter_series(ax, data.time, data.speed, budget, marker='.', s=1)
+
+def velocity_summary(file_name, data, budget=decimate.POINT_BUDGET):
+	data = session.as_session(data)
+	positions = data.positions
+	figure, ((speed, course), (speed_accuracy, course_accuracy)) = plt.subplots(2,2)
+	figure.set_size_inches(8, 6)
+	figure.dpi = 200
+	plot_velocity(speed, data, budget)
+	
+	scatter_series(speed_accuracy, data.time, data.speed_accuracy, budget, marker='.', s=1)
+	speed_accuracy.set_ylabel('Speed accuracy')
+	speed_accuracy.set_xlabel('Time (minute)')
+
+	# Quiver plot of course, clockwise from north, at east and north positions
+	vector_x = np.sin(data.course * np.pi / 180)
+	vector_y = np.cos(data.course * np.pi / 180)
+	course.set_aspect('equal')
+	course.quiver(positions[20:70,0], positions[20:70,1], vector_x[20:70], vector_y[20:70])
+
+	scatter_series(course_accuracy, data.time, data.course_accuracy, budget, marker='.', s=1)
+	course_accuracy.set_ylabel('Course accuracy')
+	course_accuracy.set_xlabel('Time (minute)')
+
+	figure.savefig(file_name)
+	plt.close(figure)
+
+# Overlay is a track_fit.TrackFit whose track is drawn under the positions.
+# Positions are in meters east and north of the origin of the projection of the session, around the median
+# position, so every figure of a session shares one projection.
+def plot_position(ax, data, overlay=None, budget=decimate.POINT_BUDGET):
+	ax.set_xlabel('East (m)')
+	ax.set_ylabel('North (m)')
+	ax.set_aspect('equal')
+	data = session.as_session(data)
+	positions = data.positions
+
+	# Optionally add an overlay of a 400m track
+	if overlay is not None:
+		track_overlay = overlay.outline()
+		east, north, _ = data.projection.forward(track_overlay[:,0], track_overlay[:,1])
+		ax.scatter(east, north, marker='.', s=4)
+
+	scatter_positions(ax, positions[:,0], positions[:,1], budget, marker='.', s=1)
+
+	# Do not use offsets on axes for readability
+	ax.ticklabel_format(useOffset=False)
+
+# Image of a heatmap.heatmap grid over longitude and latitude bounds, in log scale and the Mercator projection
+def heatmap_summary(file_name, grid, bounds):
+	import heatmap
+	west, south, east, north = heatmap.projected_bounds(bounds)
+	figure, ax = plt.subplots(1, 1)
+	figure.set_size_inches(8, 6)
+	figure.dpi = 200
+	ax.set_title(f'{np.sum(grid)} fixes', fontsize='small')
+	ax.set_xlabel('Longitude (°)')
+	ax.set_ylabel('Latitude (°)')
+	image = ax.imshow(np.log10(np.where(grid > 0, grid, np.nan)), origin='lower', extent=(west, east, south, north), interpolation='nearest', cmap='inferno')
+	figure.colorbar(image, ax=ax, label='Fixes per cell (log10)')
+	# Ticks in degrees of the Mercator coordinates of the axes, with enough decimals to tell them apart
+	decimals = max(int(np.ceil(-np.log10(max(bounds[2] - bounds[0], bounds[3] - bounds[1], 1e-9)))) + 1, 0)
+	ax.xaxis.set_major_formatter(matplotlib.ticker.FuncFormatter(lambda x, _: f'{np.degrees(x):.{decimals}f}'))
+	ax.yaxis.set_major_formatter(matplotlib.ticker.FuncFormatter(lambda y, _: f'{np.degrees(2 * np.arctan(np.exp(y)) - np.pi / 2):.{decimals}f}'))
+	ax.tick_params(axis='x', labelrotation=30)
+	figure.savefig(file_name)
+	plt.close(figure)
+
+def output_path(input_path, kind, split=None, suffix='.png'):
+	split_suffix = '' if split is None else '-' + str(split)
+	name = PurePath(input_path).with_suffix('').name + kind + split_suffix
+	return PurePath('output').joinpath(name).with_suffix(suffix)
+
+# Render every figure of a file, or of one split of it. Video options are passed to video().
+# With smooth, positions are replaced by the Kalman smoothed path before anything is computed.
+# Scatter plots draw at most budget points each.
+def render(input_path, split=None, track=False, video_options=None, stream=False, use_cache=True, metric='haversine', smooth=False, budget=decimate.POINT_BUDGET):
+	# Loaded and sorted once, and projected once for every figure and the video
+	data = session.Session.load(input_path, split, stream, use_cache)
+	if smooth:
+		data = data.smoothed()
+
+	if video_options is not None:
+		video(output_path(input_path, '-video', split, '.mp4'), data, **video_options)
+
+	summary_path = output_path(input_path, '', split)
+
+	# Render a scatter plot of the position data
+	position_figure, ((position_ax)) = plt.subplots(1,1)
+	position_figure.set_size_inches(8, 6)
+	position_figure.dpi = 200
+	overlay = None
+	if track:
+		# scipy is only needed for fitting so renders without a track do not pay for importing it
+		import track_fit
+		overlay = track_fit.fit(data.longitude, data.latitude, data.projection)
+	plot_position(position_ax, data, overlay, budget)
+	summary(summary_path, data, overlay=overlay, metric=metric, budget=budget)
+	position_figure.savefig(output_path(input_path, '-position', split))
+	plt.close(position_figure)
+
+	if overlay is not None:
+		lap_summary(output_path(input_path, '-laps', split), track_fit.laps(data.data, overlay, data.heart_rate, metric=metric), overlay.lane)
+
+	heart_summary(output_path(input_path, '-heart-rate', split), data.heart_rate, data.rr_intervals, budget)
+
+	velocity_summary(output_path(input_path, '-velocity', split), data, budget)
+
+def plot_acceleration(file_name, data, budget=decimate.POINT_BUDGET):
+	# scipy is only needed for motion so position renders do not pay for importing it
+	import motion
+
+	figure, ((acceleration_x),(acceleration_y),(acceleration_z),(frequency),(correlations)) = plt.subplots(5, 1)
+	figure.set_size_inches(16, 8)
+	figure.dpi = 200
+	scatter_series(acceleration_x, data[:,0], data[:,1], budget, marker='.', s=1)
+	acceleration_x.set_ylabel('Acceleration in x (G)')
+	acceleration_x.set_xlabel('Time (seconds)')
+	acceleration_x.set_ylim(bottom=-3, top=3)
+	scatter_series(acceleration_y, data[:,0], data[:,2], budget, marker='.', s=1)
+	acceleration_y.set_ylabel('Acceleration in y (G)')
+	acceleration_y.set_xlabel('Time (seconds)')
+	acceleration_y.set_ylim(bottom=-3, top=3)
+	scatter_series(acceleration_z, data[:,0], data[:,3], budget, marker='.', s=1)
+	acceleration_z.set_ylabel('Acceleration in z (G)')
+	acceleration_z.set_xlabel('Time (seconds)')
+	acceleration_z.set_ylim(bottom=-3, top=3)
+	frequency.magnitude_spectrum(data[:,1], Fs=1/0.01)
+	frequency.set_xlim(left=0, right=10)
+
+	times, periods, confidence = motion.periodicity(data[:,1:4], window_period=min(10.0, data[-1,0] - data[0,0]))
+	for i, channel in enumerate(motion.PERIODICITY_CHANNELS):
+		correlations.scatter(data[0,0] + times, periods[:,i], marker='.', s=4 * confidence[:,i].clip(0), label=channel)
+	correlations.set_ylabel('Period (seconds)')
+	correlations.set_xlabel('Time (seconds)')
+	correlations.legend()
+
+	for event in motion.count_repetitions(data[:,0], data[:,1]):
+		print(f"repetition at {event:.2f}s")
+
+	figure.savefig(file_name)
+	plt.close(figure)
+
+# Render the motion figures of an accelerometer recording
+def render_motion(input_path):
+	data = recording.load_acceleration(input_path)
+	plot_acceleration(output_path(input_path, '-motion'), data[1200:2400])
+	plot_acceleration(output_path(input_path, '-motion-full'), data[:1500])
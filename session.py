@@ -0,0 +1,88 @@
+import numpy as np
+import loader
+import recording
+import timeline
+from projections import LocalProjection
+
+# Read only view of a column of the location matrix
+def _column(name):
+	index = loader.LOCATION_COLUMNS[name]
+	return property(lambda self: self.data[:,index])
+
+# Locations, heart rate and RR intervals of a recording, sorted by time once when created.
+# Fixes repeating the time of the fix before them are dropped. A location matrix that is already in order
+# without repeats, such as a memory-mapped cached split, is kept as it is without a copy, and every column is a
+# view of it. The local projection, the positions in it and their spatial index are computed the first time they
+# are used.
+class Session:
+	time = _column('timeInterval')
+	longitude = _column('longitude')
+	latitude = _column('latitude')
+	altitude = _column('altitude')
+	horizontal_accuracy = _column('horizontalAccuracy')
+	vertical_accuracy = _column('verticalAccuracy')
+	speed = _column('speed')
+	speed_accuracy = _column('speedAccuracy')
+	course = _column('course')
+	course_accuracy = _column('courseAccuracy')
+
+	def __init__(self, data, heart_rate=None, rr_intervals=None, projection=None):
+		data = timeline.sort_by_time(data)
+		repeated = np.diff(data[:,0]) <= 0
+		if np.any(repeated):
+			data = data[np.concatenate([[True], ~repeated])]
+		self.data = data
+		self.heart_rate = timeline.sort_by_time(np.asarray(heart_rate if heart_rate is not None else np.zeros((0, 2)), dtype=float).reshape(-1, 2))
+		self.rr_intervals = np.zeros(0) if rr_intervals is None else rr_intervals
+		# Every row is in order of time, so consumers never need to sort
+		self.time_ordered = True
+		self._projection = projection
+		self._positions = None
+		self._spatial_index = None
+
+	# Session of one split of a recording, or of every split joined together
+	@classmethod
+	def load(cls, path, split=None, stream=False, use_cache=True):
+		return cls(*recording.load(path, split, stream, use_cache))
+
+	def __len__(self):
+		return len(self.data)
+
+	# projections.LocalProjection around the median position
+	@property
+	def projection(self):
+		if self._projection is None:
+			self._projection = LocalProjection.from_data(self.data)
+		return self._projection
+
+	# (n, 2) east and north meters of each fix in projection
+	@property
+	def positions(self):
+		if self._positions is None:
+			self._positions = self.projection.positions(self.data)
+		return self._positions
+
+	# spatial_index.SpatialIndex of positions for nearest, radius and bounding box queries
+	@property
+	def spatial_index(self):
+		if self._spatial_index is None:
+			# Imported here so sessions that are never queried do not load scipy
+			import spatial_index
+			self._spatial_index = spatial_index.SpatialIndex(self.positions, self.projection)
+		return self._spatial_index
+
+	# Columnar frame of timeline.session_frame with heart rate and optionally acceleration on the location timeline
+	def frame(self, acceleration=None, **options):
+		return timeline.session_frame(self.data, self.heart_rate, acceleration, **options)
+
+	# Session with positions replaced by the Kalman smoothed path, in the same projection
+	def smoothed(self, acceleration=1.0):
+		# Imported here so sessions that are never smoothed do not load the filter
+		import kalman
+		return Session(kalman.smooth_locations(self.data, self.projection, acceleration), self.heart_rate, self.rr_intervals, self.projection)
+
+# A Session of data, or data itself when it is already one, so functions accept either a session or a location matrix
+def as_session(data, heart_rate=None, rr_intervals=None):
+	if isinstance(data, Session):
+		return data
+	return Session(data, heart_rate, rr_intervals)
@@ -0,0 +1,50 @@
+import numpy as np
+from scipy import spatial
+
+# K-d tree over the positions of fixes in meters east and north of a projections.LocalProjection, answering
+# nearest neighbor, radius and bounding box queries in logarithmic time instead of comparing every fix.
+# Queries take points of longitude and latitude in degrees in an array of shape (..., 2), such as those of
+# geodesy.track or TrackFit.outline, and return rows of the location matrix. Fixes without a position are not
+# indexed.
+class SpatialIndex:
+	def __init__(self, positions, projection):
+		positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+		self.projection = projection
+		self.rows = np.flatnonzero(np.all(np.isfinite(positions), axis=1))
+		self.tree = spatial.cKDTree(positions[self.rows])
+
+	def __len__(self):
+		return len(self.rows)
+
+	# East and north meters in the projection of points of longitude and latitude, with the same shape
+	def project(self, points):
+		points = np.asarray(points, dtype=float)
+		east, north, _ = self.projection.forward(points[..., 0], points[..., 1])
+		return np.stack([east, north], axis=-1)
+
+	# Distances in meters and rows of the k fixes nearest to each point, nearest first, with the shape of points
+	# without its last axis, and then k when k > 1. Neighbors missing because fewer fixes than k are indexed, or
+	# none is within max_distance meters, have an infinite distance and row -1.
+	def nearest(self, points, k=1, max_distance=np.inf):
+		distances, indices = self.tree.query(self.project(points), k, distance_upper_bound=max_distance)
+		# The tree marks missing neighbors with the number of points it holds
+		return distances, np.append(self.rows, -1)[indices]
+
+	# Sorted rows of the fixes within radius meters of any of points
+	def within(self, points, radius):
+		points = self.project(points).reshape(-1, 2)
+		if len(points) == 0:
+			return np.zeros(0, dtype=int)
+		found = self.tree.query_ball_point(points, radius)
+		return np.unique(self.rows[np.concatenate([np.asarray(indices, dtype=int) for indices in found])])
+
+	# Sorted rows of the fixes in the box of the projection between the positions of its south west and north
+	# east corners, given as (west, south, east, north) in degrees
+	def box(self, bounds):
+		lower, upper = self.project([[bounds[0], bounds[1]], [bounds[2], bounds[3]]])
+		lower, upper = np.minimum(lower, upper), np.maximum(lower, upper)
+		# Fixes within the larger half side of the center in either direction, then those within each side
+		candidates = np.asarray(self.tree.query_ball_point((lower + upper) / 2, np.max(upper - lower) / 2, p=np.inf), dtype=int)
+		positions = self.tree.data[candidates]
+		inside = np.all((positions >= lower) & (positions <= upper), axis=1)
+		return np.sort(self.rows[candidates[inside]])
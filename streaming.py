@@ -0,0 +1,284 @@
+import numpy as np
+import geodesy
+import heart_rate_measurement
+import loader
+import metrics
+import timeline
+
+# Width in meters of the bins accuracy percentiles are counted in, and the largest accuracy binned
+ACCURACY_RESOLUTION = 0.1
+MAX_ACCURACY = 1000.0
+
+# Location metrics of metrics.split_metrics accumulated over chunks of fixes, each later than the one before.
+# Only the first and last fixes, running totals and fixed histograms of accuracy are kept between chunks, so
+# memory does not grow with the number of fixes. Accuracy percentiles are rounded to the center of the bin they
+# fall in.
+class LocationMetrics:
+	def __init__(self, metric='haversine'):
+		self.metric = metric
+		self.fixes = 0
+		self.start = np.inf
+		self.end = -np.inf
+		self.first = None
+		self.last = None
+		self.distance = {name: 0.0 for name in geodesy.DISTANCE_METRICS}
+		self.altitude_gain = 0.0
+		self.altitude_loss = 0.0
+		# Centered on multiples of the resolution
+		self.bins = np.arange(-ACCURACY_RESOLUTION / 2, MAX_ACCURACY + ACCURACY_RESOLUTION, ACCURACY_RESOLUTION)
+		self.horizontal_accuracy = np.zeros(len(self.bins) - 1, dtype=np.int64)
+		self.vertical_accuracy = np.zeros(len(self.bins) - 1, dtype=np.int64)
+
+	# Chunk is a matrix with the columns of loader.LOCATION_PROPERTIES
+	def update(self, chunk):
+		if len(chunk) == 0:
+			return
+		chunk = timeline.sort_by_time(chunk)
+		# Only fixes after every fix accepted so far are kept, so repeated times are dropped as session.Session
+		# drops them and fixes going back to before the last one of an earlier chunk are dropped too
+		chunk = chunk[chunk[:,0] > np.fmax.accumulate(np.concatenate([[self._latest()], chunk[:-1,0]]))]
+		if len(chunk) == 0:
+			return
+		time = chunk[:,0]
+		self.fixes += len(chunk)
+		self.start = min(self.start, time[0])
+		self.end = max(self.end, time[-1])
+		# Segments continue from the last fix of the previous chunk
+		self._add_segments(chunk if self.last is None else np.concatenate([self.last[None], chunk]))
+		self.horizontal_accuracy += self._histogram(chunk[:,4])
+		self.vertical_accuracy += self._histogram(chunk[:,5])
+		if self.first is None:
+			self.first = chunk[0].copy()
+		self.last = chunk[-1].copy()
+
+	# Add the metrics of other, whose fixes all come after those accumulated so far, with the segment between them
+	def merge(self, other):
+		if other.fixes == 0:
+			return
+		if other.start <= self._latest():
+			raise ValueError(f"Fixes from {other.start} overlap those up to {self._latest()} and cannot be merged")
+		if self.last is not None:
+			self._add_segments(np.stack([self.last, other.first]))
+		for name in geodesy.DISTANCE_METRICS:
+			self.distance[name] += other.distance[name]
+		self.altitude_gain += other.altitude_gain
+		self.altitude_loss += other.altitude_loss
+		self.horizontal_accuracy += other.horizontal_accuracy
+		self.vertical_accuracy += other.vertical_accuracy
+		self.fixes += other.fixes
+		self.start = min(self.start, other.start)
+		self.end = other.end
+		if self.first is None:
+			self.first = other.first
+		self.last = other.last
+
+	def _latest(self):
+		return -np.inf if self.last is None else self.last[0]
+
+	# Add the distances and climbs between consecutive fixes of joined
+	def _add_segments(self, joined):
+		for name in geodesy.DISTANCE_METRICS:
+			self.distance[name] += np.sum(geodesy.segment_distances(joined[:,1], joined[:,2], name))
+		climb = np.diff(joined[:,3])
+		climb = climb[np.isfinite(climb)]
+		self.altitude_gain += np.sum(climb[climb > 0])
+		self.altitude_loss += np.sum(-climb[climb < 0])
+
+	def _histogram(self, values):
+		values = values[np.isfinite(values)]
+		return np.histogram(np.clip(values, 0, MAX_ACCURACY), self.bins)[0]
+
+	def _percentiles(self, counts, q=metrics.ACCURACY_PERCENTILES):
+		total = np.sum(counts)
+		if total == 0:
+			return {f'p{p}': None for p in q}
+		# Bin of the value at each percentile in the ordering np.percentile interpolates between
+		index = np.searchsorted(np.cumsum(counts), np.array(q) / 100 * (total - 1), side='right')
+		centers = (self.bins[:-1] + self.bins[1:]) / 2
+		return {f'p{p}': centers[i] for p, i in zip(q, index)}
+
+	def result(self):
+		elapsed = self.end - self.start if self.fixes else 0.0
+		distance = self.distance[self.metric]
+		return {
+			'fixes': self.fixes,
+			'start': self.start if self.fixes else None,
+			'elapsed': elapsed,
+			'distance': dict(self.distance),
+			'speed': distance / elapsed if elapsed > 0 else None,
+			'pace': elapsed / (distance / 1000) if distance > 0 else None,
+			'altitude_gain': self.altitude_gain,
+			'altitude_loss': self.altitude_loss,
+			'horizontal_accuracy': self._percentiles(self.horizontal_accuracy),
+			'vertical_accuracy': self._percentiles(self.vertical_accuracy),
+		}
+
+# Heart rate metrics of metrics.heart_rate_metrics accumulated over chunks of measurements, each later than the
+# one before.
+# Each measurement counts for the time until the next one, so the first and last ones are held between chunks.
+class HeartRateMetrics:
+	def __init__(self, zones=metrics.HEART_RATE_ZONES):
+		self.zones = zones
+		self.count = 0
+		self.total = 0.0
+		self.minimum = np.inf
+		self.maximum = -np.inf
+		self.durations = np.zeros(len(zones) + 1)
+		self.first = None
+		self.last = None
+
+	# Chunk is a matrix of time and heart rate
+	def update(self, chunk):
+		if len(chunk) == 0:
+			return
+		chunk = timeline.sort_by_time(chunk)
+		# Measurements before the latest one so far are dropped so no duration is negative. Repeated times count
+		# for no time and are kept, as they are in heart rate of a session.
+		chunk = chunk[chunk[:,0] >= np.fmax.accumulate(np.concatenate([[self._latest()], chunk[:-1,0]]))]
+		if len(chunk) == 0:
+			return
+		values = chunk[:,1]
+		self.count += len(values)
+		self.total += np.sum(values)
+		self.minimum = min(self.minimum, np.min(values))
+		self.maximum = max(self.maximum, np.max(values))
+		self._add_durations(chunk if self.last is None else np.concatenate([self.last[None], chunk]))
+		if self.first is None:
+			self.first = chunk[0].copy()
+		self.last = chunk[-1].copy()
+
+	# Add the metrics of other, whose measurements all come after those accumulated so far, with the time between
+	# them
+	def merge(self, other):
+		if other.count == 0:
+			return
+		if other.first[0] < self._latest():
+			raise ValueError(f"Heart rate from {other.first[0]} overlaps that up to {self._latest()} and cannot be merged")
+		if self.last is not None:
+			self._add_durations(np.stack([self.last, other.first]))
+		self.count += other.count
+		self.total += other.total
+		self.minimum = min(self.minimum, other.minimum)
+		self.maximum = max(self.maximum, other.maximum)
+		self.durations += other.durations
+		if self.first is None:
+			self.first = other.first
+		self.last = other.last
+
+	def _latest(self):
+		return -np.inf if self.last is None else self.last[0]
+
+	# Add the time from each measurement of joined to the next to the zone of the measurement
+	def _add_durations(self, joined):
+		zone = np.digitize(joined[:-1,1], self.zones)
+		self.durations += np.bincount(zone, weights=np.diff(joined[:,0]), minlength=len(self.zones) + 1)
+
+	def result(self):
+		if self.count == 0:
+			return {'mean': None, 'min': None, 'max': None, 'zones': [0.0] * (len(self.zones) + 1)}
+		return {'mean': self.total / self.count, 'min': self.minimum, 'max': self.maximum, 'zones': self.durations.tolist()}
+
+# RR interval metrics of metrics.rr_metrics accumulated over chunks of RR intervals in 1/1024 seconds.
+# Mean and variance of chunks are merged pairwise so they do not lose precision over long sessions.
+class RRMetrics:
+	def __init__(self):
+		self.count = 0
+		self.mean = 0.0
+		self.squares = 0.0
+		self.differences = 0
+		self.difference_squares = 0.0
+		self.last = None
+
+	def update(self, chunk):
+		rr = np.asarray(chunk, dtype=float).reshape(-1) * 1000 / 1024
+		if len(rr) == 0:
+			return
+		mean = np.mean(rr)
+		count = self.count + len(rr)
+		delta = mean - self.mean
+		self.squares += np.sum((rr - mean) ** 2) + delta ** 2 * self.count * len(rr) / count
+		self.mean += delta * len(rr) / count
+		self.count = count
+		joined = rr if self.last is None else np.concatenate([[self.last], rr])
+		self.differences += len(joined) - 1
+		self.difference_squares += np.sum(np.diff(joined) ** 2)
+		self.last = rr[-1]
+
+	def result(self):
+		if self.count == 0:
+			return {'count': 0, 'mean': None, 'std': None, 'rmssd': None}
+		return {
+			'count': self.count,
+			'mean': self.mean,
+			'std': np.sqrt(self.squares / self.count),
+			'rmssd': np.sqrt(self.difference_squares / self.differences) if self.differences else None,
+		}
+
+# Metrics of a recording, or of one split of it, read incrementally and computed chunk_size records at a time.
+# Memory is bounded by the chunk size and the number of splits whatever the size of the file. Records are sorted
+# within each chunk, and records of a split going back to before an earlier chunk of it are dropped, so they are
+# taken to be in time order as they are recorded. Splits are accumulated separately and joined in order of time,
+# and splits overlapping in time raise a ValueError. Keys are those of metrics.split_metrics except hrv, which
+# needs every beat, and accuracy percentiles are counted in bins of ACCURACY_RESOLUTION meters.
+def stream_metrics(path, split=None, chunk_size=loader.CHUNK_SIZE, metric='haversine', zones=metrics.HEART_RATE_ZONES):
+	splits = {}
+	# RR intervals have no times of their own and are taken in file order, as in recording.load
+	rr_intervals = RRMetrics()
+
+	for index, key, records in record_chunks(path, split, chunk_size):
+		locations, heart_rate = splits.setdefault(index, (LocationMetrics(metric), HeartRateMetrics(zones)))
+		if key == 'locations':
+			locations.update(loader.columns(records, loader.LOCATION_PROPERTIES))
+		else:
+			time, encoded = loader.bluetooth_values({'bluetoothValues': records})
+			value, _, rr, _ = heart_rate_measurement.decode_measurements(encoded)
+			heart_rate.update(np.column_stack([time, value]))
+			rr_intervals.update(rr)
+
+	values = _merged(LocationMetrics(metric), [locations for locations, _ in splits.values()]).result()
+	values['heart_rate'] = _merged(HeartRateMetrics(zones), [heart_rate for _, heart_rate in splits.values()]).result()
+	values['rr_intervals'] = rr_intervals.result()
+	return values
+
+# Merge accumulators of splits into total in order of their first record
+def _merged(total, parts):
+	for part in sorted((part for part in parts if part.first is not None), key=lambda part: part.first[0]):
+		total.merge(part)
+	return total
+
+# Yields (split, key, records) with lists of at most chunk_size records of the arrays named by keys in every
+# split of a recording, or only in split, read incrementally. Records of each key are in file order, and no list
+# holds records of more than one split.
+def record_chunks(path, split=None, chunk_size=loader.CHUNK_SIZE, keys=('locations', 'bluetoothValues')):
+	chunks = {key: [] for key in keys}
+	current = None
+	with open(path) as f:
+		for index, key, record in loader.iter_records(f, keys):
+			if split is not None and index != split:
+				if index > split:
+					break
+				continue
+			if key is None:
+				for name in keys:
+					if chunks[name]:
+						yield current, name, chunks[name]
+						chunks[name] = []
+				current = index
+				continue
+			chunks[key].append(record)
+			if len(chunks[key]) >= chunk_size:
+				yield current, key, chunks[key]
+				chunks[key] = []
+	for name in keys:
+		if chunks[name]:
+			yield current, name, chunks[name]
+
+# Yields matrices of at most chunk_size fixes with the columns of loader.LOCATION_PROPERTIES, read incrementally
+def location_chunks(path, split=None, chunk_size=loader.CHUNK_SIZE):
+	for _, _, records in record_chunks(path, split, chunk_size, ('locations',)):
+		yield loader.columns(records, loader.LOCATION_PROPERTIES)
+
+# Number of splits in a recording, read incrementally
+def count_splits(path):
+	with open(path) as f:
+		return sum(1 for _, key, _ in loader.iter_records(f) if key is None)
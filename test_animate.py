@@ -0,0 +1,20 @@
+import unittest
+import numpy as np
+import animate
+
+class TestAnimate(unittest.TestCase):
+	def test_frame_indices(self):
+		# An hour of fixes once a second
+		time = 100.0 + np.arange(3600.0)
+		indices, frame_times = animate.frame_indices(time)
+		self.assertEqual(len(indices), len(time))
+		np.testing.assert_array_equal(indices, np.arange(1, 3601))
+		indices, frame_times = animate.frame_indices(time, fps=30, duration=60)
+		self.assertEqual(len(indices), 1800)
+		# The first frame shows the first fix and the last frame every fix
+		self.assertEqual(indices[0], 1)
+		self.assertEqual(indices[-1], len(time))
+		self.assertEqual(frame_times[-1], 3599.0)
+		self.assertTrue(np.all(np.diff(indices) >= 0))
+		indices, frame_times = animate.frame_indices(time, fps=30, duration=0.01)
+		np.testing.assert_array_equal(indices, [1])
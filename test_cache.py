@@ -0,0 +1,34 @@
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import cache
+
+class TestCache(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.root = Path(self.directory.name)
+		self.input = self.root.joinpath('recording.json')
+		self.input.write_text('[]')
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_round_trip(self):
+		splits = [(np.arange(20.0).reshape(2, 10), np.array([[1.0, 120.0]]), np.array([512.0, 600.0])),
+			(np.zeros((0, 10)), np.zeros((0, 2)), np.zeros(0))]
+		entry = cache.cache_path(self.input, self.root)
+		self.assertIsNone(cache.load(entry))
+		self.assertEqual(cache.store(entry, splits), entry)
+		cached = cache.load(entry)
+		self.assertEqual(len(cached), 2)
+		for expected, arrays in zip(splits, cached):
+			for e, a in zip(expected, arrays):
+				self.assertIsInstance(a, np.memmap)
+				np.testing.assert_array_equal(e, a)
+
+	def test_key_changes_with_content(self):
+		key = cache.cache_path(self.input, self.root)
+		self.input.write_text('[{}]')
+		self.assertNotEqual(key, cache.cache_path(self.input, self.root))
+		self.assertTrue(key.name.endswith(f'-v{cache.PARSER_VERSION}'))
@@ -0,0 +1,44 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+import cli
+import test_streaming
+
+class TestCli(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_input_paths(self):
+		for name in ['b.json', 'a.json', 'notes.txt']:
+			Path(self.directory.name, name).touch()
+		expected = [Path(self.directory.name, 'a.json'), Path(self.directory.name, 'b.json')]
+		self.assertEqual(cli.input_paths(self.directory.name), expected)
+		self.assertEqual(cli.input_paths(os.path.join(self.directory.name, '*.json')), expected)
+		self.assertEqual(cli.input_paths('missing.json'), [Path('missing.json')])
+
+	def test_batch_failure(self):
+		for name, splits in [('a.json', 2), ('b.json', 1)]:
+			test_streaming.write_recording(os.path.join(self.directory.name, name), splits, 20)
+		with open(os.path.join(self.directory.name, 'corrupt.json'), 'w') as f:
+			f.write('[{"locations": [{"timeInterval": ')
+		paths = cli.input_paths(self.directory.name)
+		errors = io.StringIO()
+		with contextlib.redirect_stderr(errors):
+			results, failures = cli.batch(cli.load_metrics, paths, jobs=2, use_cache=False)
+		# The corrupt file fails once while the others are processed as a whole and per split
+		self.assertEqual(failures, 1)
+		self.assertEqual(sorted((path.name, split if split is not None else -1) for path, split, _ in results),
+			[('a.json', -1), ('a.json', 0), ('a.json', 1), ('b.json', -1), ('b.json', 0)])
+		self.assertIn('corrupt.json', errors.getvalue())
+		# Tasks of a split missing from a file fail alone
+		with contextlib.redirect_stderr(errors):
+			results, failures = cli.batch(cli.load_metrics, paths, jobs=2, split=1, use_cache=False)
+		self.assertEqual([path.name for path, _, _ in results], ['a.json'])
+		self.assertEqual(failures, 2)
+		self.assertIn('b.json split 1', errors.getvalue())
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+import decimate
+
+# Sequential largest triangle three buckets, anchoring each bucket on the point kept in the one before it
+def reference_lttb(x, y, budget):
+	n = len(x)
+	bounds = np.linspace(1, n - 1, budget - 1).astype(int)
+	kept = [0]
+	for i in range(budget - 2):
+		start, end = bounds[i], bounds[i + 1]
+		if i == budget - 3:
+			next_x, next_y = x[-1], y[-1]
+		else:
+			following = slice(bounds[i + 1], bounds[i + 2])
+			next_x, next_y = np.mean(x[following]), np.mean(y[following])
+		a = kept[-1]
+		area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+		kept.append(start + np.argmax(area))
+	return np.array(kept + [n - 1])
+
+class TestDecimate(unittest.TestCase):
+	def test_lttb(self):
+		rng = np.random.default_rng(0)
+		x = np.arange(100000.0)
+		y = np.cumsum(rng.normal(size=100000))
+		y[12345] += 1000
+		indices = decimate.lttb(x, y, 1000)
+		self.assertEqual(len(indices), 1000)
+		self.assertEqual(indices[0], 0)
+		self.assertEqual(indices[-1], 99999)
+		self.assertTrue(np.all(np.diff(indices) > 0))
+		self.assertIn(12345, indices)
+		self.assertGreater(np.mean(indices == reference_lttb(x, y, 1000)), 0.85)
+		np.testing.assert_array_equal(decimate.lttb(x[:50], y[:50], 101), np.arange(50))
+		np.testing.assert_array_equal(decimate.lttb(x, y, None), np.arange(len(x)))
+
+	def test_series(self):
+		rng = np.random.default_rng(0)
+		x = np.arange(100000.0)
+		y = np.cumsum(rng.normal(size=100000))
+		y[::7] = np.nan
+		indices = decimate.series(x, y, budget=1000)
+		self.assertEqual(len(indices), 1000)
+		self.assertTrue(np.all(np.isfinite(y[indices])))
+		# Points sharing a cell are dropped before picking by budget
+		self.assertLessEqual(len(decimate.series(x, np.sin(x / 1000), (100, 50), budget=10000)), 100 * 50)
+		# Also when fewer points than the budget are left
+		self.assertLessEqual(len(decimate.series(x[:1000], y[:1000], (10, 10))), 10 * 10)
+		np.testing.assert_array_equal(decimate.series(x[:1000], y[:1000], (10, 10), budget=None), np.flatnonzero(np.isfinite(y[:1000])))
+
+	def test_grid(self):
+		x = np.array([0.0, 0.1, 0.9, 1.0, 0.05])
+		y = np.array([0.0, 0.1, 0.9, 1.0, 0.0])
+		np.testing.assert_array_equal(decimate.grid(x, y, (2, 2)), [0, 2])
+		np.testing.assert_array_equal(decimate.grid(x, y, (20, 20)), [0, 1, 2, 3, 4])
+		self.assertEqual(len(decimate.grid(np.zeros(0), np.zeros(0), (2, 2))), 0)
+
+	def test_positions(self):
+		rng = np.random.default_rng(0)
+		x = np.cumsum(rng.normal(size=200000))
+		y = np.cumsum(rng.normal(size=200000))
+		indices = decimate.positions(x, y, (400, 300))
+		self.assertLess(len(indices), len(x) / 5)
+		self.assertTrue(np.all(np.diff(indices) > 0))
+		self.assertLessEqual(len(decimate.positions(x, y, (400, 300), budget=500)), 500)
+		np.testing.assert_array_equal(decimate.positions(np.zeros(3), np.zeros(3), (10, 10)), [0])
+		x[5] = np.nan
+		np.testing.assert_array_equal(decimate.positions(x, y, (400, 300), budget=None), np.delete(np.arange(len(x)), 5))
@@ -16,6 +16,30 @@ class TestGeodesy(unittest.TestCase):
 
 	def test_types(self):
 		self.assertRaises(TypeError, project_latitude, "45.0")
+		self.assertRaises(TypeError, project_latitude, np.array(["45.0"]))
+		self.assertRaises(TypeError, project_latitude, True)
+
+	def test_validation(self):
+		latitude = np.array([45.0, -45.0, np.nan, 135.0, -90.5])
+		self.assertRaises(ValueError, project_latitude, latitude)
+		self.assertRaises(ValueError, project_latitude, latitude, 'lenient')
+		# Missing fixes are not out of range
+		np.testing.assert_array_equal(np.isnan(project_latitude(latitude[:3])), [False, False, True])
+		masked = project_latitude(latitude, 'mask')
+		np.testing.assert_allclose(masked[:2], [project_latitude(45.0), project_latitude(-45.0)])
+		self.assertTrue(np.all(np.isnan(masked[2:])))
+		self.assertTrue(np.isnan(project_latitude(135.0, 'mask')))
+		np.testing.assert_array_equal(project_latitude(latitude[:2], 'off'), masked[:2])
+		self.assertRaises(ValueError, geodesy.project_longitude, np.array([0.0, 181.0]))
+		self.assertTrue(np.isnan(geodesy.project_longitude(np.array([181.0]), 'mask')[0]))
+
+	def test_float32(self):
+		latitude = np.linspace(-80, 80, 9, dtype=np.float32)
+		for validation in geodesy.VALIDATION_MODES:
+			projected = project_latitude(latitude, validation)
+			self.assertEqual(projected.dtype, np.float32)
+			np.testing.assert_allclose(projected, project_latitude(latitude.astype(float)), rtol=1e-5, atol=1e-6)
+		self.assertEqual(geodesy.project_longitude(latitude).dtype, np.float32)
 
 #	def test_solve_triangle(self):
 #		self.assertEqual(geodesy.solve_right_unit_triangle(np.pi/64, np.pi/8), 4)
@@ -29,6 +53,81 @@ class TestGeodesy(unittest.TestCase):
 		p2 = np.radians([-98.315949, 38.504048])
 		np.testing.assert_allclose(geodesy.haversine_distance(p1, p2), 347300, rtol=1)
 
+	def test_segment_distances(self):
+		longitude = np.array([-74, 5/60, -99.436554, -98.315949])
+		latitude = np.array([40 + 42/60, 51 + 32/60, 41.507483, 38.504048])
+		expected = [geodesy.haversine_distance(np.radians([longitude[i], latitude[i]]), np.radians([longitude[i+1], latitude[i+1]])) for i in range(3)]
+		np.testing.assert_allclose(geodesy.segment_distances(longitude, latitude), expected)
+		np.testing.assert_allclose(geodesy.cumulative_distance(longitude, latitude), np.cumsum([0] + expected))
+		self.assertEqual(len(geodesy.segment_distances(longitude[:1], latitude[:1])), 0)
+		self.assertRaises(ValueError, geodesy.segment_distances, longitude, latitude, 'manhattan')
+
+	def test_metrics_agree_over_short_distances(self):
+		longitude = -75.7 + np.linspace(0, 0.001, 50)
+		latitude = 45.4 + np.linspace(0, 0.001, 50)
+		haversine = geodesy.cumulative_distance(longitude, latitude)
+		np.testing.assert_allclose(geodesy.cumulative_distance(longitude, latitude, metric='cartesian'), haversine, rtol=1e-6)
+		# Mercator is not scaled by latitude so it only has to be the right order of magnitude
+		np.testing.assert_allclose(geodesy.cumulative_distance(longitude, latitude, metric='mercator')[-1], haversine[-1], rtol=1)
+		# The sphere is within about 0.5% of the ellipsoid
+		np.testing.assert_allclose(geodesy.cumulative_distance(longitude, latitude, metric='ecef'), haversine, rtol=5e-3)
+		np.testing.assert_allclose(geodesy.cumulative_distance(longitude, latitude, metric='vincenty'), geodesy.cumulative_distance(longitude, latitude, metric='ecef'), rtol=1e-9)
+
+	def test_vincenty(self):
+		# Flinders Peak to Buninyong from Vincenty (1975)
+		longitude = [144 + 25/60 + 29.52440/3600, 143 + 55/60 + 35.38390/3600]
+		latitude = [-(37 + 57/60 + 3.72030/3600), -(37 + 39/60 + 10.15610/3600)]
+		distance, azimuth1, azimuth2, converged = geodesy.vincenty_inverse(longitude[0], latitude[0], longitude[1], latitude[1])
+		np.testing.assert_allclose(distance, 54972.271, atol=1e-3)
+		np.testing.assert_allclose(np.degrees(azimuth1), 306 + 52/60 + 5.37/3600, atol=1e-5)
+		np.testing.assert_allclose(np.degrees(azimuth2), 307 + 10/60 + 25.07/3600, atol=1e-5)
+		self.assertTrue(converged)
+
+		# Along the equator, between poles, coincident, and nearly antipodal where the method does not converge
+		distance, _, _, converged = geodesy.vincenty_inverse([0, 0, 10, 0], [0, -90, 10, 0], [90, 0, 10, 179.7], [0, 90, 10, 0.5])
+		np.testing.assert_allclose(distance[:3], [geodesy.WGS84_a * np.pi / 2, 20003931.4586, 0.0], atol=1e-3)
+		np.testing.assert_array_equal(converged, [True, True, True, False])
+		self.assertTrue(np.isfinite(distance[3]))
+
+		# The segment metric only solves segments longer than the chord threshold
+		longitude = np.array([0.0, 0.001, 1.0])
+		latitude = np.array([0.0, 0.0, 1.0])
+		segments = geodesy.segment_distances(longitude, latitude, 'vincenty')
+		np.testing.assert_allclose(segments, geodesy.vincenty_inverse(longitude[:-1], latitude[:-1], longitude[1:], latitude[1:])[0], rtol=1e-9)
+
+	def test_ecef(self):
+		np.testing.assert_allclose(geodesy.ecef(0.0, 0.0), [geodesy.WGS84_a, 0.0, 0.0])
+		np.testing.assert_allclose(geodesy.ecef([90.0, 0.0], [0.0, 90.0], 10.0), [[0.0, geodesy.WGS84_a + 10, 0.0], [0.0, 0.0, geodesy.WGS84_b + 10]], atol=1e-6)
+
+	def test_point(self):
+		origin = np.array([0.0, 0.0])
+		directions = np.linspace(0, 2 * np.pi, 16, endpoint=False)
+		points = geodesy.point(origin, 1000, directions)
+		self.assertEqual(points.shape, (16, 2))
+		# Offsets are not scaled by latitude so distances are only exact at the equator
+		distances = geodesy.haversine_distance(np.radians(origin), np.radians(points.T))
+		np.testing.assert_allclose(distances, 1000, rtol=1e-6)
+		np.testing.assert_allclose(geodesy.point(origin, 1000, np.pi / 2), [0, 1000 / geodesy.MEAN_RADIUS * 180 / np.pi])
+		np.testing.assert_allclose(geodesy.point(origin, 0, 1.0), origin)
+		self.assertRaises(ValueError, geodesy.point, origin, 1000, -1.0)
+
+	def test_track(self):
+		center = np.array([-75.7, 45.4])
+		track = geodesy.track(center, np.pi / 4)
+		self.assertEqual(track.shape, (80, 2))
+		self.assertEqual(geodesy.track(center, np.pi / 4, n=25).shape, (200, 2))
+		# Many candidate tracks at once match tracks generated one at a time
+		centers = center + np.array([[0.0, 0.0], [1e-4, -1e-4], [2e-4, 0.0]])
+		directions = np.array([np.pi / 4, 1.0, 4.0])
+		tracks = geodesy.track(centers, directions)
+		self.assertEqual(tracks.shape, (3, 80, 2))
+		for i in range(3):
+			np.testing.assert_allclose(tracks[i], geodesy.track(centers[i], directions[i]))
+		# The inner edge of the front straight is as long as the straight
+		track = geodesy.track([0.0, 0.0], 0.0)
+		straight = geodesy.cumulative_distance(track[:10,0], track[:10,1])
+		np.testing.assert_allclose(straight[-1], geodesy.TRACK_STRAIGHT, rtol=0.01)
+
 #	def test_add_bearing(self):
 #		point = np.array([0.0, 0.0])
 #		magnitude = 5000000
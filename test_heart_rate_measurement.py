@@ -0,0 +1,34 @@
+import base64
+import unittest
+import numpy as np
+import heart_rate_measurement
+
+class TestHeartRateMeasurement(unittest.TestCase):
+	def test_decode_measurement(self):
+		self.assertEqual(heart_rate_measurement.decode_measurement(b'\x00\x50'), (80, None, []))
+		self.assertEqual(heart_rate_measurement.decode_measurement(b'\x01\x10\x01'), (272, None, []))
+		self.assertEqual(heart_rate_measurement.decode_measurement(b'\x08\x50\x05\x00'), (80, 5, []))
+		self.assertEqual(heart_rate_measurement.decode_measurement(b'\x16\x50\x00\x02\x00\x04'), (80, None, [512, 1024]))
+		self.assertEqual(heart_rate_measurement.decode_measurement(b'\x19\x10\x01\x05\x00\x00\x02'), (272, 5, [512]))
+
+	def test_decode_measurements(self):
+		packets = [b'\x16\x50\x00\x02', b'\x00\x51', b'\x19\x10\x01\x05\x00\x01\x02\x02\x02\x03\x02']
+		encoded = [base64.b64encode(packet).decode() for packet in packets]
+		heart_rate, energy, rr_intervals, rr_offsets = heart_rate_measurement.decode_measurements(encoded)
+		np.testing.assert_array_equal(heart_rate, [80, 81, 272])
+		np.testing.assert_array_equal(energy, [np.nan, np.nan, 5])
+		np.testing.assert_array_equal(rr_intervals, [512, 513, 514, 515])
+		np.testing.assert_array_equal(rr_offsets, [0, 1, 1, 4])
+
+	def test_base64_decode(self):
+		packets = [bytes(range(length)) for length in range(10)]
+		decoded, lengths = heart_rate_measurement.base64_decode([base64.b64encode(packet) for packet in packets])
+		np.testing.assert_array_equal(lengths, range(10))
+		for packet, row in zip(packets, decoded):
+			self.assertEqual(bytes(row[:len(packet)]), packet)
+
+	def test_empty(self):
+		heart_rate, energy, rr_intervals, rr_offsets = heart_rate_measurement.decode_measurements([])
+		self.assertEqual(len(heart_rate), 0)
+		self.assertEqual(len(rr_intervals), 0)
+		np.testing.assert_array_equal(rr_offsets, [0])
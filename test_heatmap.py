@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import heatmap
+import test_streaming
+
+class TestHeatmap(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_accumulate(self):
+		bounds = (0.0, 0.0, 2.0, 1.0)
+		grid = np.zeros(heatmap.grid_shape(bounds, 4), dtype=np.int64)
+		self.assertEqual(grid.shape, (2, 4))
+		longitude = np.array([0.1, 0.1, 1.9, 2.0, 3.0, np.nan])
+		latitude = np.array([0.1, 0.1, 0.9, 1.0, 0.5, 0.5])
+		heatmap.accumulate(grid, bounds, longitude, latitude)
+		# Fixes on the east and north bounds count in the last cells, and those outside are left out
+		expected = np.zeros((2, 4), dtype=np.int64)
+		expected[0, 0] = 2
+		expected[1, 3] = 2
+		np.testing.assert_array_equal(grid, expected)
+		heatmap.accumulate(grid, bounds, longitude, latitude)
+		self.assertEqual(np.sum(grid), 8)
+
+	def test_narrow_shape(self):
+		# A kilometer north to south with about 10 meters of spread east to west
+		bounds = (-75.70006, 45.4, -75.69994, 45.409)
+		rows, columns = heatmap.grid_shape(bounds, 1024)
+		self.assertEqual(rows, 1024)
+		self.assertLess(columns, 20)
+		self.assertEqual(heatmap.grid_shape((-75.7, 45.4, -75.7, 45.4), 1024), (1, 1))
+		grid = np.zeros((rows, columns), dtype=np.int64)
+		heatmap.accumulate(grid, bounds, np.array([-75.70006, -75.69994]), np.array([45.4, 45.409]))
+		self.assertEqual(grid[0, 0], 1)
+		self.assertEqual(grid[-1, -1], 1)
+
+	def test_union(self):
+		self.assertEqual(heatmap.union([(0, 1, 2, 3), None, (-1, 2, 1, 4)]), (-1, 1, 2, 4))
+		self.assertIsNone(heatmap.union([None]))
+
+	def test_heatmap(self):
+		paths = [os.path.join(self.directory.name, f'{i}.json') for i in range(3)]
+		for i, path in enumerate(paths):
+			test_streaming.write_recording(path, i + 1, 100)
+		missing = os.path.join(self.directory.name, 'missing.json')
+		for chunk_size in [7, heatmap.CHUNK_SIZE]:
+			grid, bounds, failures = heatmap.heatmap(paths + [missing], width=64, jobs=2, chunk_size=chunk_size, use_cache=False)
+			self.assertEqual(failures, 1)
+			self.assertEqual(np.sum(grid), 600)
+			self.assertEqual(grid.shape[1], 64)
+			extent = heatmap.extent(paths[2], use_cache=False)
+			np.testing.assert_allclose(bounds, extent)
+			# Counting files one at a time gives the same grid as merging them
+			total = sum(heatmap.file_grid(path, bounds, grid.shape, chunk_size, use_cache=False) for path in paths)
+			np.testing.assert_array_equal(grid, total)
+		with self.assertRaises(ValueError):
+			heatmap.heatmap([missing], jobs=1, use_cache=False)
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import hrv
+
+# RR intervals in milliseconds modulated by a sine of amplitude in ms and frequency in Hz
+def modulated(n, amplitude, frequency, mean=800.0):
+	time = np.arange(n) * mean / 1000
+	return mean + amplitude * np.sin(2 * np.pi * frequency * time)
+
+class TestHRV(unittest.TestCase):
+	def test_normal_beats(self):
+		rr = np.full(50, 800.0)
+		rr[[0, 10, 30]] = [1400.0, 500.0, 2500.0]
+		rr[20] = np.nan
+		normal = hrv.normal_beats(rr)
+		np.testing.assert_array_equal(np.flatnonzero(~normal), [0, 10, 20, 30])
+		self.assertEqual(len(hrv.normal_beats(np.zeros(0))), 0)
+		np.testing.assert_allclose(hrv.milliseconds([1024, 512]), [1000, 500])
+
+	def test_time_domain(self):
+		rr = np.array([800.0, 860.0, 800.0, 820.0, 1600.0, 800.0])
+		normal = np.array([True, True, True, True, False, True])
+		metrics = hrv.time_domain(rr, normal)
+		nn = rr[normal]
+		self.assertEqual(metrics['beats'], 5)
+		np.testing.assert_allclose(metrics['sdnn'], np.std(nn, ddof=1))
+		# Differences next to the artifact are left out
+		np.testing.assert_allclose(metrics['rmssd'], np.sqrt(np.mean(np.array([60.0, -60.0, 20.0]) ** 2)))
+		np.testing.assert_allclose(metrics['pnn50'], 200 / 3)
+		self.assertTrue(np.isnan(hrv.time_domain(np.zeros(0))['rmssd']))
+
+	def test_sliding_metrics(self):
+		rng = np.random.default_rng(0)
+		rr = rng.normal(800, 40, 3000)
+		normal = hrv.normal_beats(rr)
+		windows = hrv.sliding_metrics(rr, normal, window=60.0, step=20.0)
+		self.assertEqual(set(windows), set(hrv.WINDOW_METRICS))
+		time = hrv.beat_times(rr)
+		for i in [0, 17, len(windows['time']) - 1]:
+			inside = (time > windows['time'][i] - 60.0) & (time <= windows['time'][i])
+			expected = hrv.time_domain(rr[inside], normal[inside])
+			for name in hrv.WINDOW_METRICS[1:]:
+				np.testing.assert_allclose(windows[name][i], expected[name], rtol=1e-9)
+
+	def test_frequency_domain(self):
+		rr = modulated(1500, 30.0, 0.1) + modulated(1500, 10.0, 0.25) - 800.0
+		welch = hrv.frequency_domain(rr)
+		# A sine of amplitude A has a power of A² / 2, and resampling damps the high frequency
+		np.testing.assert_allclose(welch['lf'], 450, rtol=0.1)
+		np.testing.assert_allclose(welch['hf'], 50, rtol=0.3)
+		lomb = hrv.frequency_domain(rr, method='lomb')
+		np.testing.assert_allclose(lomb['lf'], 450, rtol=0.1)
+		np.testing.assert_allclose(lomb['hf'], 50, rtol=0.1)
+		self.assertRaises(ValueError, hrv.spectrum, rr, method='fft')
+		self.assertTrue(np.isnan(hrv.frequency_domain(rr[:3])['lf_hf']))
@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+import kalman
+from projections import LocalProjection
+
+# Fixes of a path curving at 4 m/s with noise within the reported accuracies
+def noisy_fixes(n=600, seed=0):
+	rng = np.random.default_rng(seed)
+	time = np.arange(n, dtype=float)
+	heading = np.linspace(0, 3 * np.pi, n)
+	velocities = 4.0 * np.column_stack([np.sin(heading), np.cos(heading)])
+	truth = np.concatenate([[[0.0, 0.0]], np.cumsum(velocities[:-1], axis=0)])
+	positions = truth + rng.normal(0, 5.0, (n, 2))
+	measured_velocities = velocities + rng.normal(0, 0.5, (n, 2))
+	return time, truth, positions, np.full(n, 25.0), measured_velocities, np.full(n, 0.25), velocities
+
+def rms(error):
+	return np.sqrt(np.mean(np.sum(error ** 2, axis=1)))
+
+class TestKalman(unittest.TestCase):
+	def test_smoother_reduces_error(self):
+		time, truth, positions, position_variance, velocities, velocity_variance, true_velocities = noisy_fixes()
+		kalman_filter = kalman.ConstantVelocityFilter(acceleration=0.5)
+		states, covariances = kalman_filter.update(time, positions, position_variance, velocities, velocity_variance)
+		smoothed = kalman.smooth(time, states, covariances, acceleration=0.5)
+		self.assertEqual(smoothed.shape, (len(time), len(kalman.STATE_COLUMNS)))
+		fix_error = rms(positions - truth)
+		filter_error = rms(states[:,[0, 2]] - truth)
+		smooth_error = rms(smoothed[:,[0, 2]] - truth)
+		self.assertLess(filter_error, 0.6 * fix_error)
+		self.assertLess(smooth_error, filter_error)
+		self.assertLess(rms(smoothed[:,[1, 3]] - true_velocities), 0.5)
+
+	def test_chunks(self):
+		time, _, positions, position_variance, velocities, velocity_variance, _ = noisy_fixes(200)
+		whole = kalman.ConstantVelocityFilter().update(time, positions, position_variance, velocities, velocity_variance)
+		kalman_filter = kalman.ConstantVelocityFilter()
+		chunks = [kalman_filter.update(time[i:i + 7], positions[i:i + 7], position_variance[i:i + 7], velocities[i:i + 7], velocity_variance[i:i + 7]) for i in range(0, 200, 7)]
+		np.testing.assert_allclose(np.concatenate([chunk[0] for chunk in chunks]), whole[0])
+		np.testing.assert_allclose(np.concatenate([chunk[1] for chunk in chunks]), whole[1])
+
+	def test_missing_measurements(self):
+		time, truth, positions, position_variance, velocities, velocity_variance, _ = noisy_fixes(300)
+		# Fixes flagged invalid or missing are ignored however wrong they are
+		positions[100:120] = 1e6
+		position_variance[100:110] = np.inf
+		position_variance[110:120] = np.nan
+		velocities[150] = np.nan
+		states, covariances = kalman.ConstantVelocityFilter(acceleration=0.5).update(time, positions, position_variance, velocities, velocity_variance)
+		smoothed = kalman.smooth(time, states, covariances, acceleration=0.5)
+		self.assertTrue(np.all(np.isfinite(smoothed)))
+		self.assertLess(np.max(np.hypot(*(smoothed[100:120,[0, 2]] - truth[100:120]).T)), 10.0)
+
+	def test_smooth_locations(self):
+		time, truth, positions, _, velocities, _, _ = noisy_fixes(300)
+		projection = LocalProjection(-75.7, 45.4)
+		data = np.zeros((300, 10))
+		data[:,0] = time
+		data[:,1], data[:,2], _ = projection.inverse(positions[:,0], positions[:,1])
+		data[:,4] = 5.0
+		data[:,6] = np.hypot(*velocities.T)
+		data[:,7] = 0.5
+		data[:,8] = np.degrees(np.arctan2(velocities[:,0], velocities[:,1])) % 360
+		data[:,9] = 5.0
+		smoothed = kalman.smooth_locations(data[::-1], projection)
+		np.testing.assert_array_equal(smoothed[:,0], time)
+		np.testing.assert_array_equal(smoothed[:,3:], data[:,3:])
+		error = rms(projection.positions(smoothed) - truth)
+		self.assertLess(error, 0.5 * rms(positions - truth))
+		np.testing.assert_allclose(kalman.smooth_states(data, projection, chunk_size=50), kalman.smooth_states(data, projection))
+		self.assertEqual(kalman.smooth_locations(np.zeros((0, 10))).shape, (0, 10))
@@ -0,0 +1,44 @@
+import io
+import json
+import unittest
+import numpy as np
+import loader
+
+class TestLoader(unittest.TestCase):
+	def test_columns(self):
+		records = [{'timestamp': 1.0, 'x': 0.5, 'y': -0.5, 'z': 1.0}, {'timestamp': 2.0, 'x': None, 'z': 0.0}]
+		data = loader.acceleration(records)
+		self.assertEqual(data.shape, (2, 4))
+		np.testing.assert_array_equal(data[0], [1.0, 0.5, -0.5, 1.0])
+		self.assertTrue(np.isnan(data[1, 1]))
+		self.assertTrue(np.isnan(data[1, 2]))
+
+	def test_columns_from_stream(self):
+		records = ({'timestamp': float(i), 'x': 0, 'y': 0, 'z': 0} for i in range(5))
+		np.testing.assert_array_equal(loader.acceleration(records)[:, 0], np.arange(5))
+
+	def test_empty_split(self):
+		self.assertEqual(loader.locations({}).shape, (0, len(loader.LOCATION_PROPERTIES)))
+		time, encoded = loader.bluetooth_values({'bluetoothValues': []})
+		self.assertEqual(len(time), 0)
+		self.assertEqual(len(encoded), 0)
+
+	def test_iter_json_array(self):
+		elements = [{'locations': [{'timeInterval': i, 'longitude': 1.5} for i in range(20)]}, 12345, [1, [2]], 'a]', 6789]
+		text = ' \n' + json.dumps(elements, indent=1) + '\n'
+		for chunk_size in [1, 3, 7, 1 << 16]:
+			self.assertEqual(list(loader.iter_json_array(io.StringIO(text), chunk_size)), elements)
+		self.assertEqual(list(loader.iter_json_array(io.StringIO('[]'))), [])
+
+	def test_iter_json_array_errors(self):
+		self.assertRaises(ValueError, list, loader.iter_json_array(io.StringIO('{"a": 1}')))
+		self.assertRaises(ValueError, list, loader.iter_json_array(io.StringIO('[{"a": 1}, {"b"')))
+
+	def test_iter_records(self):
+		splits = [{'start': {'a': [1]}, 'locations': [{'timeInterval': 1}, {'timeInterval': 2.5e3}], 'bluetoothValues': []}, {}, {'bluetoothValues': [{'value': 'AA=='}]}]
+		text = json.dumps(splits, indent=1)
+		expected = [(0, None, None), (0, 'locations', {'timeInterval': 1}), (0, 'locations', {'timeInterval': 2.5e3}), (1, None, None), (2, None, None), (2, 'bluetoothValues', {'value': 'AA=='})]
+		for chunk_size in [1, 5, 1 << 16]:
+			self.assertEqual(list(loader.iter_records(io.StringIO(text), chunk_size=chunk_size)), expected)
+		self.assertEqual(list(loader.iter_records(io.StringIO('[]'))), [])
+		self.assertRaises(ValueError, list, loader.iter_records(io.StringIO('[{"locations": [{"timeInterval": 1}')))
@@ -0,0 +1,40 @@
+import json
+import unittest
+import numpy as np
+import metrics
+
+class TestMetrics(unittest.TestCase):
+	def test_split_metrics(self):
+		# 11 fixes 10 seconds apart heading north, unsorted
+		data = np.zeros((11, 10))
+		data[:,0] = np.arange(11) * 10.0
+		data[:,1] = -75.7
+		data[:,2] = 45.4 + np.arange(11) * 1e-4
+		data[:,3] = [70, 71, 72, 71, 70, 72, 74, 74, 73, 75, 76]
+		data[:,4] = np.arange(11)
+		data[:,5] = np.nan
+		heart_rate = np.array([[0.0, 100], [10.0, 120], [30.0, 180], [40.0, 181]])
+		rr_intervals = np.array([1024, 1024, 512])
+		values = metrics.split_metrics(data[::-1], heart_rate, rr_intervals)
+
+		self.assertEqual(values['fixes'], 11)
+		self.assertEqual(values['elapsed'], 100.0)
+		np.testing.assert_allclose(values['distance']['haversine'], 111.2, rtol=1e-2)
+		np.testing.assert_allclose(values['pace'], 100.0 / (values['distance']['haversine'] / 1000))
+		self.assertEqual(values['altitude_gain'], 9.0)
+		self.assertEqual(values['altitude_loss'], 3.0)
+		self.assertEqual(values['horizontal_accuracy']['p50'], 5.0)
+		self.assertIsNone(values['vertical_accuracy']['p50'])
+		self.assertEqual(values['heart_rate']['zones'], [0.0, 10.0, 20.0, 0.0, 0.0, 10.0, 0.0])
+		self.assertEqual(values['rr_intervals']['count'], 3)
+		np.testing.assert_allclose(values['rr_intervals']['rmssd'], np.sqrt((0 + 500 ** 2) / 2))
+
+	def test_empty(self):
+		values = metrics.split_metrics(np.zeros((0, 10)), np.zeros((0, 2)), np.zeros(0))
+		self.assertEqual(values['elapsed'], 0.0)
+		self.assertIsNone(values['pace'])
+		self.assertIsNone(values['heart_rate']['mean'])
+		json.dumps(metrics.to_json(values), allow_nan=False)
+
+	def test_to_json(self):
+		self.assertEqual(metrics.to_json({'a': np.float64(np.nan), 'b': [np.int64(2), 1.5], 'c': None, 'd': True}), {'a': None, 'b': [2, 1.5], 'c': None, 'd': True})
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import motion
+
+class TestMotion(unittest.TestCase):
+	def setUp(self):
+		rng = np.random.default_rng(0)
+		self.time = np.arange(0, 30, 0.01)
+		# 1.5 second repetitions with noise
+		phase = 2 * np.pi * self.time / 1.5
+		self.signal = np.sin(phase) + 0.5 * np.sin(2 * phase + 1) + 0.1 * rng.normal(size=len(self.time))
+
+	def test_normalized_cross_correlation(self):
+		correlation = motion.normalized_cross_correlation(self.signal, self.signal[:150])
+		self.assertEqual(len(correlation), len(self.signal) - 149)
+		self.assertAlmostEqual(correlation[0], 1.0)
+		self.assertTrue(np.all(np.abs(correlation) <= 1 + 1e-9))
+		np.testing.assert_array_equal(motion.normalized_cross_correlation(np.ones(10), [1, 2]), np.zeros(9))
+
+	def test_count_repetitions(self):
+		counter = motion.RepetitionCounter(template_length=150)
+		counter.update(self.time, self.signal)
+		counter.finish()
+		self.assertEqual(counter.count, 20)
+		np.testing.assert_allclose(np.diff(counter.events), 1.5, atol=0.05)
+
+	def test_chunks_match_whole_stream(self):
+		whole = motion.RepetitionCounter(template=self.signal[:150])
+		whole.update(self.time, self.signal)
+		for chunk in [1, 64, 1000]:
+			counter = motion.RepetitionCounter(template=self.signal[:150], fft_size=256)
+			events = []
+			for i in range(0, len(self.time), chunk):
+				events.extend(counter.update(self.time[i:i + chunk], self.signal[i:i + chunk]))
+			np.testing.assert_array_equal(events, whole.events)
+
+	def test_autocorrelation(self):
+		data = np.random.default_rng(1).normal(size=(3, 200))
+		correlation = motion.autocorrelation(data, 50)
+		self.assertEqual(correlation.shape, (3, 51))
+		centered = data[0] - np.mean(data[0])
+		expected = np.correlate(centered, centered, mode='full')[199:250] / np.sum(centered ** 2)
+		np.testing.assert_allclose(correlation[0], expected, atol=1e-12)
+
+	def test_periodicity(self):
+		rng = np.random.default_rng(2)
+		time = np.arange(0, 60, 0.01)
+		data = np.column_stack([np.sin(2 * np.pi * time / 1.5), np.sin(2 * np.pi * time / 0.8), 0.05 * rng.normal(size=len(time))])
+		times, periods, confidence = motion.periodicity(data, window_period=10.0)
+		self.assertEqual(periods.shape, (len(times), len(motion.PERIODICITY_CHANNELS)))
+		np.testing.assert_allclose(periods[:, 0], 1.5, atol=0.02)
+		np.testing.assert_allclose(periods[:, 1], 0.8, atol=0.02)
+		self.assertTrue(np.all(confidence[:, :2] > 0.7))
+		self.assertTrue(np.all(confidence[:, 2] < 0.3))
+
+	def test_slow_periodicity(self):
+		time = np.arange(0, 60, 0.01)
+		for period in [2.5, 3.0, 3.5, 4.0]:
+			data = np.column_stack([np.sin(2 * np.pi * time / period), np.cos(2 * np.pi * time / period), np.zeros(len(time))])
+			_, periods, confidence = motion.periodicity(data, window_period=10.0)
+			# Windows of 10 seconds hold few of these periods, so they are estimated within a few percent
+			np.testing.assert_allclose(periods[:, :2], period, rtol=0.03)
+			self.assertTrue(np.all(confidence[:, :2] > 0.9))
+		# A ramp falls without a minimum, so it has no period
+		_, periods, confidence = motion.periodicity(np.column_stack([time, time, time]), window_period=10.0)
+		self.assertTrue(np.all(np.isnan(periods)))
+		np.testing.assert_array_equal(confidence, 0.0)
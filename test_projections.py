@@ -0,0 +1,105 @@
+import unittest
+import numpy as np
+import geodesy
+import projections
+from projections import LocalProjection
+
+class TestLocalProjection(unittest.TestCase):
+	def test_origin(self):
+		projection = LocalProjection(-75.7, 45.4, 70.0)
+		np.testing.assert_allclose(projection.forward(-75.7, 45.4, 70.0), [0.0, 0.0, 0.0], atol=1e-6)
+		np.testing.assert_allclose(projection.inverse(0.0, 0.0, 0.0), [-75.7, 45.4, 70.0], atol=1e-9)
+
+	def test_axes(self):
+		projection = LocalProjection(-75.7, 45.4)
+		# North along the meridian and east along the parallel
+		east, north, up = projection.forward([-75.7, -75.69], [45.41, 45.4], 0.0)
+		np.testing.assert_allclose(east[0], 0.0, atol=1e-6)
+		np.testing.assert_allclose(north[0], geodesy.vincenty_inverse(-75.7, 45.4, -75.7, 45.41)[0], rtol=1e-6)
+		self.assertGreater(east[1], 0.0)
+		# A parallel curves toward the pole away from the tangent plane by about d^2 tan(latitude) / 2R
+		np.testing.assert_allclose(north[1], east[1] ** 2 * np.tan(np.radians(45.4)) / (2 * geodesy.MEAN_RADIUS), rtol=0.01)
+		# The surface curves down away from the origin
+		self.assertTrue(np.all(up < 0))
+
+	def test_round_trip(self):
+		rng = np.random.default_rng(0)
+		for longitude, latitude in [(-75.7, 45.4), (151.2, -33.9), (0.0, 0.0), (10.0, 89.9)]:
+			projection = LocalProjection(longitude, latitude, 100.0)
+			east, north, up = rng.uniform(-5000, 5000, (3, 1000))
+			np.testing.assert_allclose(projection.forward(*projection.inverse(east, north, up)), [east, north, up], atol=1e-6)
+
+	def test_positions(self):
+		data = np.zeros((3, 10))
+		data[:,1] = [-75.7, -75.701, -75.699]
+		data[:,2] = [45.4, 45.401, 45.399]
+		data[:,3] = [np.nan, 60.0, 60.0]
+		projection = LocalProjection.from_data(data)
+		self.assertEqual(projection.origin, (-75.7, 45.4, 60.0))
+		positions = projection.positions(data)
+		self.assertEqual(positions.shape, (3, 2))
+		np.testing.assert_allclose(positions[0], [0.0, 0.0], atol=1e-9)
+
+class TestDeadReckoning(unittest.TestCase):
+	def test_dead_reckoning(self):
+		time = np.arange(10.0)
+		# East at 2 m/s, then an invalid course for a step, then north
+		speed = np.full(10, 2.0)
+		course = np.array([90.0] * 5 + [-1.0] + [0.0] * 4)
+		path = projections.dead_reckoning(time, speed, course, start=(1.0, 1.0))
+		self.assertEqual(path.shape, (10, 2))
+		np.testing.assert_allclose(path[5], [11.0, 1.0], atol=1e-12)
+		np.testing.assert_allclose(path[6], [11.0, 1.0], atol=1e-12)
+		np.testing.assert_allclose(path[-1], [11.0, 7.0], atol=1e-12)
+		self.assertEqual(projections.dead_reckoning([], [], []).shape, (0, 2))
+
+	def test_linear_recurrence(self):
+		rng = np.random.default_rng(0)
+		a = rng.uniform(1e-3, 1, 1000)
+		b = rng.normal(0, 100, (1000, 2))
+		expected = np.empty((1000, 2))
+		state = np.array([5.0, -5.0])
+		for k in range(1000):
+			state = a[k] * state + b[k]
+			expected[k] = state
+		np.testing.assert_allclose(projections.linear_recurrence(a, b, [5.0, -5.0]), expected, rtol=1e-9, atol=1e-9)
+
+	def test_blend(self):
+		rng = np.random.default_rng(1)
+		n = 2000
+		time = np.arange(n, dtype=float)
+		course = np.degrees(np.linspace(0, 4 * np.pi, n)) % 360
+		speed = np.full(n, 3.0)
+		truth = projections.dead_reckoning(time, speed, course)
+		positions = truth + rng.normal(0, 5.0, (n, 2))
+		horizontal_accuracy = np.full(n, 5.0)
+		# Fixes that are flagged invalid are ignored however wrong they are
+		positions[100:110] += 1000
+		horizontal_accuracy[100:110] = -1
+		# Speed has noise within its accuracy
+		speed_accuracy = np.full(n, 0.3)
+		measured_speed = speed + rng.normal(0, 0.3, n)
+		blended = projections.blend_fixes(time, measured_speed, course, positions, horizontal_accuracy, speed_accuracy)
+		error = np.hypot(*(blended - truth).T)
+		fix_error = np.hypot(*(positions - truth).T)
+		self.assertLess(np.sqrt(np.mean(error ** 2)), 0.5 * np.sqrt(np.mean(fix_error[110:] ** 2)))
+		self.assertLess(np.max(error[100:110]), 20.0)
+		# Dead reckoning alone drifts without fixes
+		drift = np.hypot(*(projections.dead_reckoning(time, measured_speed, course) - truth).T)
+		self.assertLess(np.sqrt(np.mean(error ** 2)), np.sqrt(np.mean(drift ** 2)))
+
+	def test_reckon(self):
+		n = 100
+		data = np.zeros((n, 10))
+		data[:,0] = np.arange(n)[::-1]
+		projection = LocalProjection(-75.7, 45.4)
+		# North at 1 m/s
+		data[:,1], data[:,2], _ = projection.inverse(np.zeros(n), data[:,0])
+		data[:,4] = 3.0
+		data[:,6] = 1.0
+		data[:,7] = 0.1
+		data[:,8] = 0.0
+		data[:,9] = 1.0
+		for blend in [False, True]:
+			path = projections.reckon(data, projection, blend)
+			np.testing.assert_allclose(path, np.column_stack([np.zeros(n), np.arange(n)]), atol=0.01)
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+import loader
+from session import Session, as_session
+
+def locations(time):
+	data = np.zeros((len(time), len(loader.LOCATION_PROPERTIES)))
+	data[:,0] = time
+	data[:,1] = -75.7 + np.asarray(time) * 1e-5
+	data[:,2] = 45.4
+	data[:,[4, 5, 7, 9]] = [5.0, 5.0, 0.5, 10.0]
+	data[:,6] = np.arange(len(time))
+	return data
+
+class TestSession(unittest.TestCase):
+	def test_sorted_once(self):
+		data = locations([3.0, 1.0, 2.0, 2.0, 5.0])
+		heart_rate = np.array([[4.0, 120.0], [0.0, 100.0]])
+		session = Session(data, heart_rate)
+		self.assertTrue(session.time_ordered)
+		# Repeated times keep the first fix in recorded order
+		np.testing.assert_array_equal(session.time, [1, 2, 3, 5])
+		np.testing.assert_array_equal(session.speed, [1, 2, 0, 4])
+		np.testing.assert_array_equal(session.heart_rate[:,0], [0, 4])
+		self.assertEqual(len(session), 4)
+		self.assertEqual(len(Session(locations([])).rr_intervals), 0)
+
+	def test_views(self):
+		data = locations(np.arange(10.0))
+		session = Session(data)
+		# Data already in order is not copied, and columns are views of it
+		self.assertIs(session.data, data)
+		for column in [session.time, session.longitude, session.latitude, session.speed, session.course_accuracy]:
+			self.assertTrue(np.shares_memory(column, data))
+		np.testing.assert_array_equal(session.longitude, data[:,1])
+		self.assertIs(as_session(session), session)
+		self.assertIs(as_session(data).data, data)
+
+	def test_positions(self):
+		session = Session(locations(np.arange(10.0)))
+		positions = session.positions
+		self.assertIs(session.positions, positions)
+		self.assertEqual(positions.shape, (10, 2))
+		# Longitude increases by 1e-5 degrees per fix
+		np.testing.assert_allclose(np.diff(positions[:,0]), 0.78, rtol=0.01)
+		smoothed = session.smoothed()
+		self.assertIs(smoothed.projection, session.projection)
+		self.assertEqual(len(smoothed), len(session))
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import geodesy
+import loader
+from session import Session
+
+# Session of n fixes scattered within about 200 meters of a point, some without a position
+def scattered(n):
+	rng = np.random.default_rng(0)
+	data = np.zeros((n, len(loader.LOCATION_PROPERTIES)))
+	data[:,0] = np.arange(n)
+	data[:,1] = -75.7 + rng.uniform(-0.0025, 0.0025, n)
+	data[:,2] = 45.4 + rng.uniform(-0.0018, 0.0018, n)
+	data[::97,1] = np.nan
+	return Session(data)
+
+class TestSpatialIndex(unittest.TestCase):
+	def setUp(self):
+		self.session = scattered(5000)
+		self.index = self.session.spatial_index
+		self.positions = self.session.positions
+
+	def test_cached(self):
+		self.assertIs(self.session.spatial_index, self.index)
+		self.assertEqual(len(self.index), np.count_nonzero(np.isfinite(self.session.longitude)))
+
+	def test_nearest(self):
+		points = np.array([[-75.7, 45.4], [-75.701, 45.4005], [-75.69, 45.41]])
+		distances, rows = self.index.nearest(points, k=3)
+		self.assertEqual(rows.shape, (3, 3))
+		brute = np.hypot(*(self.positions[None] - self.index.project(points)[:,None]).transpose(2, 0, 1))
+		brute[np.isnan(brute)] = np.inf
+		np.testing.assert_array_equal(rows, np.argsort(brute, axis=1)[:,:3])
+		np.testing.assert_allclose(distances, np.sort(brute, axis=1)[:,:3])
+		distance, row = self.index.nearest(points[0])
+		self.assertEqual(row, rows[0, 0])
+		# Neighbors beyond the distance limit are missing
+		distances, rows = self.index.nearest(points[2], k=2, max_distance=10.0)
+		self.assertTrue(np.all(np.isinf(distances)))
+		np.testing.assert_array_equal(rows, [-1, -1])
+
+	def test_within_track(self):
+		track = geodesy.track([-75.7, 45.4], np.pi / 6)
+		rows = self.index.within(track, 5.0)
+		track_positions = self.index.project(track)
+		brute = np.hypot(*(self.positions[:,None] - track_positions[None]).transpose(2, 0, 1))
+		np.testing.assert_array_equal(rows, np.flatnonzero(np.any(brute <= 5.0, axis=1)))
+		self.assertGreater(len(rows), 0)
+		self.assertEqual(len(self.index.within(np.zeros((0, 2)), 5.0)), 0)
+
+	def test_box(self):
+		bounds = (-75.701, 45.3995, -75.6995, 45.4012)
+		rows = self.index.box(bounds)
+		lower, upper = self.index.project([bounds[:2], bounds[2:]])
+		inside = np.all((self.positions >= lower) & (self.positions <= upper), axis=1)
+		np.testing.assert_array_equal(rows, np.flatnonzero(inside))
+		self.assertGreater(len(rows), 0)
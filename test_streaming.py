@@ -0,0 +1,126 @@
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+import metrics
+import session
+import streaming
+
+# Write a recording of splits of n fixes and heart rate measurements one second apart, one record at a time.
+# With repeats, every repeats-th fix has the time of the fix before it.
+def write_recording(path, splits, n, repeats=None):
+	rng = np.random.default_rng(0)
+	with open(path, 'w') as f:
+		f.write('[')
+		for split in range(splits):
+			start = split * n
+			f.write(',' if split else '')
+			f.write('{"locations": [')
+			for i in range(start, start + n):
+				repeated = repeats is not None and i > start and i % repeats == 0
+				record = {'timeInterval': float(i - 1 if repeated else i), 'longitude': -75.7 + i * 1e-5, 'latitude': 45.4 + rng.normal(0, 1e-5),
+					'altitude': 70 + rng.normal(0, 1), 'horizontalAccuracy': rng.choice([4.0, 5.0, 12.0]), 'verticalAccuracy': 3.0,
+					'speed': 1.0, 'speedAccuracy': 0.5, 'course': 90.0, 'courseAccuracy': 10.0}
+				f.write((',' if i > start else '') + json.dumps(record))
+			f.write('], "start": 0, "bluetoothValues": [')
+			for i in range(start, start + n):
+				rr = int(rng.normal(800, 30))
+				packet = bytes([0x10, 100 + i % 80, rr & 0xff, rr >> 8])
+				value = {'timeInterval': float(i), 'value': base64.b64encode(packet).decode()}
+				f.write((',' if i > start else '') + json.dumps(value))
+			f.write(']}')
+		f.write(']')
+
+# Peak resident memory in megabytes of computing chunked metrics of a file in a new process
+def peak_memory(path):
+	script = f"import resource, streaming; streaming.stream_metrics({str(path)!r}, chunk_size=1000); print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+	output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+	return int(output.stdout) / 1024
+
+class TestStreaming(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def test_matches_split_metrics(self):
+		path = os.path.join(self.directory.name, 'recording.json')
+		write_recording(path, 2, 500)
+		self.assertEqual(streaming.count_splits(path), 2)
+		self.assert_matches_split_metrics(path)
+
+	def test_repeated_times(self):
+		path = os.path.join(self.directory.name, 'repeated.json')
+		write_recording(path, 2, 500, repeats=7)
+		self.assert_matches_split_metrics(path)
+
+	def test_reversed_splits(self):
+		path = os.path.join(self.directory.name, 'recording.json')
+		write_recording(path, 2, 500)
+		with open(path) as f:
+			splits = json.load(f)
+		reversed_path = os.path.join(self.directory.name, 'reversed.json')
+		with open(reversed_path, 'w') as f:
+			json.dump(splits[::-1], f)
+		self.assert_matches_split_metrics(reversed_path)
+		self.assertEqual(streaming.stream_metrics(reversed_path, chunk_size=100)['fixes'], 1000)
+		# Splits overlapping in time cannot be joined a chunk at a time
+		overlapping_path = os.path.join(self.directory.name, 'overlapping.json')
+		with open(overlapping_path, 'w') as f:
+			json.dump([splits[0], splits[0]], f)
+		with self.assertRaises(ValueError):
+			streaming.stream_metrics(overlapping_path, chunk_size=100)
+
+	def test_out_of_order_records(self):
+		path = os.path.join(self.directory.name, 'recording.json')
+		write_recording(path, 1, 500)
+		with open(path) as f:
+			splits = json.load(f)
+		for key in ['locations', 'bluetoothValues']:
+			splits[0][key] = splits[0][key][250:] + splits[0][key][:250]
+		with open(path, 'w') as f:
+			json.dump(splits, f)
+		# Records going back to before an earlier chunk are dropped, so no time is negative
+		values = streaming.stream_metrics(path, chunk_size=100)
+		self.assertEqual(values['fixes'], 250)
+		self.assertEqual(values['elapsed'], 249)
+		self.assertTrue(np.all(np.array(values['heart_rate']['zones']) >= 0))
+		self.assertAlmostEqual(sum(values['heart_rate']['zones']), 249)
+
+	# Chunked metrics of path agree with those of sessions of the whole recording and of a split
+	def assert_matches_split_metrics(self, path):
+		for split in [None, 1]:
+			data = session.Session.load(path, split, use_cache=False)
+			expected = metrics.to_json(metrics.split_metrics(data.data, data.heart_rate, data.rr_intervals))
+			del expected['hrv']
+			for chunk_size in [1, 77, 10000]:
+				values = metrics.to_json(streaming.stream_metrics(path, split, chunk_size))
+				self.assertEqual(set(values), set(expected))
+				for key in ['fixes', 'start', 'elapsed', 'horizontal_accuracy', 'vertical_accuracy']:
+					self.assertEqual(values[key], expected[key])
+				for key in ['distance', 'heart_rate', 'rr_intervals']:
+					for name in expected[key]:
+						np.testing.assert_allclose(values[key][name], expected[key][name], rtol=1e-9)
+				np.testing.assert_allclose([values['altitude_gain'], values['altitude_loss']], [expected['altitude_gain'], expected['altitude_loss']], rtol=1e-9)
+
+	def test_empty(self):
+		path = os.path.join(self.directory.name, 'empty.json')
+		with open(path, 'w') as f:
+			f.write('[{"locations": [], "bluetoothValues": []}]')
+		values = streaming.stream_metrics(path)
+		self.assertEqual(values['fixes'], 0)
+		self.assertIsNone(values['heart_rate']['mean'])
+		json.dumps(metrics.to_json(values), allow_nan=False)
+
+	def test_bounded_memory(self):
+		small = os.path.join(self.directory.name, 'small.json')
+		large = os.path.join(self.directory.name, 'large.json')
+		write_recording(small, 1, 2000)
+		write_recording(large, 2, 50000)
+		# 50 times the records, about 30 MB of JSON, which takes several times that to hold decoded
+		self.assertLess(peak_memory(large) - peak_memory(small), 10)
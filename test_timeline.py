@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+import timeline
+
+class TestTimeline(unittest.TestCase):
+	def test_sort_by_time(self):
+		data = np.array([[1.0, 10.0], [2.0, 20.0], [3.0, 30.0]])
+		self.assertIs(timeline.sort_by_time(data), data)
+		shuffled = data[[2, 0, 1]]
+		np.testing.assert_array_equal(timeline.sort_by_time(shuffled), data)
+		self.assertEqual(timeline.sort_by_time(np.zeros((0, 2))).shape, (0, 2))
+
+	def test_asof(self):
+		source_time = np.array([1.0, 2.0, 4.0])
+		values = np.array([10.0, 20.0, 40.0])
+		time = np.array([0.5, 1.0, 1.5, 3.9, 4.0, 20.0])
+		np.testing.assert_array_equal(timeline.asof(time, source_time, values), [np.nan, 10, 10, 20, 40, 40])
+		np.testing.assert_array_equal(timeline.asof(time, source_time, values, tolerance=1.0), [np.nan, 10, 10, np.nan, 40, np.nan])
+		columns = timeline.asof(time, source_time, np.column_stack([values, -values]))
+		self.assertEqual(columns.shape, (6, 2))
+		np.testing.assert_array_equal(columns[:,1], [np.nan, -10, -10, -20, -40, -40])
+		self.assertTrue(np.all(np.isnan(timeline.asof(time, np.zeros(0), np.zeros(0)))))
+
+	def test_interpolate(self):
+		source_time = np.array([1.0, 2.0, 10.0])
+		values = np.array([10.0, 20.0, 100.0])
+		time = np.array([0.0, 1.0, 1.5, 2.0, 6.0, 10.0, 11.0])
+		np.testing.assert_allclose(timeline.interpolate(time, source_time, values), [np.nan, 10, 15, 20, 60, 100, np.nan])
+		np.testing.assert_allclose(timeline.interpolate(time, source_time, values, max_gap=5.0), [np.nan, 10, 15, 20, np.nan, np.nan, np.nan])
+		np.testing.assert_allclose(timeline.interpolate(time, source_time, values), np.interp(time, source_time, values, left=np.nan, right=np.nan))
+
+	def test_interval_mean(self):
+		source_time = np.arange(10.0)
+		values = np.arange(10.0)
+		time = np.array([2.0, 5.0, 5.5, 9.0])
+		np.testing.assert_allclose(timeline.interval_mean(time, source_time, values), [1.0, 4.0, np.nan, 7.5])
+
+	def test_session_frame(self):
+		data = np.zeros((4, 10))
+		data[:,0] = [3.0, 1.0, 2.0, 10.0]
+		data[:,1] = [30.0, 10.0, 20.0, 100.0]
+		heart_rate = np.array([[0.5, 100.0], [2.5, 120.0]])
+		acceleration = np.zeros((100, 4))
+		acceleration[:,0] = np.linspace(0, 9.9, 100)
+		acceleration[:,3] = 1.0
+		frame = timeline.session_frame(data, heart_rate, acceleration)
+		self.assertEqual(set(frame), set(timeline.FRAME_COLUMNS))
+		np.testing.assert_array_equal(frame['timeInterval'], [1, 2, 3, 10])
+		np.testing.assert_array_equal(frame['longitude'], [10, 20, 30, 100])
+		np.testing.assert_array_equal(frame['heart_rate'], [100, 100, 120, np.nan])
+		np.testing.assert_allclose(frame['acceleration'], 1.0)
+		# Location columns are views of one sorted matrix
+		self.assertIs(frame['longitude'].base, frame['timeInterval'].base)
+		self.assertTrue(np.all(np.isnan(timeline.session_frame(data)['heart_rate'])))
@@ -0,0 +1,111 @@
+import unittest
+import numpy as np
+import geodesy
+import track_fit
+from projections import LocalProjection
+
+# Positions of laps around a track in a lane, with noise in meters
+def laps(center, direction, lane, laps=3, n=1200, noise=1.0, seed=0):
+	radius = track_fit.LANE_RADII[lane - 1]
+	half = geodesy.TRACK_STRAIGHT / 2
+	perimeter = 2 * geodesy.TRACK_STRAIGHT + 2 * np.pi * radius
+	s = np.linspace(0, laps * perimeter, n, endpoint=False) % perimeter
+	corner = np.pi * radius
+	u = np.select([s < 2 * half, s < 2 * half + corner, s < 4 * half + corner],
+		[s - half, half + radius * np.sin((s - 2 * half) / radius), half - (s - 2 * half - corner)],
+		-half - radius * np.sin((s - 4 * half - corner) / radius))
+	v = np.select([s < 2 * half, s < 2 * half + corner, s < 4 * half + corner],
+		[-radius, -radius * np.cos((s - 2 * half) / radius), radius],
+		radius * np.cos((s - 4 * half - corner) / radius))
+	x = u * np.cos(direction) - v * np.sin(direction)
+	y = u * np.sin(direction) + v * np.cos(direction)
+	rng = np.random.default_rng(seed)
+	x = x + rng.normal(0, noise, n)
+	y = y + rng.normal(0, noise, n)
+	return LocalProjection(*center).inverse(x, y)[:2]
+
+class TestTrackFit(unittest.TestCase):
+	def test_stadium_distance(self):
+		half = geodesy.TRACK_STRAIGHT / 2
+		x = np.array([0.0, half + 40.0, -half, 0.0])
+		y = np.array([-36.5, 0.0, 30.0, 0.0])
+		np.testing.assert_allclose(track_fit.stadium_distance(x, y, 0.0, 0.0, 0.0, 36.5), [0.0, 3.5, -6.5, -36.5], atol=1e-12)
+		# Rotating the points and the shape together does not change the distance
+		rotated_x = x * np.cos(1.0) - y * np.sin(1.0)
+		rotated_y = x * np.sin(1.0) + y * np.cos(1.0)
+		np.testing.assert_allclose(track_fit.stadium_distance(rotated_x, rotated_y, 0.0, 0.0, 1.0, 36.5), [0.0, 3.5, -6.5, -36.5], atol=1e-12)
+
+	def test_fit(self):
+		center = (-75.7, 45.4)
+		for direction, lane in [(0.3, 1), (2.0, 4), (np.pi / 2, 8)]:
+			longitude, latitude = laps(center, direction, lane)
+			fit = track_fit.fit(longitude, latitude)
+			self.assertEqual(fit.lane, lane)
+			self.assertAlmostEqual(fit.direction, direction, delta=0.01)
+			x, y, _ = LocalProjection(*center).forward(*fit.center_position)
+			self.assertLess(np.hypot(x, y), 0.5)
+			self.assertLess(fit.residual, 1.5)
+
+	def test_outliers(self):
+		center = (10.0, -33.0)
+		longitude, latitude = laps(center, 1.2, 2)
+		# Positions while warming up off the track
+		outlier_longitude, outlier_latitude = LocalProjection(*center).inverse(np.linspace(80, 150, 100), np.linspace(-60, 60, 100))[:2]
+		fit = track_fit.fit(np.concatenate([longitude, outlier_longitude]), np.concatenate([latitude, outlier_latitude]))
+		self.assertEqual(fit.lane, 2)
+		self.assertAlmostEqual(fit.direction, 1.2, delta=0.02)
+
+	def test_outline(self):
+		center = (-75.7, 45.4)
+		fit = track_fit.TrackFit(LocalProjection(*center), (0.0, 0.0), 0.5, track_fit.LANE_RADII[0], 0.0)
+		outline = fit.outline(n=10)
+		self.assertEqual(outline.shape, (80, 2))
+		distance = fit.distance(outline[:,0], outline[:,1]) + fit.radius
+		inner = np.concatenate([distance[i:i + 10] for i in range(0, 80, 20)])
+		outer = np.concatenate([distance[i + 10:i + 20] for i in range(0, 80, 20)])
+		# geodesy.track lays the outline out on the sphere, within a millimeter of the plane of the fit
+		np.testing.assert_allclose(inner, geodesy.TRACK_RADIUS, atol=1e-3)
+		np.testing.assert_allclose(outer, geodesy.TRACK_RADIUS + geodesy.TRACK_LANES * geodesy.TRACK_LANE_WIDTH, atol=1e-3)
+
+	def test_jittered_crossings(self):
+		center = (-75.7, 45.4)
+		fit = track_fit.TrackFit(LocalProjection(*center), (0.0, 0.0), 0.0, track_fit.LANE_RADII[0], 0.0)
+		# Back and forth across the finish line in lane 2, forward at about 0, 15 and 30 seconds
+		time = np.arange(-1.0, 31.0, 0.5)
+		rng = np.random.default_rng(0)
+		u = geodesy.TRACK_STRAIGHT / 2 + 3 * np.sin(2 * np.pi * time / 15) + rng.normal(0, 0.05, len(time))
+		v = np.full(len(time), -track_fit.LANE_RADII[1])
+		longitude, latitude = fit.projection.inverse(u, v)[:2]
+		# The crossing at 30 seconds is a lap after the one kept at 0 even though the one at 15 was noise
+		crossings = track_fit.finish_crossings(time, longitude, latitude, fit, min_lap=20.0)
+		np.testing.assert_allclose(crossings, [0.0, 30.0], atol=0.2)
+
+	def test_laps(self):
+		center = (-75.7, 45.4)
+		longitude, latitude = laps(center, 0.8, 1, laps=3, n=3000, noise=0.01)
+		# 5 m/s for 80s laps
+		time = np.arange(3000) * 1200 / 3000 / 5
+		data = np.column_stack([time, longitude, latitude])
+		fit = track_fit.fit(longitude, latitude)
+		heart_rate = np.column_stack([time, np.repeat([120.0, 140.0, 160.0], 1000)])
+		table = track_fit.laps(data[::-1], fit, heart_rate)
+		self.assertEqual(table.shape, (2, len(track_fit.LAP_COLUMNS)))
+		np.testing.assert_allclose(table[:,2], 80.0, atol=0.5)
+		np.testing.assert_allclose(table[:,3], 400.0, rtol=0.01)
+		np.testing.assert_allclose(table[:,4], 5.0, rtol=0.01)
+		self.assertTrue(np.all((table[:,5] > 120) & (table[:,5] < 160)))
+
+		# Running the other way round the track
+		reverse = data[::-1].copy()
+		reverse[:,0] = time
+		table = track_fit.laps(reverse, fit)
+		self.assertEqual(len(table), 2)
+		np.testing.assert_allclose(table[:,2], 80.0, atol=0.5)
+		self.assertTrue(np.all(np.isnan(table[:,5])))
+
+	def test_no_laps(self):
+		fit = track_fit.TrackFit(LocalProjection(0.0, 0.0), (0.0, 0.0), 0.0, track_fit.LANE_RADII[0], 0.0)
+		self.assertEqual(track_fit.laps(np.zeros((1, 10)), fit).shape, (0, len(track_fit.LAP_COLUMNS)))
+
+	def test_too_few(self):
+		self.assertRaises(ValueError, track_fit.fit, [1.0, 2.0], [1.0, 2.0])
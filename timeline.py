@@ -0,0 +1,92 @@
+import numpy as np
+import loader
+
+# Columns of a session frame: the location properties and the streams joined onto their timeline
+FRAME_COLUMNS = loader.LOCATION_PROPERTIES + ['heart_rate', 'acceleration']
+
+# Rows of an array in order of the time in column, stably sorted. An array that is already in order is returned
+# as it is, so consumers can call this on sorted data without copying it again.
+def sort_by_time(array, column=0):
+	time = array[:,column]
+	if np.all(time[1:] >= time[:-1]):
+		return array
+	return array[np.argsort(time, kind='stable')]
+
+# Index of the last source sample at or before each time, or -1 before the first. Source times are sorted.
+def asof_indices(time, source_time):
+	return np.searchsorted(source_time, time, side='right') - 1
+
+# Values of the last source sample at or before each time, as in an as-of join. NaN before the first sample or
+# when the last sample is more than tolerance seconds old. Values are (m,) or (m, k) for m sorted source times.
+def asof(time, source_time, values, tolerance=None):
+	time = np.asarray(time, dtype=float)
+	values = np.asarray(values, dtype=float)
+	if len(source_time) == 0:
+		return np.full((len(time),) + values.shape[1:], np.nan)
+	index = asof_indices(time, source_time)
+	missing = index < 0
+	index = np.maximum(index, 0)
+	if tolerance is not None:
+		missing |= time - source_time[index] > tolerance
+	return _mask(values[index], missing)
+
+# Values linearly interpolated between the source samples around each time. NaN outside the source times or
+# between samples more than max_gap seconds apart.
+def interpolate(time, source_time, values, max_gap=None):
+	time = np.asarray(time, dtype=float)
+	values = np.asarray(values, dtype=float)
+	if len(source_time) == 0:
+		return np.full((len(time),) + values.shape[1:], np.nan)
+	after = np.minimum(np.searchsorted(source_time, time, side='left'), len(source_time) - 1)
+	before = np.maximum(after - 1, 0)
+	span = source_time[after] - source_time[before]
+	fraction = np.divide(time - source_time[before], span, out=np.zeros_like(time), where=span > 0)
+	fraction = fraction.reshape((-1,) + (1,) * (values.ndim - 1))
+	interpolated = values[before] + fraction * (values[after] - values[before])
+	missing = (time < source_time[0]) | (time > source_time[-1])
+	if max_gap is not None:
+		missing |= span > max_gap
+	return _mask(interpolated, missing)
+
+# Mean of the source samples after the previous time up to and including each time, and for the first time
+# every sample up to it. NaN for intervals without samples. Sums are cumulative so this is linear in both lengths.
+def interval_mean(time, source_time, values):
+	values = np.asarray(values, dtype=float)
+	bounds = np.searchsorted(source_time, time, side='right')
+	sums = np.zeros((len(values) + 1,) + values.shape[1:])
+	np.cumsum(values, axis=0, out=sums[1:])
+	starts = np.concatenate([[0], bounds[:-1]])
+	counts = (bounds - starts).reshape((-1,) + (1,) * (values.ndim - 1))
+	with np.errstate(invalid='ignore', divide='ignore'):
+		return np.where(counts > 0, (sums[bounds] - sums[starts]) / counts, np.nan)
+
+def _mask(values, missing):
+	if not np.any(missing):
+		return values
+	values = np.array(values, dtype=float)
+	values[missing] = np.nan
+	return values
+
+# One columnar frame of a session on the timeline of its location fixes, as a dict of column name to array.
+# Locations are sorted once and every location column is a view of the sorted matrix. Heart rate is the last
+# measurement within heart_rate_tolerance seconds of each fix, and acceleration the mean magnitude of the
+# accelerometer samples since the previous fix, with acceleration_offset seconds added to their time to put
+# them on the clock of the locations. Missing streams and samples are NaN.
+def session_frame(data, heart_rate=None, acceleration=None, heart_rate_tolerance=5.0, acceleration_offset=0.0):
+	data = sort_by_time(data)
+	frame = {name: data[:,i] for i, name in enumerate(loader.LOCATION_PROPERTIES)}
+	time = frame['timeInterval']
+
+	if heart_rate is None or len(heart_rate) == 0:
+		frame['heart_rate'] = np.full(len(time), np.nan)
+	else:
+		heart_rate = sort_by_time(np.asarray(heart_rate, dtype=float).reshape(-1, 2))
+		frame['heart_rate'] = asof(time, heart_rate[:,0], heart_rate[:,1], heart_rate_tolerance)
+
+	if acceleration is None or len(acceleration) == 0:
+		frame['acceleration'] = np.full(len(time), np.nan)
+	else:
+		acceleration = sort_by_time(acceleration)
+		magnitude = np.sqrt(np.sum(acceleration[:,1:4] ** 2, axis=1))
+		frame['acceleration'] = interval_mean(time, acceleration[:,0] + acceleration_offset, magnitude)
+	return frame
@@ -0,0 +1,160 @@
+import numpy as np
+from scipy import optimize
+import geodesy
+import timeline
+from projections import LocalProjection
+
+# Radius of the line each lane is measured along: 30 cm outside the inner edge of lane 1 and 20 cm outside the
+# inner edge of the others
+LANE_RADII = geodesy.TRACK_RADIUS + np.array([0.3] + [(lane - 1) * geodesy.TRACK_LANE_WIDTH + 0.2 for lane in range(2, geodesy.TRACK_LANES + 1)])
+
+# Columns of the table returned by laps. Times are in seconds, distance in meters, speed in meters per second and
+# heart rate in BPM.
+LAP_COLUMNS = ['start', 'end', 'time', 'distance', 'speed', 'heart_rate']
+
+# Signed distance in meters from points to the stadium shape of radius around a straight of length straight,
+# centered at (center_x, center_y) with the straights along direction counterclockwise from east.
+# Positive outside the shape. Every argument broadcasts, so many candidate shapes can be scored at once.
+def stadium_distance(x, y, center_x, center_y, direction, radius, straight=geodesy.TRACK_STRAIGHT):
+	dx = x - center_x
+	dy = y - center_y
+	cos = np.cos(direction)
+	sin = np.sin(direction)
+	# Coordinates along and across the straights
+	u = dx * cos + dy * sin
+	v = dy * cos - dx * sin
+	along = np.maximum(np.abs(u) - straight / 2, 0)
+	return np.hypot(along, v) - radius
+
+class TrackFit:
+	def __init__(self, projection, center, direction, radius, residual):
+		# projections.LocalProjection the track was fitted in
+		self.projection = projection
+		# Center in meters east and north of the origin of projection
+		self.center = center
+		# Direction of the straights in radians counterclockwise from east, between 0 and pi
+		self.direction = direction
+		# Radius of the path that was run around the corners
+		self.radius = radius
+		# Root mean square distance of the positions from the fitted path
+		self.residual = residual
+
+	# Lane whose measurement line is closest to the fitted path, from 1 to 8
+	@property
+	def lane(self):
+		return int(np.argmin(np.abs(LANE_RADII - self.radius))) + 1
+
+	@property
+	def center_position(self):
+		return self.projection.inverse(self.center[0], self.center[1])[:2]
+
+	# Coordinates in meters along the straights and across them from the center of the track
+	def track_coordinates(self, longitude, latitude):
+		x, y, _ = self.projection.forward(longitude, latitude)
+		dx = x - self.center[0]
+		dy = y - self.center[1]
+		cos = np.cos(self.direction)
+		sin = np.sin(self.direction)
+		return dx * cos + dy * sin, dy * cos - dx * sin
+
+	# Signed distance in meters from positions to the fitted path
+	def distance(self, longitude, latitude):
+		x, y, _ = self.projection.forward(longitude, latitude)
+		return stadium_distance(x, y, self.center[0], self.center[1], self.direction, self.radius)
+
+	# Longitude and latitude of the inner and outer edges of the track from geodesy.track: the two edges of the
+	# front straight, first corner, back straight and second corner with n points each.
+	def outline(self, n=10):
+		# geodesy.point offsets longitude by angles on the sphere without scaling them by the cosine of latitude, so
+		# the track is laid out at the equator, where both are the same length, and moved in meters onto the center
+		offsets = np.radians(geodesy.track([0.0, 0.0], self.direction, n)) * geodesy.MEAN_RADIUS
+		return np.column_stack(self.projection.inverse(self.center[0] + offsets[:,0], self.center[1] + offsets[:,1])[:2])
+
+# Fit a 400m track to positions run on it. Estimates the center, the direction of the straights and the radius of
+# the path run, from which the lane follows.
+# A coarse search scores a grid of directions and center offsets against a subsample of the positions at once,
+# and the best candidate is refined with robust least squares so positions off the track have little influence.
+# The fit is done in projection, a projections.LocalProjection around the median position by default.
+def fit(longitude, latitude, projection=None, directions=36, offsets=5, search_radius=10.0, max_points=2000):
+	longitude = np.asarray(longitude, dtype=float)
+	latitude = np.asarray(latitude, dtype=float)
+	finite = np.isfinite(longitude) & np.isfinite(latitude)
+	longitude = longitude[finite]
+	latitude = latitude[finite]
+	if len(longitude) < 4:
+		raise ValueError(f"At least 4 positions are needed to fit a track, got {len(longitude)}")
+
+	if projection is None:
+		projection = LocalProjection(np.median(longitude), np.median(latitude))
+	x, y, _ = projection.forward(longitude, latitude)
+	step = max(len(x) // max_points, 1)
+	sample_x = x[::step]
+	sample_y = y[::step]
+
+	# Candidates are centered on the middle of the bounding box, which is the center for any number of laps
+	middle_x = (np.max(x) + np.min(x)) / 2
+	middle_y = (np.max(y) + np.min(y)) / 2
+	grid = np.linspace(-search_radius, search_radius, offsets)
+	candidate_direction, candidate_x, candidate_y = np.meshgrid(np.linspace(0, np.pi, directions, endpoint=False), middle_x + grid, middle_y + grid, indexing='ij')
+	candidates = np.column_stack([candidate_x.ravel(), candidate_y.ravel(), candidate_direction.ravel()])
+	distances = stadium_distance(sample_x, sample_y, candidates[:,0,None], candidates[:,1,None], candidates[:,2,None], LANE_RADII[0])
+	# Cap distances so a few positions far from the track do not dominate the score
+	scores = np.sum(np.minimum(np.abs(distances), search_radius), axis=1)
+	best = candidates[np.argmin(scores)]
+
+	def residuals(parameters):
+		return stadium_distance(x, y, *parameters)
+	solution = optimize.least_squares(residuals, [best[0], best[1], best[2], LANE_RADII[0]], loss='soft_l1', f_scale=2.0, x_scale=[1.0, 1.0, 0.01, 1.0])
+	center_x, center_y, direction, radius = solution.x
+	residual = np.sqrt(np.mean(residuals(solution.x) ** 2))
+	# A stadium is symmetric under a half turn
+	return TrackFit(projection, (center_x, center_y), np.mod(direction, np.pi), radius, residual)
+
+# Times at which positions cross the finish line, across the track at the end of the front straight of outline().
+# Crossings are sign changes of the position along the straights relative to the line between consecutive
+# positions that are both on that side of the track, interpolated linearly in time. Only crossings in the
+# direction most of them are run count, and a crossing within min_lap seconds of the last one kept is noise.
+def finish_crossings(time, longitude, latitude, fit, min_lap=20.0, margin=10.0):
+	u, v = fit.track_coordinates(longitude, latitude)
+	offset = u - geodesy.TRACK_STRAIGHT / 2
+	outer = geodesy.TRACK_RADIUS + geodesy.TRACK_LANES * geodesy.TRACK_LANE_WIDTH
+	side = (-v > geodesy.TRACK_RADIUS - margin) & (-v < outer + margin)
+	nearby = side[:-1] & side[1:]
+	forward = nearby & (offset[:-1] < 0) & (offset[1:] >= 0)
+	backward = nearby & (offset[:-1] >= 0) & (offset[1:] < 0)
+	crossing = forward if np.count_nonzero(forward) >= np.count_nonzero(backward) else backward
+	i = np.flatnonzero(crossing)
+	fraction = -offset[i] / (offset[i + 1] - offset[i])
+	times = time[i] + fraction * (time[i + 1] - time[i])
+	# Measured from the last crossing kept, so noise after it does not hide the next lap. There is one crossing
+	# per lap, so the loop is short.
+	kept = []
+	for crossing in times:
+		if not kept or crossing - kept[-1] >= min_lap:
+			kept.append(crossing)
+	return np.array(kept)
+
+# Table of laps between consecutive finish line crossings with the columns of LAP_COLUMNS, one row per lap.
+# Distance is run between the crossings by a metric of geodesy.DISTANCE_METRICS and heart rate the mean of the measurements
+# during the lap, or NaN without any.
+def laps(data, fit, heart_rate=None, min_lap=20.0, metric='haversine'):
+	data = timeline.sort_by_time(data)
+	time = data[:,0]
+	crossings = finish_crossings(time, data[:,1], data[:,2], fit, min_lap)
+	table = np.full((max(len(crossings) - 1, 0), len(LAP_COLUMNS)), np.nan)
+	if len(table) == 0:
+		return table
+	table[:,0] = crossings[:-1]
+	table[:,1] = crossings[1:]
+	table[:,2] = np.diff(crossings)
+	distance = np.interp(crossings, time, geodesy.cumulative_distance(data[:,1], data[:,2], metric))
+	table[:,3] = np.diff(distance)
+	table[:,4] = table[:,3] / table[:,2]
+	if heart_rate is not None and len(heart_rate):
+		heart_rate = np.asarray(heart_rate, dtype=float).reshape(-1, 2)
+		heart_rate = timeline.sort_by_time(heart_rate)
+		sums = np.concatenate([[0.0], np.cumsum(heart_rate[:,1])])
+		bounds = np.searchsorted(heart_rate[:,0], crossings)
+		counts = np.diff(bounds)
+		np.divide(np.diff(sums[bounds]), counts, out=table[:,5], where=counts > 0)
+	return table